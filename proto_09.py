@@ -1,95 +1,347 @@
+import io
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import mysql.connector
-from mysql.connector import Error
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import requests
-import json
+from tkinter import ttk, messagebox, simpledialog, filedialog
+
+from sqlhelper import (DEFAULT_CONFIG, CATALOG_CACHE_PATH, PAGE_SIZE, ConnectionPool, Catalog, CatalogCache,
+                       DbExecutor, ResultBuffer, connection_params, server_key, fetch_page, run_query,
+                       run_statements, split_statements, changes_schema, insert_rows, read_delimited,
+                       inspect_file, map_columns,
+                       import_file, EXPORT_FORMATS, COMPRESSIONS, export_extension, export_query, export_table,
+                       export_table_parallel, key_values, fetch_row, update_row, delete_row, ChangeSet,
+                       apply_changes, BULK_DELETE_CHUNK, delete_keys, delete_where, NUMERIC_DATA_TYPES,
+                       TEMPORAL_DATA_TYPES, CHART_AGGREGATES, TIME_BUCKETS, fetch_grouped, fetch_line, fetch_density,
+                       fetch_time_series, time_bucket_label, ChartEngine, SERIES_CACHE_SIZE,
+                       CHART_MAX_LABELS, build_ai_context, generate_sql, extract_sql)
+from sqlhelper.results import format_cell
 
 # 创建主窗口
 root = tk.Tk()
 root.title("SQL Helper with AI!")
 root.geometry("1100x700")  # 增大窗口尺寸以适应新功能
 
-# 默认数据库连接配置
-db_config = {
-    'host': 'localhost',
-    'port': 3307,
-    'user': 'root',
-    'password': 'root',
-    'ai_api_key': '',
-    'ai_api_url': 'https://api.openai.com/v1/chat/completions',  # OpenAI API端点
-    'selected_model': 'gpt-4o-mini'  # 默认模型
-}
+# 数据库连接配置（默认值见 sqlhelper.config）
+db_config = dict(DEFAULT_CONFIG)
 
 # 全局变量
-conn = None
+pool = None  # 数据库连接池
+catalog = None  # 元数据目录，连接时创建
 current_db = None
 current_table = None
 show_structure = False  # 标志变量，False 表示显示表内容，True 表示显示表结构
 ai_context = ""  # 保存当前表结构信息
 current_ai_sql = ""  # 保存AI生成的SQL
 
+# 后台任务：数据库调用都在工作线程中执行，结果通过队列交回Tk主线程
+UI_POLL_INTERVAL = 16  # 轮询结果队列的间隔（毫秒），约60帧
+CHART_UPDATE_DELAY = 50  # 图表选项变化后等待多久再更新（毫秒），连续的修改只更新一次
+executor = DbExecutor()
+
+# 分页浏览状态
+page_state = {
+    'pk': [],            # 当前表的主键列，为空时退回 LIMIT/OFFSET 分页
+    'columns': [],       # 当前页的列名
+    'first_key': None,   # 当前页第一行的主键值
+    'last_key': None,    # 当前页最后一行的主键值
+    'offset': 0,         # 无主键时当前页的偏移量
+    'page': 1,           # 当前页码，跳转后未知时为 None
+    'has_prev': False,
+    'has_next': False,
+    'request': 0,        # 最近一次分页请求的序号，用于丢弃过期结果
+    'table': None        # 最近一次分页请求的 (库, 表)
+}
+pending_changes = None  # 当前表在表格中尚未提交的修改（ChangeSet），表没有主键时为 None
 
-# ---------------------------- AI 功能函数 ----------------------------
+# 多语句脚本的结果标签页
+MAX_RESULT_TABS = 20  # 最多为多少条语句单独显示结果，之后的结果集只统计行数
+script_tabs = []  # 上次执行脚本时添加的标签页
 
-def call_ai_api(user_input, table_structure):
-    """调用OpenAI API生成SQL"""
-    if not db_config['ai_api_key']:
-        messagebox.showerror("错误", "请先在设置中配置AI API Key")
-        return None
 
-    try:
-        headers = {
-            "Authorization": f"Bearer {db_config['ai_api_key']}",
-            "Content-Type": "application/json"
-        }
+# ---------------------------- 后台任务 ----------------------------
 
-        prompt = f"""
-        你是一个专业的SQL助手。请根据以下表结构和用户需求生成合适的MySQL查询语句。
+def poll_ui_queue():
+    """轮询后台线程投递的回调，保持Tk主循环不被阻塞"""
+    executor.poll()
+    root.after(UI_POLL_INTERVAL, poll_ui_queue)
 
-        表结构:
-        {table_structure}
 
-        用户需求: {user_input}
+def update_busy_state():
+    """根据正在运行的任务更新状态栏和取消按钮"""
+    if executor.running:
+        status_label.config(text=f"执行中（{len(executor.running)} 个任务）...")
+        cancel_button.config(state='normal')
+    else:
+        status_label.config(text="就绪")
+        cancel_button.config(state='disabled')
 
-        请只返回JSON格式的响应，包含以下字段:
-        - "sql": 生成的SQL语句
-        - "explanation": 对SQL的简要解释
-        """
 
-        data = {
-            "model": db_config['selected_model'],
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.3,
-            "response_format": {"type": "json_object"}
-        }
+def cancel_running_queries():
+    """取消正在执行的查询：通过另一条连接发送 KILL QUERY"""
+    if executor.cancel():
+        status_label.config(text="正在取消...")
 
-        response = requests.post(
-            db_config['ai_api_url'],
-            headers=headers,
-            data=json.dumps(data),
-            timeout=30
-        )
 
-        if response.status_code == 200:
-            result = response.json()
-            return result
-        else:
-            messagebox.showerror("错误", f"AI API调用失败: {response.text}")
+def show_task_error(task, error):
+    """没有单独处理的后台任务错误"""
+    messagebox.showerror("错误", f"数据库操作失败: {error}")
+
+
+def on_close():
+    """关闭窗口时取消后台查询"""
+    cancel_running_queries()
+    executor.shutdown()
+    if pool:
+        pool.close_all()
+    root.destroy()
+
+
+# ---------------------------- 结果表格 ----------------------------
+
+class VirtualGrid(tk.Frame):
+    """虚拟化结果表格
+
+    数据保存在 ResultBuffer 中，Treeview 里只有当前滚动到可见区域的几十行，
+    滚动时替换这些行，因此百万行结果也能流畅滚动，内存只与缓冲区有关。
+    显示表内容时可以关联一个 ChangeSet：双击单元格直接编辑，Delete 键标记删除，
+    修改只记录在 ChangeSet 中，新增的行显示在缓冲区之后。
+    """
+
+    def __init__(self, master, height=15, on_change=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.buffer = ResultBuffer([])
+        self.top = 0             # 可见区域第一行在缓冲区中的下标
+        self.visible = height    # 可见行数，随控件大小变化
+        self.selected = None     # 选中行在缓冲区中的下标（焦点行）
+        self.marked = set()      # 所有选中行的下标，包括滚动出可见区域的行
+        self.source = None       # 显示的是哪张表的数据 (库, 表)；查询结果、表结构等为 None
+        self.changes = None      # 未提交的修改（ChangeSet），为 None 时不可编辑
+        self.on_change = on_change
+        self.editor = None       # 正在编辑单元格时的输入框
+        self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+
+        self.view = ttk.Treeview(self, show="headings", height=height, selectmode="extended")
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.view.xview)
+        self.view.configure(xscrollcommand=self.hbar.set)
+        self.view.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.view.bind("<Configure>", self._on_resize)
+        self.view.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.view.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.view.bind("<Button-5>", lambda e: self.scroll(3))
+        self.view.bind("<Prior>", lambda e: self.scroll(-self.visible))
+        self.view.bind("<Next>", lambda e: self.scroll(self.visible))
+        self.view.bind("<Up>", lambda e: self._move_selection(-1))
+        self.view.bind("<Down>", lambda e: self._move_selection(1))
+        self.view.bind("<<TreeviewSelect>>", self._on_select)
+        self.view.bind("<Double-1>", self._begin_edit)
+        self.view.bind("<Delete>", lambda e: self.toggle_delete())
+        self.view.tag_configure("updated", background="#fff4c2")
+        self.view.tag_configure("inserted", background="#dcf5dc")
+        self.view.tag_configure("deleted", foreground="#a0a0a0", background="#f0f0f0")
+
+    def set_buffer(self, buffer, source=None, changes=None):
+        """显示新的结果，source 为数据所属的 (库, 表)，changes 为可编辑时的 ChangeSet"""
+        self._end_edit(False)
+        self.buffer = buffer
+        self.source = source
+        self.changes = changes
+        self.top = 0
+        self.selected = None
+        self.marked = set()
+        # 列名可能重复，用序号作为列ID
+        column_ids = [f"c{i}" for i in range(len(buffer.columns))]
+        self.view.configure(columns=column_ids)
+        sample = [buffer.row(i) for i in range(min(len(buffer), 100))]
+        for i, (column_id, name) in enumerate(zip(column_ids, buffer.columns)):
+            width = max([len(str(name))] + [len(format_cell(row[i], 40)) for row in sample])
+            self.view.heading(column_id, text=name)
+            self.view.column(column_id, width=min(width * 8 + 16, 320), stretch=False, anchor="w")
+        self._render()
+        if self.on_change:
+            self.on_change()
+
+    def show_message(self, text):
+        """用单列表格显示一条提示信息"""
+        self.set_buffer(ResultBuffer.from_rows(["消息"], [(text,)]))
+
+    def refresh(self):
+        """缓冲区追加数据后刷新可见区域和滚动条"""
+        self._render()
+
+    def selected_row(self):
+        """返回 (下标, 行数据)，没有选中行时返回 None"""
+        if self.selected is None or self.selected >= len(self.buffer):
             return None
+        return self.selected, self.buffer.row(self.selected)
 
-    except Exception as e:
-        messagebox.showerror("错误", f"调用AI API时出错: {e}")
-        return None
+    def selected_rows(self):
+        """返回所有选中的行（不含新增的行），按在缓冲区中的顺序"""
+        return [self.buffer.row(index) for index in sorted(self.marked) if index < len(self.buffer)]
+
+    def add_row(self):
+        """在末尾新增一个空行并滚动到该行"""
+        if self.changes is None:
+            return
+        index = len(self.buffer) + self.changes.add_insert()
+        self.selected = index
+        self.marked = {index}
+        self.top = index - self.visible + 1
+        self._changed()
+        self.view.focus(str(index))
+
+    def toggle_delete(self):
+        """标记或取消删除选中的行，新增的行直接移除"""
+        if self.changes is None or not self.marked:
+            return "break"
+        for index in sorted(self.marked, reverse=True):  # 从后往前移除新增的行，下标不受影响
+            if index < len(self.buffer):
+                self.changes.toggle_delete(self.buffer.row(index))
+            elif index - len(self.buffer) < len(self.changes.inserts):
+                self.changes.remove_insert(index - len(self.buffer))
+        self.marked = {index for index in self.marked if index < len(self.buffer)}
+        if self.selected not in self.marked:
+            self.selected = None
+        self._changed()
+        return "break"
+
+    def _changed(self):
+        self._render()
+        if self.on_change:
+            self.on_change()
+
+    def _total(self):
+        return len(self.buffer) + (len(self.changes.inserts) if self.changes is not None else 0)
+
+    def _row(self, index):
+        """返回 (显示的行, 标签)"""
+        if self.changes is None:
+            return self.buffer.row(index), ()
+        if index >= len(self.buffer):
+            return self.changes.inserted_row(index - len(self.buffer)), ("inserted",)
+        row, state = self.changes.view(self.buffer.row(index))
+        return row, (state,) if state else ()
+
+    def _begin_edit(self, event):
+        """双击单元格时在单元格上放一个输入框"""
+        if self.changes is None:
+            return
+        iid = self.view.identify_row(event.y)
+        column_id = self.view.identify_column(event.x)
+        if not iid or not column_id:
+            return
+        self._end_edit(True)
+        index, column = int(iid), int(column_id[1:]) - 1
+        row, tags = self._row(index)
+        if "deleted" in tags:
+            return
+        bbox = self.view.bbox(iid, column_id)
+        if not bbox:
+            return
+        x, y, width, height = bbox
+        self.editor = tk.Entry(self.view)
+        self.editor.insert(0, "NULL" if row[column] is None else str(row[column]))
+        self.editor.select_range(0, tk.END)
+        self.editor.place(x=x, y=y, width=width, height=height)
+        self.editor.focus_set()
+        self.editor.bind("<Return>", lambda e: self._end_edit(True))
+        self.editor.bind("<Escape>", lambda e: self._end_edit(False))
+        self.editor.bind("<FocusOut>", lambda e: self._end_edit(True))
+        self.editor.cell = (index, column)
+
+    def _end_edit(self, save):
+        """结束编辑，save 为 True 时把输入记录到 ChangeSet（输入 NULL 表示空值）"""
+        editor, self.editor = self.editor, None
+        if editor is None:
+            return
+        index, column = editor.cell
+        text = editor.get()
+        editor.destroy()
+        if not save or self.changes is None:
+            return
+        value = None if text == "NULL" else text
+        name = self.buffer.columns[column]
+        if index >= len(self.buffer):
+            self.changes.set_insert_value(index - len(self.buffer), name, value)
+        else:
+            self.changes.set_value(self.buffer.row(index), name, value)
+        self._changed()
+        self.view.focus_set()
+
+    def yview(self, *args):
+        """滚动条回调"""
+        self._end_edit(True)
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self._total())
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self.top += amount * self.visible if args[2] == "pages" else amount
+        self._render()
+
+    def scroll(self, rows):
+        self._end_edit(True)
+        self.top += rows
+        self._render()
+        return "break"
+
+    def _render(self):
+        """只为可见区域创建 Treeview 条目"""
+        total = self._total()
+        self.top = max(0, min(self.top, total - self.visible))
+        end = min(total, self.top + self.visible)
+        self.view.delete(*self.view.get_children())
+        for index in range(self.top, end):
+            row, tags = self._row(index)
+            self.view.insert("", "end", iid=str(index), values=[format_cell(value) for value in row], tags=tags)
+        visible_marked = [str(index) for index in self.marked if self.top <= index < end]
+        if visible_marked:
+            self.view.selection_set(visible_marked)
+        if total:
+            self.vbar.set(self.top / total, end / total)
+        else:
+            self.vbar.set(0, 1)
+
+    def _on_resize(self, event):
+        self._end_edit(True)
+        visible = max(1, (event.height - self.row_height) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_select(self, event):
+        """记录可见区域中的选择，可见区域之外之前选中的行保持不变"""
+        end = self.top + self.visible
+        selection = {int(iid) for iid in self.view.selection()}
+        self.marked = {index for index in self.marked if not self.top <= index < end} | selection
+        focus = self.view.focus()
+        if focus and int(focus) in selection:
+            self.selected = int(focus)
+        elif selection:
+            self.selected = min(selection)
+
+    def _move_selection(self, step):
+        """键盘移动选中行，到达可见区域边缘时滚动"""
+        index = (self.selected if self.selected is not None else self.top - 1) + step
+        if 0 <= index < self._total():
+            self.selected = index
+            self.marked = {index}
+            if index < self.top:
+                self.top = index
+            elif index >= self.top + self.visible:
+                self.top = index - self.visible + 1
+            self._render()
+            self.view.focus(str(index))
+        return "break"
 
 
+# ---------------------------- AI 功能函数 ----------------------------
+
 def generate_sql_with_ai():
     """使用AI生成SQL查询"""
-    global current_db, current_table, ai_context, current_ai_sql
-
     if not current_db or not current_table:
         messagebox.showwarning("警告", "请先选择一个表！")
         return
@@ -100,45 +352,47 @@ def generate_sql_with_ai():
         messagebox.showwarning("警告", "请输入你的需求描述！")
         return
 
-    # 获取表结构作为上下文
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"USE {current_db}")
-        cursor.execute(f"DESCRIBE {current_table}")
-        structure = cursor.fetchall()
+    if not db_config['ai_api_key']:
+        messagebox.showerror("错误", "请先在设置中配置AI API Key")
+        return
+
+    db_name, table_name = current_db, current_table
+    config = dict(db_config)
 
-        # 构建表结构描述
-        ai_context = f"表 {current_table} 的结构:\n"
-        for column in structure:
-            ai_context += f"- {column[0]}: {column[1]}, {'允许NULL' if column[2] == 'YES' else '非NULL'}, {column[3] or ''}\n"
+    # 从元数据目录获取表结构作为上下文
+    def fetch_structure(db_conn, task):
+        catalog.ensure(db_conn, db_name, table_name)
+        return build_ai_context(catalog, db_name, table_name)
+
+    def on_structure(context):
+        global ai_context
+        ai_context = context
 
         # 显示等待提示
         ai_output.config(state='normal')
         ai_output.delete(1.0, tk.END)
         ai_output.insert(tk.END, "正在生成SQL，请稍候...")
         ai_output.config(state='disabled')
-        root.update()  # 立即更新界面
 
-        # 调用AI API
-        response = call_ai_api(user_input, ai_context)
+        # 在后台调用AI API
+        executor.run_in_background(lambda: generate_sql(config, user_input, context), on_response,
+                                   lambda e: messagebox.showerror("错误", str(e)))
 
-        # 解析AI响应
-        if response and 'choices' in response:
-            current_ai_sql = response['choices'][0]['message']['content']
-            explanation = "根据您的需求生成了以下SQL语句。"
+    def on_response(sql):
+        global current_ai_sql
+        current_ai_sql = sql
+        explanation = "根据您的需求生成了以下SQL语句。"
 
-            ai_output.config(state='normal')
-            ai_output.delete(1.0, tk.END)
-            ai_output.insert(tk.END, f"生成的SQL:\n{current_ai_sql}\n\n解释:\n{explanation}")
-            ai_output.config(state='disabled')
+        ai_output.config(state='normal')
+        ai_output.delete(1.0, tk.END)
+        ai_output.insert(tk.END, f"生成的SQL:\n{current_ai_sql}\n\n解释:\n{explanation}")
+        ai_output.config(state='disabled')
 
-            # 启用执行按钮
-            execute_ai_button.config(state='normal')
-        else:
-            messagebox.showerror("错误", "无法从AI获取有效的SQL语句")
+        # 启用执行按钮
+        execute_ai_button.config(state='normal')
 
-    except Error as e:
-        messagebox.showerror("错误", f"获取表结构失败: {e}")
+    executor.submit(fetch_structure, on_structure,
+                    lambda e: messagebox.showerror("错误", f"获取表结构失败: {e}"))
 
 
 def execute_ai_sql():
@@ -150,7 +404,7 @@ def execute_ai_sql():
         return
 
     # 提取纯SQL语句
-    sql_to_execute = current_ai_sql.split('\n', 1)[0].strip()
+    sql_to_execute = extract_sql(current_ai_sql)
 
     # 确认执行
     confirm = messagebox.askyesno("确认", f"确定要执行以下SQL吗？\n\n{sql_to_execute}")
@@ -163,64 +417,141 @@ def execute_ai_sql():
 # ---------------------------- 数据库功能函数 ----------------------------
 
 def connect_db():
-    """连接数据库"""
-    global conn
-    try:
-        conn = mysql.connector.connect(
-            host=db_config['host'],
-            port=db_config['port'],
-            user=db_config['user'],
-            password=db_config['password']
-        )
-        if conn.is_connected():
+    """建立连接池并验证连接（在后台线程中执行）"""
+    global pool, catalog
+    pool = ConnectionPool(db_config['pool_size'], **connection_params(db_config))
+    executor.set_pool(pool)  # 后台并发数与连接池大小一致
+
+    catalog = Catalog()
+    load_cached_catalog()
+
+    def done(connected):
+        if connected:
             messagebox.showinfo("成功", "数据库连接成功！")
             load_databases()
         else:
             messagebox.showerror("错误", "数据库连接失败！")
-    except Error as e:
-        messagebox.showerror("错误", f"数据库连接失败: {e}")
+
+    executor.submit(lambda db_conn, task: db_conn.is_connected(), done,
+                   lambda e: messagebox.showerror("错误", f"数据库连接失败: {e}"))
 
 
 def close_db():
-    """关闭数据库连接"""
-    global conn
-    if conn and conn.is_connected():
-        conn.close()
-        conn = None
+    """关闭连接池"""
+    global pool, pending_changes
+    pending_changes = None  # 重新连接后可能是另一台服务器
+    if pool:
+        old_pool = pool
+        pool = None
+        executor.run_in_background(old_pool.close_all)
 
 
-def load_databases():
-    """加载所有数据库"""
-    if conn:
-        try:
-            # 清空当前树形结构
-            for item in tree.get_children():
-                tree.delete(item)
+def load_cached_catalog():
+    """从本地缓存加载元数据并立即显示树形结构，稍后由 load_catalog 在后台校验"""
+    server = server_key(db_config)
+    cache = CatalogCache(CATALOG_CACHE_PATH)
+    target = catalog
+
+    def done(databases):
+        # 服务器的数据库列表尚未返回时先显示缓存中的列表
+        if target is catalog and databases and not tree.get_children():
+            render_databases(databases)
+
+    executor.run_in_background(lambda: target.load_cache(cache, server), done,
+                               lambda e: print(f"读取元数据缓存失败: {e}"))
 
-            cursor = conn.cursor()
+
+def load_databases():
+    """加载所有数据库，表在展开节点时才加载"""
+    if pool:
+        def work(db_conn, task):
+            cursor = db_conn.cursor()
             cursor.execute("SHOW DATABASES")
-            databases = cursor.fetchall()
-            for db in databases:
-                db_name = db[0]
-                db_node = tree.insert("", "end", text=db_name, values=("DB",))
-                load_tables(db_node, db_name)
-        except Error as e:
-            messagebox.showerror("错误", f"加载数据库失败: {e}")
-
-
-def load_tables(db_node, db_name):
-    """加载数据库中的表"""
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"USE {db_name}")
-            cursor.execute("SHOW TABLES")
-            tables = cursor.fetchall()
-            for table in tables:
-                table_name = table[0]
-                tree.insert(db_node, "end", text=table_name, values=("Table",))
-        except Error as e:
-            messagebox.showerror("错误", f"加载表失败: {e}")
+            return [db[0] for db in cursor.fetchall()]
+
+        def done(databases):
+            render_databases(databases)
+            # 元数据可能已变化（例如执行了DDL），在后台校验并只重新加载变化的库
+            load_catalog(databases)
+
+        executor.submit(work, done, lambda e: messagebox.showerror("错误", f"加载数据库失败: {e}"))
+
+
+def render_databases(databases):
+    """显示数据库列表，已展开的数据库刷新后保持展开"""
+    opened = {tree.item(item, "text") for item in tree.get_children() if tree.item(item, "open")}
+    # 清空当前树形结构
+    for item in tree.get_children():
+        tree.delete(item)
+    for db_name in databases:
+        db_node = tree.insert("", "end", text=db_name, values=("DB",))
+        # 占位子节点，使数据库节点可以展开
+        tree.insert(db_node, "end", text="...", values=("Placeholder",))
+        if db_name in opened:
+            tree.item(db_node, open=True)
+            load_tables(db_node)
+
+
+def on_tree_open(event):
+    """展开数据库节点时加载其中的表"""
+    item = tree.focus()
+    if item and tree.item(item, "values") and tree.item(item, "values")[0] == "DB":
+        load_tables(item)
+
+
+def load_tables(db_node):
+    """加载数据库中的表，只在节点下仍是占位子节点时查询"""
+    children = tree.get_children(db_node)
+    if not children or tree.item(children[0], "values")[0] != "Placeholder":
+        return
+    tree.item(children[0], text="加载中...", values=("Loading",))
+    db_name = tree.item(db_node, "text")
+
+    def done(tables):
+        if not tree.exists(db_node):
+            return  # 加载期间树已刷新
+        tree.delete(*tree.get_children(db_node))
+        for table_name in tables:
+            tree.insert(db_node, "end", text=table_name, values=("Table",))
+
+    def failed(e):
+        if tree.exists(db_node):
+            # 恢复占位节点，下次展开时重试
+            tree.delete(*tree.get_children(db_node))
+            tree.insert(db_node, "end", text="...", values=("Placeholder",))
+        messagebox.showerror("错误", f"加载表失败: {e}")
+
+    if catalog.has_schema(db_name):
+        done(catalog.table_names(db_name))
+        return
+
+    def work(db_conn, task):
+        catalog.ensure(db_conn, db_name)
+        return catalog.table_names(db_name)
+
+    executor.submit(work, done, failed)
+
+
+def load_catalog(databases=None):
+    """在后台校验元数据：比较指纹，只重新加载发生变化的库，并写回本地缓存"""
+    server = server_key(db_config)
+    cache = CatalogCache(CATALOG_CACHE_PATH)
+    target = catalog
+
+    def work(db_conn, task):
+        return target.revalidate(db_conn.cursor(), cache, server, databases)
+
+    def done(changed):
+        if target is not catalog:
+            return
+        # 刷新已展开且发生变化的库
+        for db_node in tree.get_children():
+            if tree.item(db_node, "open") and tree.item(db_node, "text") in changed:
+                tree.delete(*tree.get_children(db_node))
+                tree.insert(db_node, "end", text="...", values=("Placeholder",))
+                load_tables(db_node)
+
+    executor.submit(work, done, lambda e: print(f"加载元数据失败: {e}"))
 
 
 def show_table_data_or_structure(event):
@@ -229,8 +560,11 @@ def show_table_data_or_structure(event):
     selected_item = tree.selection()[0]
     item_type = tree.item(selected_item, "values")[0]
     if item_type == "Table":
-        current_db = tree.item(tree.parent(selected_item), "text")
-        current_table = tree.item(selected_item, "text")
+        db_name = tree.item(tree.parent(selected_item), "text")
+        table_name = tree.item(selected_item, "text")
+        if not discard_changes((db_name, table_name)):
+            return
+        current_db, current_table = db_name, table_name
         refresh_table_display()
 
         # 更新AI区域的上下文提示
@@ -246,38 +580,225 @@ def refresh_table_display():
             show_table_data()
 
 
+def fetch_table_page(mode="first", key=None):
+    """获取表的一页数据，只取当前可见窗口，与表的总行数无关"""
+    if not pool:
+        return
+    db_name, table_name = current_db, current_table
+
+    pk_columns = page_state['pk']
+    if mode == "next":
+        key, offset = page_state['last_key'], page_state['offset'] + PAGE_SIZE
+    elif mode == "prev":
+        key, offset = page_state['first_key'], max(page_state['offset'] - PAGE_SIZE, 0)
+    elif mode == "jump" and not pk_columns:
+        offset = key  # 无主键时跳转到指定行号
+    else:
+        offset = 0
+
+    def work(db_conn, task):
+        return fetch_page(db_conn, catalog, db_name, table_name, mode, pk_columns, key, offset, PAGE_SIZE)
+
+    page_state['request'] += 1
+    page_state['table'] = (db_name, table_name)
+    request = page_state['request']
+    executor.submit(work, lambda page: show_page(request, mode, offset, page),
+                    lambda e: messagebox.showerror("错误", f"获取表内容失败: {e}"))
+
+
+def show_page(request, mode, offset, page):
+    """在主线程中显示取回的一页数据并更新分页状态"""
+    if request != page_state['request']:
+        return  # 已有更新的分页请求，多个任务并发时结果可能乱序到达
+
+    pk_columns, columns, rows, has_more = page['pk'], page['columns'], page['rows'], page['has_more']
+    page_state['pk'] = pk_columns
+
+    if not rows and mode in ("next", "prev"):
+        # 已经到头，保持当前页不变
+        page_state['has_next' if mode == "next" else 'has_prev'] = False
+        update_pager()
+        return
+
+    if mode == "first":
+        page_state.update(page=1, has_prev=False, has_next=has_more)
+    elif mode == "next":
+        page_state.update(page=page_state['page'] and page_state['page'] + 1, has_prev=True, has_next=has_more)
+    elif mode == "prev":
+        page = page_state['page'] and page_state['page'] - 1
+        page_state.update(page=page, has_prev=has_more if pk_columns else offset > 0, has_next=True)
+    else:
+        page_state.update(page=None if pk_columns else offset // PAGE_SIZE + 1,
+                          has_prev=offset > 0 if not pk_columns else True, has_next=has_more)
+
+    page_state['columns'] = columns
+    page_state['offset'] = max(offset, 0)
+    if pk_columns and rows:
+        key_indexes = [columns.index(c) for c in pk_columns]
+        page_state['first_key'] = tuple(rows[0][i] for i in key_indexes)
+        page_state['last_key'] = tuple(rows[-1][i] for i in key_indexes)
+
+    # 修改按主键记录，翻页、刷新后继续显示在对应的行上
+    global pending_changes
+    if not pk_columns:
+        pending_changes = None
+    elif pending_changes is None or pending_changes.source != page_state['table']:
+        pending_changes = ChangeSet(*page_state['table'], columns, pk_columns)
+
+    result_tabs.select(result_grid)
+    if rows or pending_changes is not None:
+        result_grid.set_buffer(ResultBuffer.from_rows(columns, rows, page['description']), page_state['table'],
+                               pending_changes)
+    else:
+        result_grid.show_message("表为空。")
+    update_pager()
+
+
+def update_pager():
+    """刷新分页按钮和页码显示"""
+    prev_button.config(state='normal' if page_state['has_prev'] else 'disabled')
+    next_button.config(state='normal' if page_state['has_next'] else 'disabled')
+    jump_button.config(state='normal' if current_table else 'disabled')
+    page = page_state['page']
+    mode_text = "键集分页" if page_state['pk'] else "偏移分页"
+    page_label.config(text=f"第 {page} 页（{mode_text}）" if page else f"自指定位置起（{mode_text}）")
+
+
+def update_pending():
+    """刷新未提交修改的数量和相关按钮"""
+    editable = result_grid.changes is not None
+    count = len(pending_changes) if pending_changes else 0
+    add_row_button.config(state='normal' if editable else 'disabled')
+    commit_button.config(state='normal' if count else 'disabled')
+    discard_button.config(state='normal' if count else 'disabled')
+    if pending_changes is None:
+        pending_label.config(text="")
+    else:
+        pending_label.config(text=f"未提交的修改: {count}" if count else "双击单元格编辑，Delete 键标记删除")
+
+
+def discard_changes(source=None):
+    """切换到其他表（或放弃修改）前确认，返回是否可以继续"""
+    global pending_changes
+    if not pending_changes or pending_changes.source == source:
+        return True
+    db_name, table_name = pending_changes.source
+    if not messagebox.askyesno("未提交的修改",
+                               f"{db_name}.{table_name} 有 {len(pending_changes)} 处修改尚未提交，确定放弃吗？"):
+        return False
+    pending_changes = None
+    return True
+
+
+def discard_pending_changes():
+    """放弃表格中所有未提交的修改"""
+    if pending_changes and discard_changes():
+        refresh_table_display()
+
+
+def commit_pending_changes():
+    """显示修改内容，确认后在一个事务中提交"""
+    changes = pending_changes
+    if not changes:
+        return
+
+    diff_window = tk.Toplevel(root)
+    diff_window.title(f"提交修改 - {changes.source[0]}.{changes.source[1]}")
+    diff_window.geometry("600x400")
+    diff_window.grab_set()  # 提交完成前不能继续编辑表格
+
+    text_frame = tk.Frame(diff_window)
+    text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    diff_text = tk.Text(text_frame, wrap="none")
+    diff_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=diff_text.yview)
+    diff_text.configure(yscrollcommand=diff_scrollbar.set)
+    diff_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    diff_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    diff_text.insert("1.0", "\n".join(changes.diff()))
+    diff_text.config(state='disabled')
+
+    def perform_commit():
+        def work(db_conn, task):
+            return apply_changes(db_conn, changes)
+
+        def done(counts):
+            deleted, updated, inserted = counts
+            changes.clear()
+            if diff_window.winfo_exists():
+                diff_window.destroy()
+            messagebox.showinfo("成功", f"已提交：删除 {deleted} 行，更新 {updated} 行，插入 {inserted} 行。")
+            refresh_table_display()
+
+        def failed(e):
+            if diff_window.winfo_exists():
+                commit_confirm_button.config(state='normal')
+            messagebox.showerror("错误", f"提交失败，所有修改已回滚: {e}")
+
+        commit_confirm_button.config(state='disabled')
+        executor.submit(work, done, failed)
+
+    buttons = tk.Frame(diff_window)
+    buttons.pack(pady=5)
+    commit_confirm_button = tk.Button(buttons, text="提交", command=perform_commit)
+    commit_confirm_button.grid(row=0, column=0, padx=5)
+    tk.Button(buttons, text="取消", command=diff_window.destroy).grid(row=0, column=1, padx=5)
+
+
+def next_page():
+    """下一页"""
+    fetch_table_page("next")
+
+
+def prev_page():
+    """上一页"""
+    fetch_table_page("prev")
+
+
+def jump_to_key():
+    """跳转到指定主键（无主键时跳转到指定行号）"""
+    if not current_db or not current_table:
+        messagebox.showwarning("警告", "请先选择一个表！")
+        return
+
+    if page_state['pk']:
+        value = simpledialog.askstring(
+            "跳转", f"请输入主键 {', '.join(page_state['pk'])} 的值（复合主键用逗号分隔）：")
+        if not value:
+            return
+        key = tuple(v.strip() for v in value.split(","))
+        if len(key) != len(page_state['pk']):
+            messagebox.showwarning("警告", "主键值的个数与主键列不一致！")
+            return
+        fetch_table_page("jump", key)
+    else:
+        row = simpledialog.askinteger("跳转", "该表没有主键，请输入起始行号（从 0 开始）：", minvalue=0)
+        if row is None:
+            return
+        fetch_table_page("jump", row)
+
+
 def show_table_data():
-    """显示表内容"""
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"USE {current_db}")
-            cursor.execute(f"SELECT * FROM {current_table}")
-            result = cursor.fetchall()
-            if result:
-                df = pd.DataFrame(result, columns=cursor.column_names)
-                result_text.delete(1.0, tk.END)
-                result_text.insert(tk.END, df.to_string())
-            else:
-                result_text.delete(1.0, tk.END)
-                result_text.insert(tk.END, "表为空。")
-        except Error as e:
-            messagebox.showerror("错误", f"获取表内容失败: {e}")
+    """显示表内容（第一页）"""
+    fetch_table_page("first")
+
+
+def describe_table(db_name, table_name):
+    """返回在工作线程中从元数据目录读取表结构的任务函数"""
+    def work(db_conn, task):
+        catalog.ensure(db_conn, db_name, table_name)
+        return catalog.describe(db_name, table_name)
+    return work
 
 
 def show_table_structure():
     """显示表结构"""
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"USE {current_db}")
-            cursor.execute(f"DESCRIBE {current_table}")
-            result = cursor.fetchall()
-            df = pd.DataFrame(result, columns=["Field", "Type", "Null", "Key", "Default", "Extra"])
-            result_text.delete(1.0, tk.END)
-            result_text.insert(tk.END, df.to_string())
-        except Error as e:
-            messagebox.showerror("错误", f"获取表结构失败: {e}")
+    if pool:
+        def done(result):
+            result_tabs.select(result_grid)
+            result_grid.set_buffer(ResultBuffer.from_rows(["Field", "Type", "Null", "Key", "Default", "Extra"], result))
+
+        executor.submit(describe_table(current_db, current_table), done,
+                       lambda e: messagebox.showerror("错误", f"获取表结构失败: {e}"))
 
 
 def toggle_display():
@@ -294,17 +815,16 @@ def insert_data():
         messagebox.showwarning("警告", "请先选择一个表！")
         return
 
+    db_name, table_name = current_db, current_table
+
     # 获取表结构
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"USE {current_db}")
-        cursor.execute(f"DESCRIBE {current_table}")
-        columns = cursor.fetchall()
-    except Error as e:
-        messagebox.showerror("错误", f"获取表结构失败: {e}")
-        return
+    executor.submit(describe_table(db_name, table_name),
+                   lambda columns: open_insert_window(db_name, table_name, columns),
+                   lambda e: messagebox.showerror("错误", f"获取表结构失败: {e}"))
 
-    # 弹出输入对话框
+
+def open_insert_window(db_name, table_name, columns):
+    """弹出插入数据对话框"""
     insert_window = tk.Toplevel(root)
     insert_window.title("插入数据")
     insert_window.geometry("400x300")
@@ -319,134 +839,632 @@ def insert_data():
         entry.grid(row=i, column=1, padx=10, pady=5)
         entries[field_name] = entry
 
-    # 插入数据
+    # 插入数据（参数化，值不会被当作SQL解析）
     def perform_insert():
-        try:
-            cursor = conn.cursor()
-            columns_str = ", ".join(entries.keys())
-            values_str = ", ".join([f"'{entry.get()}'" for entry in entries.values()])
-            query = f"INSERT INTO {current_table} ({columns_str}) VALUES ({values_str})"
-            cursor.execute(query)
-            conn.commit()
+        names = list(entries.keys())
+        row = [entry.get() for entry in entries.values()]
+
+        def work(db_conn, task):
+            return insert_rows(db_conn, db_name, table_name, names, [row])
+
+        def done(_):
             messagebox.showinfo("成功", "数据插入成功！")
             insert_window.destroy()
             refresh_table_display()
-        except Error as e:
-            messagebox.showerror("错误", f"插入数据失败: {e}")
 
-    insert_button = tk.Button(insert_window, text="插入", command=perform_insert)
-    insert_button.grid(row=len(columns), column=0, columnspan=2, pady=10)
+        executor.submit(work, done, lambda e: messagebox.showerror("错误", f"插入数据失败: {e}"))
 
+    insert_button = tk.Button(insert_window, text="插入", command=perform_insert)
+    insert_button.grid(row=len(columns), column=0, pady=10)
+
+    bulk_button = tk.Button(insert_window, text="批量插入...",
+                            command=lambda: open_bulk_insert_window(db_name, table_name, list(entries.keys())))
+    bulk_button.grid(row=len(columns), column=1, pady=10)
+
+
+def open_bulk_insert_window(db_name, table_name, table_columns):
+    """批量插入对话框：粘贴表格内容或选择CSV文件，分组发送多行INSERT，在一个事务中提交"""
+    bulk_window = tk.Toplevel(root)
+    bulk_window.title(f"批量插入 - {table_name}")
+    bulk_window.geometry("600x450")
+
+    tk.Label(bulk_window, text=f"粘贴数据（制表符或逗号分隔），列顺序: {', '.join(table_columns)}",
+             wraplength=560, justify="left").pack(padx=10, pady=5, anchor="w")
+    data_text = tk.Text(bulk_window, height=12, width=70)
+    data_text.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+    source = {'path': None}  # 选择了文件时从文件逐行读取，不载入文本框
+    file_label = tk.Label(bulk_window, text="")
+    file_label.pack(padx=10, anchor="w")
+
+    options_frame = tk.Frame(bulk_window)
+    options_frame.pack(pady=5)
+    header_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(options_frame, text="第一行是列名", variable=header_var).grid(row=0, column=0, padx=5)
+    null_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(options_frame, text="空值作为 NULL", variable=null_var).grid(row=0, column=1, padx=5)
+
+    progress = tk.Label(bulk_window, text="")
+    progress.pack(pady=5)
+
+    def set_progress(text):
+        if bulk_window.winfo_exists():  # 窗口关闭后任务仍可能投递进度
+            progress.config(text=text)
+
+    def choose_file():
+        path = filedialog.askopenfilename(parent=bulk_window, title="选择CSV文件",
+                                          filetypes=[("CSV 文件", "*.csv *.tsv *.txt"), ("所有文件", "*.*")])
+        if path:
+            source['path'] = path
+            file_label.config(text=f"文件: {path}")
+            data_text.delete("1.0", tk.END)
+            data_text.config(state='disabled')
+
+    def perform_bulk_insert():
+        path = source['path']
+        text = None if path else data_text.get("1.0", tk.END)
+        if not path and not text.strip():
+            messagebox.showwarning("警告", "请粘贴数据或选择文件！", parent=bulk_window)
+            return
+        header, empty_as_null = header_var.get(), null_var.get()
+
+        def work(db_conn, task):
+            with (open(path, newline="", encoding="utf-8-sig") if path else io.StringIO(text)) as stream:
+                names, rows = read_delimited(stream, header, empty_as_null)
+                if names:
+                    unknown = [name for name in names if name not in table_columns]
+                    if unknown:
+                        raise ValueError(f"表中没有这些列: {', '.join(unknown)}")
+                return insert_rows(
+                    db_conn, db_name, table_name, names or table_columns, rows,
+                    on_progress=lambda inserted, elapsed: task.post(
+                        set_progress, f"已插入 {inserted} 行，{inserted / max(elapsed, 1e-6):.0f} 行/秒"),
+                    should_stop=task.cancelled.is_set
+                )
 
-def update_data():
+        def done(inserted):
+            refresh_table_display()
+            if bulk_window.winfo_exists():
+                start_button.config(state='normal')
+                set_progress(f"完成，共插入 {inserted} 行")
+                messagebox.showinfo("成功", f"已插入 {inserted} 行！", parent=bulk_window)
+
+        def failed(e):
+            if bulk_window.winfo_exists():
+                start_button.config(state='normal')
+                set_progress("插入失败，已回滚")
+            messagebox.showerror("错误", f"批量插入失败: {e}")
+
+        def cancelled(e):
+            if bulk_window.winfo_exists():
+                start_button.config(state='normal')
+                set_progress("已取消，已回滚")
+
+        start_button.config(state='disabled')
+        task = executor.submit(work, done, failed, cancelled)
+        bulk_window.bind("<Destroy>", lambda e: e.widget is bulk_window and executor.cancel([task]))
+
+    button_frame = tk.Frame(bulk_window)
+    button_frame.pack(pady=5)
+    tk.Button(button_frame, text="选择文件...", command=choose_file).grid(row=0, column=0, padx=5)
+    start_button = tk.Button(button_frame, text="开始插入", command=perform_bulk_insert)
+    start_button.grid(row=0, column=1, padx=5)
+
+
+def import_data():
+    """导入 CSV/TSV 文件到当前表"""
     if not current_db or not current_table:
         messagebox.showwarning("警告", "请先选择一个表！")
         return
 
-    # 获取表数据
+    path = filedialog.askopenfilename(title="选择要导入的文件",
+                                      filetypes=[("CSV/TSV 文件", "*.csv *.tsv *.txt"), ("所有文件", "*.*")])
+    if not path:
+        return
+
+    db_name, table_name = current_db, current_table
+    executor.submit(describe_table(db_name, table_name),
+                   lambda columns: open_import_window(db_name, table_name, [c[0] for c in columns], path),
+                   lambda e: messagebox.showerror("错误", f"获取表结构失败: {e}"))
+
+
+def open_import_window(db_name, table_name, table_columns, path):
+    """导入向导：按列名对应文件列和表列，服务器允许时用 LOAD DATA LOCAL INFILE，否则并发多行 INSERT"""
     try:
-        cursor = conn.cursor()
-        cursor.execute(f"USE {current_db}")
-        cursor.execute(f"SELECT * FROM {current_table}")
-        result = cursor.fetchall()
-        if not result:
-            messagebox.showwarning("警告", "表中没有数据！")
-            return
-    except Error as e:
-        messagebox.showerror("错误", f"获取表数据失败: {e}")
+        delimiter, _line_end, _bom, first_fields = inspect_file(path)
+    except (OSError, UnicodeError) as e:
+        messagebox.showerror("错误", f"无法读取文件: {e}")
         return
 
-    # 弹出选择行对话框
-    selected_row = simpledialog.askinteger("选择行", "请输入要更新的行号（从 0 开始）：")
-    if selected_row is None or selected_row < 0 or selected_row >= len(result):
-        messagebox.showwarning("警告", "无效的行号！")
+    import_window = tk.Toplevel(root)
+    import_window.title(f"导入到 {table_name}")
+    import_window.geometry("520x560")
+
+    tk.Label(import_window, text=f"文件: {path}", wraplength=480, justify="left").pack(padx=10, pady=5, anchor="w")
+    tk.Label(import_window, text=f"分隔符: {'制表符' if delimiter == chr(9) else '逗号'}，共 {len(first_fields)} 列"
+             ).pack(padx=10, anchor="w")
+
+    # 第一行与表列名有重合时认为是列名行
+    header_var = tk.BooleanVar(value=any(mapped for mapped in map_columns(first_fields, table_columns)))
+    null_var = tk.BooleanVar(value=True)
+    load_data_var = tk.BooleanVar(value=True)
+    options_frame = tk.Frame(import_window)
+    options_frame.pack(pady=5)
+    tk.Checkbutton(options_frame, text="第一行是列名", variable=header_var,
+                   command=lambda: build_mapping()).grid(row=0, column=0, padx=5)
+    tk.Checkbutton(options_frame, text="空值作为 NULL", variable=null_var).grid(row=0, column=1, padx=5)
+    tk.Checkbutton(options_frame, text="优先使用 LOAD DATA", variable=load_data_var).grid(row=0, column=2, padx=5)
+
+    tk.Label(import_window, text="列对应关系:").pack(padx=10, anchor="w")
+    mapping_frame = tk.Frame(import_window)
+    mapping_frame.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+    skip_text = "(跳过)"
+    mapping_vars = []
+
+    def build_mapping():
+        """根据是否有列名行重新生成对应关系"""
+        for widget in mapping_frame.winfo_children():
+            widget.destroy()
+        mapping_vars.clear()
+        if header_var.get():
+            names = first_fields
+            targets = map_columns(first_fields, table_columns)
+        else:
+            names = [f"第 {i + 1} 列" for i in range(len(first_fields))]
+            targets = (map_columns(None, table_columns) + [None] * len(first_fields))[:len(first_fields)]
+        for i, (name, target) in enumerate(zip(names, targets)):
+            tk.Label(mapping_frame, text=name).grid(row=i, column=0, padx=5, pady=2, sticky="w")
+            var = tk.StringVar(value=target or skip_text)
+            ttk.Combobox(mapping_frame, textvariable=var, values=[skip_text] + table_columns,
+                         state="readonly").grid(row=i, column=1, padx=5, pady=2)
+            mapping_vars.append(var)
+
+    build_mapping()
+
+    progress_bar = ttk.Progressbar(import_window, length=460, maximum=1000)
+    progress_bar.pack(padx=10, pady=5)
+    progress = tk.Label(import_window, text="")
+    progress.pack(pady=5)
+
+    def alive():
+        return import_window.winfo_exists()  # 窗口关闭后任务仍可能投递进度
+
+    def on_start(method, total_bytes):
+        if not alive():
+            return
+        if method == 'load_data':
+            # LOAD DATA 是一条语句，执行期间没有进度
+            progress_bar.config(mode="indeterminate")
+            progress_bar.start(20)
+            progress.config(text="正在通过 LOAD DATA LOCAL INFILE 导入...")
+        else:
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=max(total_bytes, 1), value=0)
+            progress.config(text="服务器不允许 LOAD DATA LOCAL INFILE，使用并发多行 INSERT 导入...")
+
+    def on_progress(rows, bytes_read, elapsed):
+        if alive():
+            progress_bar.config(value=bytes_read)
+            progress.config(text=f"已导入 {rows} 行，{rows / max(elapsed, 1e-6):.0f} 行/秒，"
+                                 f"{bytes_read / max(elapsed, 1e-6) / 1048576:.1f} MB/秒")
+
+    def perform_import():
+        mapping = [None if var.get() == skip_text else var.get() for var in mapping_vars]
+        if not any(mapping):
+            messagebox.showwarning("警告", "至少需要对应一列！", parent=import_window)
+            return
+        targets = [column for column in mapping if column]
+        if len(set(targets)) != len(targets):
+            messagebox.showwarning("警告", "多个文件列对应到了同一个表列！", parent=import_window)
+            return
+        header, empty_as_null, prefer_load_data = header_var.get(), null_var.get(), load_data_var.get()
+        target_pool = pool
+
+        def work(db_conn, task):
+            return import_file(
+                target_pool, db_name, table_name, path, mapping, header, empty_as_null,
+                own_conn=db_conn, prefer_local_infile=prefer_load_data,
+                on_start=lambda method, total: task.post(on_start, method, total),
+                on_progress=lambda rows, done_bytes, elapsed: task.post(on_progress, rows, done_bytes, elapsed),
+                on_connect=lambda connection_id: setattr(task, 'connection_id', connection_id),
+                should_stop=task.cancelled.is_set
+            )
+
+        def done(result):
+            refresh_table_display()
+            if not alive():
+                return
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", maximum=1, value=1)
+            method = "LOAD DATA" if result.method == 'load_data' else "多行 INSERT"
+            warnings = f"，{result.warnings} 个警告" if result.warnings else ""
+            progress.config(text=f"完成（{method}）：{result.rows} 行，用时 {result.elapsed:.1f} 秒，"
+                                 f"{result.rows / max(result.elapsed, 1e-6):.0f} 行/秒{warnings}")
+            start_button.config(state='normal')
+
+        def failed(e):
+            if alive():
+                progress_bar.stop()
+                committed = getattr(e, 'committed', 0)
+                progress.config(text=f"导入失败，已提交 {committed} 行，导入不完整" if committed
+                                else "导入失败，未提交的数据已回滚")
+                start_button.config(state='normal')
+            messagebox.showerror("错误", f"导入失败: {e}")
+
+        def cancelled(e):
+            refresh_table_display()
+            if alive():
+                progress_bar.stop()
+                committed = getattr(e, 'committed', 0)
+                progress.config(text=f"已取消，已提交 {committed} 行，导入不完整" if committed
+                                else "已取消，未提交的数据已回滚")
+                start_button.config(state='normal')
+
+        start_button.config(state='disabled')
+        task = executor.submit(work, done, failed, cancelled)
+        import_window.bind("<Destroy>", lambda e: e.widget is import_window and executor.cancel([task]))
+
+    start_button = tk.Button(import_window, text="开始导入", command=perform_import)
+    start_button.pack(pady=10)
+
+
+def export_data():
+    """把当前表或查询结果流式导出到文件"""
+    query = query_entry.get("1.0", tk.END).strip()
+    statements = split_statements(query) if query else []
+    if not current_table and len(statements) != 1:
+        messagebox.showwarning("警告", "请先选择一个表，或在查询框中输入一条查询语句！")
         return
 
-    # 获取表结构
-    try:
-        cursor.execute(f"DESCRIBE {current_table}")
-        columns = cursor.fetchall()
-    except Error as e:
-        messagebox.showerror("错误", f"获取表结构失败: {e}")
+    db_name, table_name = current_db, current_table
+    export_window = tk.Toplevel(root)
+    export_window.title("导出数据")
+    export_window.geometry("460x380")
+
+    source_var = tk.StringVar(value="table" if table_name else "query")
+    tk.Radiobutton(export_window, text=f"当前表: {table_name or '无'}", variable=source_var, value="table",
+                   state='normal' if table_name else 'disabled').grid(row=0, column=0, columnspan=2,
+                                                                       padx=10, pady=5, sticky="w")
+    tk.Radiobutton(export_window, text="查询框中的语句", variable=source_var, value="query",
+                   state='normal' if len(statements) == 1 else 'disabled').grid(row=1, column=0, columnspan=2,
+                                                                               padx=10, pady=5, sticky="w")
+
+    tk.Label(export_window, text="格式:").grid(row=2, column=0, padx=10, pady=5, sticky="e")
+    format_var = tk.StringVar(value="csv")
+    ttk.Combobox(export_window, textvariable=format_var, values=list(EXPORT_FORMATS),
+                 state="readonly").grid(row=2, column=1, padx=10, pady=5, sticky="w")
+    tk.Label(export_window, text="压缩:").grid(row=3, column=0, padx=10, pady=5, sticky="e")
+    compression_var = tk.StringVar(value="无")
+    ttk.Combobox(export_window, textvariable=compression_var, values=["无"] + list(COMPRESSIONS),
+                 state="readonly").grid(row=3, column=1, padx=10, pady=5, sticky="w")
+
+    # 并发分段导出：按整数主键范围分段，多条连接同时读取
+    parallel_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(export_window, text="按主键范围并发导出（仅整张表）", variable=parallel_var
+                   ).grid(row=4, column=0, columnspan=2, padx=10, pady=2, sticky="w")
+    tk.Label(export_window, text="并发连接数:").grid(row=5, column=0, padx=10, pady=2, sticky="e")
+    workers_var = tk.IntVar(value=max(pool.size - 1, 1) if pool else 1)
+    tk.Spinbox(export_window, from_=1, to=64, textvariable=workers_var, width=6
+               ).grid(row=5, column=1, padx=10, pady=2, sticky="w")
+    ordered_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(export_window, text="按主键顺序合并为一个文件（否则保留分段文件）", variable=ordered_var
+                   ).grid(row=6, column=0, columnspan=2, padx=10, pady=2, sticky="w")
+    lock_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(export_window, text="建立快照时短暂加读锁，保证各连接数据一致", variable=lock_var
+                   ).grid(row=7, column=0, columnspan=2, padx=10, pady=2, sticky="w")
+
+    progress = tk.Label(export_window, text="")
+    progress.grid(row=9, column=0, columnspan=2, pady=5)
+
+    def set_progress(text):
+        if export_window.winfo_exists():  # 窗口关闭后任务仍可能投递进度
+            progress.config(text=text)
+
+    def perform_export():
+        fmt = format_var.get()
+        compression = None if compression_var.get() == "无" else compression_var.get()
+        from_table = source_var.get() == "table"
+        parallel = from_table and parallel_var.get()
+        try:
+            workers = max(int(workers_var.get()), 1)
+        except (ValueError, tk.TclError):
+            messagebox.showwarning("警告", "并发连接数必须是整数！", parent=export_window)
+            return
+        ordered, lock_tables = ordered_var.get(), lock_var.get()
+        target_pool = pool
+        extension = export_extension(fmt, compression)
+        path = filedialog.asksaveasfilename(parent=export_window, defaultextension=extension,
+                                            initialfile=(table_name if from_table else "query") + extension,
+                                            filetypes=[(f"{fmt} 文件", "*" + extension), ("所有文件", "*.*")])
+        if not path:
+            return
+
+        def work(db_conn, task):
+            def on_progress(rows, elapsed):
+                task.post(set_progress, f"已导出 {rows} 行，{rows / max(elapsed, 1e-6):.0f} 行/秒")
+
+            if parallel:
+                catalog.ensure(db_conn, db_name, table_name)
+                key_column = catalog.integer_key(db_name, table_name)
+                if key_column:
+                    rows, _paths = export_table_parallel(
+                        target_pool, db_name, table_name, key_column, path, fmt, compression, workers,
+                        ordered, lock_tables, own_conn=db_conn, on_progress=on_progress,
+                        should_stop=task.cancelled.is_set)
+                    return rows
+                task.post(set_progress, "该表没有整数主键，改为单连接导出...")
+            if from_table:
+                return export_table(db_conn, db_name, table_name, path, fmt, compression,
+                                    on_progress=on_progress, should_stop=task.cancelled.is_set)
+            return export_query(db_conn, statements[0], path, fmt, compression, database=db_name,
+                                on_progress=on_progress, should_stop=task.cancelled.is_set)
+
+        start = time.perf_counter()
+
+        def done(rows):
+            if export_window.winfo_exists():
+                start_button.config(state='normal')
+            elapsed = time.perf_counter() - start
+            set_progress(f"完成：{rows} 行，用时 {elapsed:.1f} 秒，{rows / max(elapsed, 1e-6):.0f} 行/秒")
+
+        def failed(e):
+            if export_window.winfo_exists():
+                start_button.config(state='normal')
+                set_progress("导出失败")
+            messagebox.showerror("错误", f"导出失败: {e}")
+
+        def cancelled(e):
+            if export_window.winfo_exists():
+                start_button.config(state='normal')
+                set_progress("导出已取消，不完整的文件已删除")
+
+        start_button.config(state='disabled')
+        task = executor.submit(work, done, failed, cancelled)
+        export_window.bind("<Destroy>", lambda e: e.widget is export_window and executor.cancel([task]))
+
+    start_button = tk.Button(export_window, text="导出...", command=perform_export)
+    start_button.grid(row=8, column=0, columnspan=2, pady=10)
+
+
+def selected_table_row(action):
+    """返回结果表格中选中的行 (列名, 行)；没有选中当前表的行时提示并返回 None"""
+    if not current_db or not current_table:
+        messagebox.showwarning("警告", "请先选择一个表！")
+        return None
+    selection = result_grid.selected_row()
+    if result_grid.source != (current_db, current_table) or selection is None:
+        messagebox.showwarning("警告", f"请先在表内容中选中要{action}的行！")
+        return None
+    return result_grid.buffer.columns, selection[1]
+
+
+def locate_row(db_name, table_name, columns, row):
+    """返回在工作线程中按主键重新读取选中行的任务函数，结果为 (主键列, 主键值, 列名, 行)"""
+    def work(db_conn, task):
+        catalog.ensure(db_conn, db_name, table_name)
+        key_columns = catalog.primary_key(db_name, table_name)
+        if not key_columns:
+            raise ValueError("该表没有主键或非空唯一索引，无法定位行")
+        key = key_values(columns, row, key_columns)
+        if key is None:
+            raise ValueError("结果中缺少主键列")
+        fresh_columns, fresh_row = fetch_row(db_conn, db_name, table_name, key_columns, key)
+        if fresh_row is None:
+            raise ValueError("该行已被删除或主键已被修改，请刷新")
+        return key_columns, key, fresh_columns, fresh_row
+    return work
+
+
+def update_data():
+    selection = selected_table_row("更新")
+    if selection is None:
         return
 
-    # 弹出更新对话框
+    db_name, table_name = current_db, current_table
+
+    # 按主键读取选中行的最新数据（一次索引查找）
+    executor.submit(locate_row(db_name, table_name, *selection),
+                   lambda data: open_update_window(db_name, table_name, *data),
+                   lambda e: messagebox.showerror("错误", f"获取行数据失败: {e}"))
+
+
+def open_update_window(db_name, table_name, key_columns, key, columns, row):
+    """弹出更新数据对话框，只提交修改过的列"""
     update_window = tk.Toplevel(root)
     update_window.title("更新数据")
     update_window.geometry("400x300")
 
     entries = {}
-    for i, column in enumerate(columns):
-        field_name = column[0]
-        field_type = column[1]
-        label = tk.Label(update_window, text=f"{field_name} ({field_type}):")
+    original = {}
+    for i, field_name in enumerate(columns):
+        label = tk.Label(update_window, text=f"{field_name}{'（主键）' if field_name in key_columns else ''}:")
         label.grid(row=i, column=0, padx=10, pady=5)
         entry = tk.Entry(update_window)
         entry.grid(row=i, column=1, padx=10, pady=5)
-        entry.insert(0, result[selected_row][i])  # 填充当前值
+        original[field_name] = "" if row[i] is None else str(row[i])
+        entry.insert(0, original[field_name])  # 填充当前值
         entries[field_name] = entry
 
     # 更新数据
     def perform_update():
-        try:
-            cursor = conn.cursor()
-            set_str = ", ".join([f"{field} = '{entry.get()}'" for field, entry in entries.items()])
-            primary_key = columns[0][0]  # 假设第一列是主键
-            primary_value = result[selected_row][0]
-            query = f"UPDATE {current_table} SET {set_str} WHERE {primary_key} = '{primary_value}'"
-            cursor.execute(query)
-            conn.commit()
-            messagebox.showinfo("成功", "数据更新成功！")
+        changes = {field: entry.get() for field, entry in entries.items() if entry.get() != original[field]}
+        if not changes:
+            messagebox.showinfo("提示", "没有修改任何值。", parent=update_window)
+            return
+
+        def work(db_conn, task):
+            return update_row(db_conn, db_name, table_name, key_columns, key, changes)
+
+        def done(count):
+            if count == 0:
+                messagebox.showwarning("警告", "没有行被更新（该行可能已被删除，或新值与原值相同）。")
+            else:
+                messagebox.showinfo("成功", "数据更新成功！")
             update_window.destroy()
             refresh_table_display()
-        except Error as e:
-            messagebox.showerror("错误", f"更新数据失败: {e}")
+
+        executor.submit(work, done, lambda e: messagebox.showerror("错误", f"更新数据失败: {e}"))
 
     update_button = tk.Button(update_window, text="更新", command=perform_update)
     update_button.grid(row=len(columns), column=0, columnspan=2, pady=10)
 
 
 def delete_data():
-    if not current_db or not current_table:
-        messagebox.showwarning("警告", "请先选择一个表！")
-        return
-
-    # 获取表数据
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"USE {current_db}")
-        cursor.execute(f"SELECT * FROM {current_table}")
-        result = cursor.fetchall()
-        if not result:
-            messagebox.showwarning("警告", "表中没有数据！")
+    if (current_db and current_table and result_grid.source == (current_db, current_table)
+            and len(result_grid.selected_rows()) > 1):
+        # 选中了多行：按主键分块删除
+        key_columns = page_state['pk']
+        if not key_columns:
+            messagebox.showwarning("警告", "该表没有主键，不能按选中的行批量删除，请使用条件删除。")
             return
-    except Error as e:
-        messagebox.showerror("错误", f"获取表数据失败: {e}")
+        keys = [key_values(result_grid.buffer.columns, row, key_columns) for row in result_grid.selected_rows()]
+        open_bulk_delete_window(current_db, current_table, key_columns, keys)
         return
 
-    # 弹出选择行对话框
-    selected_row = simpledialog.askinteger("选择行", "请输入要删除的行号（从 0 开始）：")
-    if selected_row is None or selected_row < 0 or selected_row >= len(result):
-        messagebox.showwarning("警告", "无效的行号！")
+    selection = selected_table_row("删除")
+    if selection is None:
         return
 
-    # 确认删除
-    confirm = messagebox.askyesno("确认", "确定要删除该行数据吗？")
+    db_name, table_name = current_db, current_table
+    executor.submit(locate_row(db_name, table_name, *selection),
+                   lambda data: confirm_delete(db_name, table_name, *data),
+                   lambda e: messagebox.showerror("错误", f"获取行数据失败: {e}"))
+
+
+def confirm_delete(db_name, table_name, key_columns, key, columns, row):
+    """确认后按主键删除选中的行"""
+    key_text = ", ".join(f"{c} = {v}" for c, v in zip(key_columns, key))
+    confirm = messagebox.askyesno("确认", f"确定要删除 {key_text} 的行吗？")
     if not confirm:
         return
 
-    # 执行删除
-    try:
-        cursor = conn.cursor()
-        primary_key = cursor.description[0][0]  # 假设第一列是主键
-        primary_value = result[selected_row][0]
-        query = f"DELETE FROM {current_table} WHERE {primary_key} = '{primary_value}'"
-        cursor.execute(query)
-        conn.commit()
-        messagebox.showinfo("成功", "数据删除成功！")
+    def work(db_conn, task):
+        return delete_row(db_conn, db_name, table_name, key_columns, key)
+
+    def done(count):
+        if count == 0:
+            messagebox.showwarning("警告", "没有行被删除（该行可能已被删除）。")
+        else:
+            messagebox.showinfo("成功", "数据删除成功！")
         refresh_table_display()
-    except Error as e:
-        messagebox.showerror("错误", f"删除数据失败: {e}")
+
+    executor.submit(work, done, lambda e: messagebox.showerror("错误", f"删除数据失败: {e}"))
+
+
+def delete_by_condition():
+    """按 WHERE 条件分块删除当前表的行"""
+    if not current_db or not current_table:
+        messagebox.showwarning("警告", "请先选择一个表！")
+        return
+    key_columns = page_state['pk'] if page_state['table'] == (current_db, current_table) else []
+    open_bulk_delete_window(current_db, current_table, key_columns)
+
+
+def open_bulk_delete_window(db_name, table_name, key_columns, keys=None):
+    """分块删除：keys 为选中行的主键，为 None 时按输入的条件删除
+
+    每块单独提交并在块之间暂停，避免大事务长时间持有锁、撑大 undo 日志和复制延迟。
+    """
+    delete_window = tk.Toplevel(root)
+    delete_window.title(f"批量删除 - {table_name}")
+    delete_window.geometry("520x360")
+
+    if keys is not None:
+        tk.Label(delete_window, text=f"将按主键删除选中的 {len(keys)} 行。").pack(padx=10, pady=5, anchor="w")
+        where_text = None
+    else:
+        tk.Label(delete_window, text=f"DELETE FROM {table_name} WHERE").pack(padx=10, pady=5, anchor="w")
+        where_text = tk.Text(delete_window, height=4, width=60)
+        where_text.pack(padx=10, pady=5)
+
+    options_frame = tk.Frame(delete_window)
+    options_frame.pack(pady=5)
+    tk.Label(options_frame, text="每块行数:").grid(row=0, column=0, padx=5)
+    chunk_var = tk.StringVar(value=str(BULK_DELETE_CHUNK))
+    tk.Entry(options_frame, textvariable=chunk_var, width=8).grid(row=0, column=1, padx=5)
+    tk.Label(options_frame, text="块间暂停（毫秒）:").grid(row=0, column=2, padx=5)
+    pause_var = tk.StringVar(value="100")
+    tk.Entry(options_frame, textvariable=pause_var, width=8).grid(row=0, column=3, padx=5)
+
+    progress_bar = ttk.Progressbar(delete_window, length=460, maximum=max(len(keys or ()), 1))
+    progress_bar.pack(padx=10, pady=5)
+    progress = tk.Label(delete_window, text="每块单独提交，中途停止时已删除的行不会恢复。")
+    progress.pack(pady=5)
+    deleted = [0]  # 已提交删除的行数
+
+    def alive():
+        return delete_window.winfo_exists()
+
+    def on_progress(rows, elapsed):
+        deleted[0] = rows
+        if alive():
+            if keys is not None:
+                progress_bar.config(value=rows)
+            progress.config(text=f"已删除 {rows} 行，{rows / max(elapsed, 1e-6):.0f} 行/秒")
+
+    def finish(text):
+        if alive():
+            progress_bar.stop()
+            progress.config(text=text)
+            start_button.config(state='normal')
+            stop_button.config(state='disabled')
+
+    def perform_delete():
+        try:
+            chunk_size = max(int(chunk_var.get()), 1)
+            pause = max(float(pause_var.get()), 0) / 1000
+        except ValueError:
+            messagebox.showwarning("警告", "每块行数和暂停时间必须是数字！", parent=delete_window)
+            return
+        if keys is None:
+            where = where_text.get("1.0", tk.END).strip()
+            if not where:
+                messagebox.showwarning("警告", "请输入删除条件！", parent=delete_window)
+                return
+            question = f"确定删除 {table_name} 中满足条件的所有行吗？\n{where}"
+        else:
+            question = f"确定删除选中的 {len(keys)} 行吗？"
+        if not messagebox.askyesno("确认", question, parent=delete_window):
+            return
+
+        def work(db_conn, task):
+            progress_callback = lambda rows, elapsed: task.post(on_progress, rows, elapsed)
+            if keys is not None:
+                return delete_keys(db_conn, db_name, table_name, key_columns, keys, chunk_size, pause,
+                                   on_progress=progress_callback, should_stop=task.cancelled.is_set)
+            return delete_where(db_conn, db_name, table_name, where, key_columns=key_columns,
+                                chunk_size=chunk_size, pause=pause, on_progress=progress_callback,
+                                should_stop=task.cancelled.is_set)
+
+        def done(rows):
+            finish(f"完成：共删除 {rows} 行。")
+            refresh_table_display()
+
+        def failed(e):
+            finish(f"已停止：已删除并提交 {deleted[0]} 行，当前块已回滚。")
+            refresh_table_display()
+            messagebox.showerror("错误", f"删除中止: {e}")
+
+        def cancelled(e):
+            finish(f"已停止：已删除并提交 {deleted[0]} 行，当前块已回滚。")
+            refresh_table_display()
+
+        deleted[0] = 0
+        if keys is None:
+            progress_bar.config(mode="indeterminate")
+            progress_bar.start(20)
+        start_button.config(state='disabled')
+        stop_button.config(state='normal')
+        task = executor.submit(work, done, failed, cancelled)
+        stop_button.config(command=lambda: executor.cancel([task]))
+        delete_window.bind("<Destroy>", lambda e: e.widget is delete_window and executor.cancel([task]))
+
+    buttons = tk.Frame(delete_window)
+    buttons.pack(pady=10)
+    start_button = tk.Button(buttons, text="开始删除", command=perform_delete)
+    start_button.grid(row=0, column=0, padx=5)
+    stop_button = tk.Button(buttons, text="停止", state='disabled')
+    stop_button.grid(row=0, column=1, padx=5)
 
 
 def execute_query():
@@ -455,25 +1473,136 @@ def execute_query():
         messagebox.showwarning("警告", "请输入SQL查询语句！")
         return
 
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query)
-
-            # 检查是否有数据返回
-            if cursor.description:
-                result = cursor.fetchall()
-                df = pd.DataFrame(result, columns=cursor.column_names)
-                result_text.delete(1.0, tk.END)
-                result_text.insert(tk.END, df.to_string())
+    try:
+        max_rows = max(int(row_limit_var.get() or 0), 0)
+    except ValueError:
+        messagebox.showwarning("警告", "最多返回行数必须是整数！")
+        return
+
+    statements = split_statements(query)
+    if not statements:
+        messagebox.showwarning("警告", "请输入SQL查询语句！")
+        return
+    if len(statements) > 1:
+        execute_script(statements, max_rows)
+        return
+
+    if pool:
+        db_name = current_db
+        buffer = None
+        clear_script_tabs()
+
+        def work(db_conn, task):
+            # 每个任务使用独立会话，先切换到当前选中的数据库；结果分批交回主线程显示
+            return run_query(
+                db_conn, statements[0], database=db_name, max_rows=max_rows,
+                on_columns=lambda columns, description: task.post(on_columns, columns, description),
+                on_batch=lambda rows, received, elapsed: task.post(on_batch, rows, received, elapsed),
+                should_stop=task.cancelled.is_set
+            )
+
+        def on_columns(columns, description):
+            nonlocal buffer
+            buffer = ResultBuffer(columns, description)
+            result_grid.set_buffer(buffer)
+
+        def on_batch(rows, received, elapsed):
+            buffer.append_rows(rows)
+            if result_grid.buffer is buffer:
+                result_grid.refresh()
+            progress_label.config(text=f"已接收 {received} 行，{received / max(elapsed, 1e-6):.0f} 行/秒")
+
+        def done(result):
+            if result.columns is None:
+                result_grid.show_message("SQL 执行成功，没有返回数据。")
+                progress_label.config(text="")
             else:
-                result_text.delete(1.0, tk.END)
-                result_text.insert(tk.END, "SQL 执行成功，没有返回数据。")
+                progress_label.config(text=f"共 {result.received} 行，用时 {result.elapsed:.2f} 秒"
+                                           f"{'（已停止，未读取剩余结果）' if result.stopped else ''}")
+            if changes_schema(statements[0]):
+                load_databases()  # 执行了 DDL 后刷新数据库列表和元数据
+
+        executor.submit(work, done, lambda e: messagebox.showerror("错误", f"查询执行失败: {e}"))
+
+
+def clear_script_tabs():
+    """移除上次执行脚本时添加的结果标签页"""
+    for tab in script_tabs:
+        result_tabs.forget(tab)
+        tab.destroy()
+    script_tabs.clear()
+    result_tabs.select(result_grid)
+
+
+def add_script_tab(title):
+    """添加一个结果标签页"""
+    grid = VirtualGrid(result_tabs, height=15)
+    result_tabs.add(grid, text=title)
+    script_tabs.append(grid)
+    return grid
+
+
+def execute_script(statements, max_rows):
+    """执行多条语句：每组语句一次往返发送，摘要和每条语句的结果集显示在单独的标签页中"""
+    if not pool:
+        return
+    db_name = current_db
+    total = len(statements)
+    clear_script_tabs()
+    result_grid.show_message(f"脚本共 {total} 条语句，结果见各标签页。")
+    summary = ResultBuffer(["序号", "状态", "行数", "用时(ms)", "语句"])
+    summary_grid = add_script_tab("执行摘要")
+    summary_grid.set_buffer(summary)
+    result_tabs.select(summary_grid)
+    grids = {}  # 语句下标 -> 显示该语句结果集的表格
+    finished = 0
+    start = time.perf_counter()
+
+    def work(db_conn, task):
+        return run_statements(
+            db_conn, statements, database=db_name, max_rows=max_rows,
+            on_columns=lambda index, columns, description: task.post(on_columns, index, columns, description),
+            on_batch=lambda index, rows, received, elapsed: task.post(on_batch, index, rows),
+            on_done=lambda index, result: task.post(on_done, index, result),
+            should_stop=task.cancelled.is_set
+        )
+
+    def on_columns(index, columns, description):
+        if len(grids) < MAX_RESULT_TABS:
+            grid = grids[index] = add_script_tab(f"语句 {index + 1}")
+            grid.set_buffer(ResultBuffer(columns, description))
+
+    def on_batch(index, rows):
+        grid = grids.get(index)
+        if grid is not None:
+            grid.buffer.append_rows(rows)
+            grid.refresh()
+
+    def on_done(index, result):
+        nonlocal finished
+        finished += 1
+        if result.error is not None:
+            state = f"错误: {result.error}"
+        elif result.columns is not None:
+            state = "已截断" if result.stopped else "结果集"
+        else:
+            state = "成功"
+        rows = result.received if result.columns is not None else result.rowcount
+        text = " ".join(result.sql.split())
+        summary.append_rows([(index + 1, state, rows, round(result.elapsed * 1000, 1), text[:200])])
+        summary_grid.refresh()
+        progress_label.config(text=f"已执行 {finished}/{total} 条语句")
+
+    def done(results):
+        executed = sum(1 for result in results if result is not None)
+        progress_label.config(text=f"已执行 {executed}/{total} 条语句，用时 {time.perf_counter() - start:.2f} 秒")
+        failed = next((result for result in results if result is not None and result.error is not None), None)
+        if failed is not None:
+            messagebox.showerror("错误", f"第 {results.index(failed) + 1} 条语句执行失败，后面的语句未执行: {failed.error}")
+        if any(changes_schema(sql) for sql in statements):
+            load_databases()  # 脚本中有建库、删库等 DDL 语句
 
-            conn.commit()  # 确保变更生效
-            load_databases()  # **执行完 SQL 语句后自动刷新数据库列表**
-        except Error as e:
-            messagebox.showerror("错误", f"查询执行失败: {e}")
+    executor.submit(work, done, lambda e: messagebox.showerror("错误", f"脚本执行失败: {e}"))
 
 
 def generate_chart():
@@ -481,32 +1610,47 @@ def generate_chart():
         messagebox.showwarning("警告", "请先选择一个表！")
         return
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"USE {current_db}")
-        cursor.execute(f"SELECT * FROM {current_table}")
-        result = cursor.fetchall()
-        if not result:
-            messagebox.showwarning("警告", "表中没有数据！")
+    db_name, table_name = current_db, current_table
+
+    # 只读取列和类型，图表数据在选择 X/Y 后由服务器计算
+    def work(db_conn, task):
+        catalog.ensure(db_conn, db_name, table_name)
+        return catalog.data_types(db_name, table_name)
+
+    def done(data_types):
+        if not data_types:
+            messagebox.showwarning("警告", "无法读取表的列！")
             return
-        df = pd.DataFrame(result, columns=cursor.column_names)
-    except Error as e:
-        messagebox.showerror("错误", f"获取表数据失败: {e}")
-        return
+        open_chart_window(db_name, table_name, data_types)
 
+    executor.submit(work, done,
+                    lambda e: messagebox.showerror("错误", f"获取表结构失败: {e}"))
+
+
+def open_chart_window(db_name, table_name, data_types):
+    """打开图表窗口，data_types 为 {列名: DATA_TYPE}"""
     chart_window = tk.Toplevel(root)
-    chart_window.title("生成图表")
-    chart_window.geometry("700x900")
+    chart_window.title(f"生成图表 - {table_name}")
+    chart_window.geometry("700x1020")
+    columns = list(data_types)
 
-    # 图表容器和状态跟踪
+    # 图表容器：Figure 只创建一次并原地更新，在后台线程光栅化后以图像显示
     chart_container = tk.Frame(chart_window)
-    chart_container.grid(row=10, column=0, columnspan=2, padx=10, pady=10)
-    current_canvas = None
+    chart_container.grid(row=12, column=0, columnspan=2, padx=10, pady=10)
+    engine = ChartEngine()
+    chart_image = tk.Label(chart_container)
+    chart_image.pack()
+    render_state = {'running': False, 'pending': None}  # 同一时间只光栅化一次，期间的请求只保留最新的
+    chart_results = {}  # 数据键 -> 服务器返回的图表数据，切换回之前的 X/Y 时不再查询
+    # 最近一次数据请求、正在计算的任务及其数据键、待执行的更新
+    chart_state = {'request': 0, 'task': None, 'key': None, 'after': None}
 
     # 选项变量定义
     chart_type_var = tk.StringVar(value="柱状图")
     x_axis_var = tk.StringVar()
     y_axis_var = tk.StringVar()
+    aggregate_var = tk.StringVar(value="求和")
+    bucket_var = tk.StringVar(value="自动")
     sort_enabled_var = tk.BooleanVar(value=False)
     sort_order_var = tk.StringVar(value="升序")
     show_legend_var = tk.BooleanVar(value=True)
@@ -514,122 +1658,175 @@ def generate_chart():
     show_labels_var = tk.BooleanVar(value=False)
     line_style_var = tk.StringVar(value="实线")
     color_theme_var = tk.StringVar(value="默认")
+    note_var = tk.StringVar(value="请选择 X 轴和 Y 轴")
 
-    # 动态更新函数
+    # 动态更新函数：X/Y、图表类型或聚合方式变化时由服务器重新计算数据，其他选项只重新绘制
     def update_chart(*args):
-        nonlocal current_canvas
+        x_col, y_col = x_axis_var.get(), y_axis_var.get()
+        if not x_col or not y_col:
+            return
+        chart_type = chart_type_var.get()
+        numeric_x = data_types.get(x_col, "").lower() in NUMERIC_DATA_TYPES
+        temporal_x = data_types.get(x_col, "").lower() in TEMPORAL_DATA_TYPES
+        density = chart_type == "密度图"
+        if density and not (numeric_x and data_types.get(y_col, "").lower() in NUMERIC_DATA_TYPES):
+            note_var.set("密度图的 X 轴和 Y 轴都必须是数值列")
+            return
+        # X 为数值列的折线图按 X 分桶降采样，X 为时间列的折线图按时间段聚合，
+        # 密度图把所有点分箱，其他情况按 X 分组聚合
+        time_series = chart_type == "折线图" and temporal_x
+        series = chart_type == "折线图" and (numeric_x or temporal_x)
+        aggregate = CHART_AGGREGATES.get(aggregate_var.get(), 'SUM')
+        start, end = time_start_entry.get().strip() or None, time_end_entry.get().strip() or None
+        bucket = TIME_BUCKETS.get(bucket_var.get())  # 自动时为 None
+        if density:
+            key = (x_col, y_col, chart_type)
+        elif time_series:
+            key = (x_col, y_col, "时间序列", aggregate, start, end, bucket)
+        else:
+            key = (x_col, y_col, series, None if series else aggregate, chart_type == "折线图")
+
+        if chart_state['task'] is not None and chart_state['key'] == key:
+            return  # 只修改了样式，同一份数据仍在计算，完成后按当时的选项绘制
 
-        # 清除旧图表
-        if current_canvas:
-            current_canvas.get_tk_widget().destroy()
-            plt.close('all')
+        # 数据键不同的新请求取代还在服务器上计算的旧请求
+        chart_state['request'] += 1
+        request = chart_state['request']
+        if chart_state['task'] is not None:
+            executor.cancel([chart_state['task']])
+            chart_state['task'] = None
 
-        # 验证必要选项
-        if not x_axis_var.get() or not y_axis_var.get():
+        if key in chart_results:
+            note_var.set(chart_results[key]['note'])
+            render_chart(x_col, y_col, series, key, chart_results[key])
             return
 
-        try:
-            # 数据预处理
-            df_copy = df.copy()
-            x_col = x_axis_var.get()
-            y_col = y_axis_var.get()
-
-            # 转换数值类型
-            df_copy[x_col] = pd.to_numeric(df_copy[x_col], errors='coerce')
-            df_copy[y_col] = pd.to_numeric(df_copy[y_col], errors='coerce')
-            df_copy = df_copy.dropna(subset=[x_col, y_col])
-
-            # 排序处理（修复折线图排序问题）
-            if sort_enabled_var.get():
-                df_copy = df_copy.sort_values(
-                    by=x_col,
-                    ascending=(sort_order_var.get() == "升序")
-                ).reset_index(drop=True)  # 重置索引
-
-            # 创建图表
-            fig, ax = plt.subplots(figsize=(8, 5))
-            chart_type = chart_type_var.get()
-
-            # 设置颜色主题（修复颜色问题）
-            plt.style.use('default')  # 重置样式
-            theme_settings = {
-                "默认": {'bg': 'white', 'text': 'black'},
-                "深色": {'bg': 'black', 'text': 'white'},
-                "彩色": {'bg': '#f0f0f0', 'text': 'black'}
-            }
-            theme = theme_settings[color_theme_var.get()]
-
-            fig.patch.set_facecolor(theme['bg'])
-            ax.set_facecolor(theme['bg'])
-            ax.xaxis.label.set_color(theme['text'])
-            ax.yaxis.label.set_color(theme['text'])
-            ax.title.set_color(theme['text'])
-            ax.tick_params(axis='x', colors=theme['text'])
-            ax.tick_params(axis='y', colors=theme['text'])
-
-            # 绘制图表
-            if chart_type == "柱状图":
-                bars = ax.bar(df_copy[x_col].astype(str), df_copy[y_col], color='#1f77b4')
-                if show_labels_var.get():
-                    for bar in bars:
-                        height = bar.get_height()
-                        ax.text(bar.get_x() + bar.get_width() / 2., height,
-                                f'{height:.1f}', ha='center', va='bottom',
-                                color=theme['text'])
-                ax.set_xlabel(x_col)
-                ax.set_ylabel(y_col)
-
-            elif chart_type == "折线图":
-                linestyle = {"实线": "-", "虚线": "--", "点线": ":"}[line_style_var.get()]
-                line, = ax.plot(df_copy[x_col], df_copy[y_col],  # 使用实际x值
-                                marker='o',
-                                linestyle=linestyle,
-                                color='#2ca02c')
-                ax.set_xticks(df_copy[x_col].unique())  # 显示唯一值
-                ax.set_xticklabels(df_copy[x_col].astype(str), rotation=45)
-                if show_labels_var.get():
-                    for x, y in zip(df_copy[x_col], df_copy[y_col]):
-                        ax.text(x, y, f'{y:.1f}',
-                                ha='center', va='bottom',
-                                color=theme['text'])
-                ax.set_xlabel(x_col)
-                ax.set_ylabel(y_col)
-
-            elif chart_type == "饼图":
-                wedges, texts = ax.pie(
-                    df_copy[y_col],
-                    labels=df_copy[x_col].astype(str),
-                    autopct='%1.1f%%',
-                    colors=plt.cm.tab20.colors
-                )
-                for text in texts:
-                    text.set_color(theme['text'])
-
-            # 通用设置
-            if show_legend_var.get() and chart_type != "饼图":
-                ax.legend([y_col], facecolor=theme['bg'], edgecolor=theme['text'])
-            if show_grid_var.get():
-                ax.grid(True, color=theme['text'], alpha=0.3)
-            plt.title(f"{chart_type} - {y_col} vs {x_col}")
-            plt.tight_layout()
-
-            # 嵌入图表
-            current_canvas = FigureCanvasTkAgg(fig, master=chart_container)
-            current_canvas.draw()
-            current_canvas.get_tk_widget().pack()
-        except Exception as e:
+        note_var.set("正在由服务器计算图表数据...")
+
+        def on_progress(rows, elapsed):
+            if request == chart_state['request'] and chart_window.winfo_exists():
+                note_var.set(f"正在读取并分箱：{rows} 个点，{rows / max(elapsed, 1e-6):.0f} 点/秒")
+
+        def work(db_conn, task):
+            if density:
+                return fetch_density(db_conn, db_name, table_name, x_col, y_col,
+                                     on_progress=lambda rows, elapsed: task.post(on_progress, rows, elapsed),
+                                     should_stop=task.cancelled.is_set)
+            if time_series:
+                return fetch_time_series(db_conn, db_name, table_name, x_col, y_col, aggregate, start, end, bucket)
+            if series:
+                return fetch_line(db_conn, db_name, table_name, x_col, y_col)
+            return fetch_grouped(db_conn, db_name, table_name, x_col, y_col, aggregate,
+                                 order_by_value=chart_type != "折线图", x_type=data_types.get(x_col))
+
+        def done(result):
+            if request != chart_state['request'] or not chart_window.winfo_exists():
+                return  # 已有更新的请求或窗口已关闭
+            chart_state['task'] = None
+            if density:
+                bins_x, bins_y = result['counts'].shape
+                note = f"共 {result['rows']} 个点，分箱为 {bins_x}×{bins_y} 的网格"
+            elif time_series:
+                width = time_bucket_label(result['bucket'])
+                note = f"每 {width}{aggregate_var.get()}，{len(result['data'])} 个时间段，共 {result['rows']} 行"
+            elif series:
+                note = f"共 {result['rows']} 行"
+                if result['downsampled']:
+                    note += f"，降采样为 {len(result['data'])} 个点"
+            elif result['bucket'] is not None:
+                width = time_bucket_label(result['bucket']) if temporal_x else f"{result['bucket']:g}"
+                note = f"按 {x_col} 每 {width} 分段{aggregate_var.get()}，{result['groups']} 段"
+            else:
+                note = f"按 {x_col} 分组{aggregate_var.get()}，{result['groups']} 组"
+                if result['truncated']:
+                    note += "（只显示前几组）" if chart_type == "折线图" else f"（只显示{aggregate_var.get()}最大的几组）"
+            result['note'] = note
+            if len(chart_results) >= SERIES_CACHE_SIZE:
+                del chart_results[next(iter(chart_results))]
+            chart_results[key] = result
+            note_var.set(note)
+            render_chart(x_col, y_col, series, key, result)
+
+        def failed(e):
+            if request == chart_state['request'] and chart_window.winfo_exists():
+                chart_state['task'] = None
+                note_var.set(f"计算图表数据失败: {e}")
+
+        chart_state['task'] = executor.submit(work, done, failed)
+        chart_state['key'] = key
+
+    def schedule_update(*args):
+        """合并短时间内的多次选项修改（例如先后选择 X 和 Y），只更新一次"""
+        if chart_state['after'] is not None:
+            chart_window.after_cancel(chart_state['after'])
+        chart_state['after'] = chart_window.after(CHART_UPDATE_DELAY, run_update)
+
+    def run_update():
+        chart_state['after'] = None
+        update_chart()
+
+    def on_destroy(event):
+        if event.widget is chart_window and chart_state['task'] is not None:
+            executor.cancel([chart_state['task']])
+
+    chart_window.bind("<Destroy>", on_destroy)
+
+    def render_chart(x_col, y_col, series, key, result):
+        """数据或排序变化时重新绘制数据，其他选项只修改样式"""
+        if result['rows'] == 0 if 'counts' in result else result['data'].empty:
+            note_var.set("没有可以绘制的数值数据")
+            return
+        style = {
+            'theme': color_theme_var.get(),
+            'line_style': line_style_var.get(),
+            'grid': show_grid_var.get(),
+            'legend': show_legend_var.get(),
+            'labels': show_labels_var.get()
+        }
+        args = (chart_type_var.get(), key, result if 'counts' in result else result['data'], x_col, y_col, series,
+                sort_enabled_var.get(), sort_order_var.get() == "升序", style)
+        if render_state['running']:
+            render_state['pending'] = args
+        else:
+            start_render(args)
+
+    def start_render(args):
+        """在后台线程更新并光栅化图表，完成后把图像交给界面线程显示"""
+        render_state['running'] = True
+
+        def done(ppm):
+            if chart_window.winfo_exists():
+                image = tk.PhotoImage(data=ppm, format="PPM")
+                chart_image.config(image=image)
+                chart_image.image = image  # 保留引用，否则图像会被回收
+                note = chart_results[args[1]]['note'] if args[1] in chart_results else ""
+                if args[-1]['labels'] and engine.labels_sampled():
+                    note += f"；点太多，只显示 {engine.label_count()} 个数据标签（最多 {CHART_MAX_LABELS} 个）"
+                note_var.set(note)
+            finish_render()
+
+        def failed(e):
             print(f"图表更新失败: {e}")
+            finish_render()
+
+        executor.run_in_background(lambda: engine.render(*args), done, failed)
+
+    def finish_render():
+        render_state['running'] = False
+        pending, render_state['pending'] = render_state['pending'], None
+        if pending is not None and chart_window.winfo_exists():
+            start_render(pending)
 
     # 绑定变量跟踪（保持之前的正确跟踪方式）
     track_vars = [
-        chart_type_var, x_axis_var, y_axis_var,
+        chart_type_var, x_axis_var, y_axis_var, aggregate_var, bucket_var,
         sort_enabled_var, sort_order_var,
         show_legend_var, show_grid_var, show_labels_var,
         line_style_var, color_theme_var
     ]
 
     for var in track_vars:
-        var.trace_add("write", update_chart)  # 统一使用"write"
+        var.trace_add("write", schedule_update)  # 统一使用"write"
 
     # 控件布局
     # 第一行：图表类型
@@ -637,7 +1834,7 @@ def generate_chart():
     ttk.Combobox(
         chart_window,
         textvariable=chart_type_var,
-        values=["柱状图", "折线图", "饼图"]
+        values=["柱状图", "折线图", "饼图", "密度图"]
     ).grid(row=0, column=1, padx=10, pady=5, sticky='w')
 
     # 第二行：X轴选择
@@ -645,7 +1842,7 @@ def generate_chart():
     ttk.Combobox(
         chart_window,
         textvariable=x_axis_var,
-        values=df.columns.tolist()
+        values=columns
     ).grid(row=1, column=1, padx=10, pady=5, sticky='w')
 
     # 第三行：Y轴选择
@@ -653,7 +1850,7 @@ def generate_chart():
     ttk.Combobox(
         chart_window,
         textvariable=y_axis_var,
-        values=df.columns.tolist()
+        values=columns
     ).grid(row=2, column=1, padx=10, pady=5, sticky='w')
 
     # 第四行：排序设置
@@ -703,6 +1900,37 @@ def generate_chart():
         variable=show_labels_var
     ).grid(row=7, column=0, columnspan=2, padx=10, pady=5)
 
+    # 第七行：聚合方式（柱状图、饼图、时间序列和 X 不是数值的折线图）
+    ttk.Label(chart_window, text="聚合方式：").grid(row=8, column=0, padx=10, pady=5, sticky='e')
+    ttk.Combobox(
+        chart_window,
+        textvariable=aggregate_var,
+        values=list(CHART_AGGREGATES),
+        state="readonly"
+    ).grid(row=8, column=1, padx=10, pady=5, sticky='w')
+
+    # 第八行：时间序列（X 为时间列的折线图）的聚合粒度和时间范围，范围留空表示不限
+    ttk.Label(chart_window, text="时间粒度：").grid(row=9, column=0, padx=10, pady=5, sticky='e')
+    ttk.Combobox(
+        chart_window,
+        textvariable=bucket_var,
+        values=["自动"] + list(TIME_BUCKETS),
+        state="readonly"
+    ).grid(row=9, column=1, padx=10, pady=5, sticky='w')
+    ttk.Label(chart_window, text="时间范围：").grid(row=10, column=0, padx=10, pady=5, sticky='e')
+    range_frame = tk.Frame(chart_window)
+    range_frame.grid(row=10, column=1, padx=10, pady=5, sticky='w')
+    time_start_entry = ttk.Entry(range_frame, width=20)
+    time_start_entry.pack(side=tk.LEFT)
+    ttk.Label(range_frame, text=" 至 ").pack(side=tk.LEFT)
+    time_end_entry = ttk.Entry(range_frame, width=20)
+    time_end_entry.pack(side=tk.LEFT)
+    for entry in (time_start_entry, time_end_entry):
+        # 输入完成后才更新，避免每输入一个字符就查询一次
+        entry.bind("<Return>", schedule_update)
+        entry.bind("<FocusOut>", schedule_update)
+    ttk.Label(chart_window, textvariable=note_var).grid(row=11, column=0, columnspan=2, padx=10, pady=5)
+
     # 初始渲染
     update_chart()
 
@@ -768,6 +1996,12 @@ def open_settings():
     )
     model_combobox.grid(row=8, column=1, padx=10, pady=5)
 
+    pool_size_label = tk.Label(settings_window, text="连接池大小:")
+    pool_size_label.grid(row=9, column=0, padx=10, pady=5, sticky='e')
+    pool_size_entry = tk.Entry(settings_window)
+    pool_size_entry.grid(row=9, column=1, padx=10, pady=5)
+    pool_size_entry.insert(0, db_config['pool_size'])
+
     def save_settings():
         """保存设置"""
         global db_config
@@ -778,8 +2012,9 @@ def open_settings():
         db_config['ai_api_key'] = api_key_entry.get()
         db_config['ai_api_url'] = api_url_entry.get()
         db_config['selected_model'] = model_var.get()
+        db_config['pool_size'] = max(int(pool_size_entry.get()), 1)
 
-        # 关闭当前连接
+        # 关闭当前连接池
         close_db()
 
         # 重新连接数据库并刷新列表
@@ -789,7 +2024,7 @@ def open_settings():
         settings_window.destroy()
 
     save_button = tk.Button(settings_window, text="保存", command=save_settings)
-    save_button.grid(row=9, column=0, columnspan=2, pady=10)
+    save_button.grid(row=10, column=0, columnspan=2, pady=10)
 
 
 def show_help():
@@ -831,6 +2066,7 @@ tree.column("type", width=50)
 tree.heading("#0", text="数据库/表")
 tree.heading("type", text="类型")
 tree.bind("<Double-1>", show_table_data_or_structure)
+tree.bind("<<TreeviewOpen>>", on_tree_open)
 
 # 右侧面板 - 主功能区
 right_paned = tk.PanedWindow(main_paned, orient=tk.VERTICAL)
@@ -870,11 +2106,72 @@ chart_button.grid(row=0, column=5, padx=5)
 refresh_button = tk.Button(button_frame, text="刷新数据库", command=load_databases)
 refresh_button.grid(row=0, column=6, padx=5)
 
+cancel_button = tk.Button(button_frame, text="取消查询", command=cancel_running_queries, state='disabled')
+cancel_button.grid(row=0, column=7, padx=5)
+
+import_button = tk.Button(button_frame, text="导入文件", command=import_data)
+import_button.grid(row=0, column=8, padx=5)
+
+export_button = tk.Button(button_frame, text="导出", command=export_data)
+export_button.grid(row=0, column=9, padx=5)
+
+delete_where_button = tk.Button(button_frame, text="条件删除", command=delete_by_condition)
+delete_where_button.grid(row=0, column=10, padx=5)
+
+# 流式读取设置和进度
+fetch_frame = tk.Frame(query_frame)
+fetch_frame.pack(pady=2)
+
+row_limit_label = tk.Label(fetch_frame, text="最多返回行数（0 表示不限）:")
+row_limit_label.grid(row=0, column=0, padx=5)
+
+row_limit_var = tk.StringVar(value="0")
+row_limit_entry = tk.Entry(fetch_frame, textvariable=row_limit_var, width=10)
+row_limit_entry.grid(row=0, column=1, padx=5)
+
+progress_label = tk.Label(fetch_frame, text="")
+progress_label.grid(row=0, column=2, padx=5)
+
+status_label = tk.Label(query_frame, text="就绪")
+status_label.pack(pady=2)
+
 result_label = tk.Label(query_frame, text="查询结果:")
 result_label.pack(pady=5)
 
-result_text = tk.Text(query_frame, height=15, width=80)
-result_text.pack(pady=5)
+# 结果标签页：第一页显示单条查询和表内容，执行脚本时为每条语句添加标签页
+result_tabs = ttk.Notebook(query_frame)
+result_tabs.pack(pady=5, fill=tk.BOTH, expand=True)
+
+result_grid = VirtualGrid(result_tabs, height=15, on_change=lambda: update_pending())
+result_tabs.add(result_grid, text="结果")
+
+# 分页控制
+pager_frame = tk.Frame(query_frame)
+pager_frame.pack(pady=5)
+
+prev_button = tk.Button(pager_frame, text="上一页", command=prev_page, state='disabled')
+prev_button.grid(row=0, column=0, padx=5)
+
+page_label = tk.Label(pager_frame, text="")
+page_label.grid(row=0, column=1, padx=5)
+
+next_button = tk.Button(pager_frame, text="下一页", command=next_page, state='disabled')
+next_button.grid(row=0, column=2, padx=5)
+
+jump_button = tk.Button(pager_frame, text="跳转到主键", command=jump_to_key, state='disabled')
+jump_button.grid(row=0, column=3, padx=5)
+
+add_row_button = tk.Button(pager_frame, text="新增行", command=lambda: result_grid.add_row(), state='disabled')
+add_row_button.grid(row=0, column=4, padx=5)
+
+commit_button = tk.Button(pager_frame, text="提交修改", command=commit_pending_changes, state='disabled')
+commit_button.grid(row=0, column=5, padx=5)
+
+discard_button = tk.Button(pager_frame, text="放弃修改", command=discard_pending_changes, state='disabled')
+discard_button.grid(row=0, column=6, padx=5)
+
+pending_label = tk.Label(pager_frame, text="")
+pending_label.grid(row=0, column=7, padx=5)
 
 # 下部 - AI功能区
 ai_frame = tk.Frame(right_paned)
@@ -907,6 +2204,13 @@ ai_output_label.pack(pady=5)
 ai_output = tk.Text(ai_frame, height=8, width=80, state='disabled')
 ai_output.pack(pady=5)
 
+# 启动后台任务结果轮询
+executor.on_state_change = update_busy_state
+executor.on_cancelled = lambda task: status_label.config(text="查询已取消")
+executor.on_unhandled_error = show_task_error
+root.after(UI_POLL_INTERVAL, poll_ui_queue)
+root.protocol("WM_DELETE_WINDOW", on_close)
+
 # 初始连接数据库
 connect_db()
 
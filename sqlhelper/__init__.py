@@ -0,0 +1,45 @@
+"""SQL Helper 核心库
+
+与界面无关的部分：连接池、元数据目录、查询执行、图表数据准备和AI生成SQL。
+Tk 界面（proto_09.py）只是调用这些模块的客户端，批处理任务和基准测试可以直接使用，
+命令行用法见 python -m sqlhelper run --help。
+绘图（matplotlib）和AI（requests）模块在第一次使用其中的名字时才导入，命令行只依赖核心模块。
+"""
+import importlib
+
+from .config import DEFAULT_CONFIG, CATALOG_CACHE_PATH, connection_params, server_key
+from .connection import ConnectionPool, kill_queries
+from .catalog import INTEGER_DATA_TYPES, NUMERIC_DATA_TYPES, TEMPORAL_DATA_TYPES, Catalog, CatalogCache, fetch_fingerprints
+from .results import ResultBuffer, TypedColumn
+from .query import (FETCH_BATCH_SIZE, PAGE_SIZE, PIPELINE_SIZE, QueryResult, quote_ident, build_page_query,
+                    fetch_page, run_query, pipeline_batches, run_statements, fetch_buffer)
+from .script import DDL_KEYWORDS, split_statements, statement_keyword, changes_schema
+from .rows import (key_condition, key_values, fetch_row, update_row, delete_row, ChangeSet, build_update,
+                   apply_changes)
+from .bulk import (BULK_INSERT_CHUNK, BULK_DELETE_CHUNK, ImportResult, build_insert, build_delete, insert_rows,
+                   delete_keys, delete_where, read_delimited, inspect_file, map_columns, local_infile_enabled,
+                   load_data_local, parallel_insert, import_file)
+from .writers import CsvWriter, JsonlWriter, ParquetWriter, open_writer
+from .export import (EXPORT_FORMATS, COMPRESSIONS, export_extension, open_output, open_export, export_query,
+                     export_table, split_key_range, export_table_parallel)
+from .batch import StatementResult, run_statement, run_script
+from .executor import DbExecutor, DbTask
+from .chart import (CHART_MAX_POINTS, CHART_MAX_GROUPS, CHART_AGGREGATES, DENSITY_BINS, TIME_BUCKETS, fetch_grouped,
+                    fetch_line, fetch_density, choose_time_bucket, time_bucket_label, time_bucket_sql,
+                    fetch_time_series, lttb, prepare_chart_data)
+
+_LAZY_NAMES = {
+    'plot': ('CHART_THEMES', 'LINE_STYLES', 'SERIES_CACHE_SIZE', 'CHART_MAX_LABELS', 'ChartEngine'),
+    'ai': ('AIError', 'build_ai_context', 'call_ai_api', 'generate_sql', 'extract_sql'),
+}
+_LAZY_MODULES = {name: module for module, names in _LAZY_NAMES.items() for name in names}
+
+
+def __getattr__(name):
+    """按需导入 plot、ai 中的名字"""
+    module = _LAZY_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,110 @@
+"""命令行入口：python -m sqlhelper run [脚本文件 ...]
+
+不带文件或文件名为 - 时从标准输入读取SQL。结果写到标准输出（或 --output-dir），
+每条语句的用时和行数写到标准错误，任何语句出错时退出码为 1。
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from mysql.connector import Error
+
+from .batch import FORMAT_EXTENSIONS, run_script
+from .config import DEFAULT_CONFIG, connection_params
+from .connection import ConnectionPool
+from .query import FETCH_BATCH_SIZE
+from .script import split_statements
+
+
+def _summary(sql, width=60):
+    text = " ".join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def _report(statement):
+    """向标准错误输出一条语句的用时"""
+    if statement.skipped:
+        status = "跳过"
+    elif statement.error is not None:
+        status = f"错误: {statement.error}"
+    elif statement.columns is not None:
+        status = f"{statement.rows} 行"
+    else:
+        status = f"影响 {statement.rowcount} 行"
+    print(f"[{statement.index}] {statement.elapsed * 1000:9.1f} ms  {status}  {_summary(statement.sql)}",
+          file=sys.stderr, flush=True)
+
+
+def _read_scripts(paths):
+    if not paths:
+        paths = ["-"]
+    texts = []
+    for path in paths:
+        if path == "-":
+            texts.append(sys.stdin.read())
+        else:
+            with open(path, encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+
+def cmd_run(args):
+    statements = []
+    for text in _read_scripts(args.files):
+        statements.extend(split_statements(text))
+    if not statements:
+        print("没有要执行的语句", file=sys.stderr)
+        return 0
+    if args.format == "parquet" and not args.output_dir and len(statements) > 1:
+        print("多条语句输出 Parquet 时需要指定 --output-dir", file=sys.stderr)
+        return 2
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        print("输出 Parquet 需要安装 pyarrow", file=sys.stderr)
+        return 2
+
+    config = dict(DEFAULT_CONFIG, host=args.host, port=args.port, user=args.user, password=args.password)
+    parallel = max(args.parallel, 1)
+    pool = ConnectionPool(parallel, **connection_params(config))
+    start = time.perf_counter()
+    try:
+        results = run_script(pool, statements, args.format, sys.stdout.buffer, args.output_dir,
+                             args.database, parallel, args.keep_going, args.batch_size, _report)
+    except Error as e:
+        print(f"数据库错误: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close_all()
+    failed = sum(1 for statement in results if statement.error is not None)
+    print(f"共 {len(results)} 条语句，{failed} 条出错，用时 {time.perf_counter() - start:.3f} s",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="sqlhelper", description="SQL Helper 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="执行SQL脚本，结果写到标准输出")
+    run.add_argument("files", nargs="*", help="SQL脚本文件，省略或为 - 时读取标准输入")
+    run.add_argument("--host", default=DEFAULT_CONFIG['host'])
+    run.add_argument("--port", type=int, default=DEFAULT_CONFIG['port'])
+    run.add_argument("--user", default=DEFAULT_CONFIG['user'])
+    run.add_argument("--password", default=os.environ.get("SQLHELPER_PASSWORD", DEFAULT_CONFIG['password']),
+                     help="默认读取环境变量 SQLHELPER_PASSWORD")
+    run.add_argument("-d", "--database", help="执行前切换到的数据库")
+    run.add_argument("-f", "--format", choices=sorted(FORMAT_EXTENSIONS), default="csv", help="结果格式")
+    run.add_argument("-o", "--output-dir", help="每条语句的结果写到该目录下的单独文件")
+    run.add_argument("-p", "--parallel", type=int, default=1,
+                     help="并发执行的语句数（语句之间必须相互独立）")
+    run.add_argument("--keep-going", action="store_true", help="语句出错后继续执行后面的语句")
+    run.add_argument("--batch-size", type=int, default=FETCH_BATCH_SIZE, help="每批读取的行数")
+    run.set_defaults(handler=cmd_run)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""AI 生成 SQL"""
+import json
+
+import requests
+
+
+class AIError(Exception):
+    """AI 接口调用失败"""
+
+
+def build_ai_context(catalog, db_name, table_name):
+    """根据元数据目录构建AI提示中的表结构描述（列、主键、索引、外键）"""
+    context = f"表 {table_name} 的结构:\n"
+    for column in catalog.describe(db_name, table_name):
+        context += f"- {column[0]}: {column[1]}, {'允许NULL' if column[2] == 'YES' else '非NULL'}, {column[3] or ''}\n"
+
+    primary_key = catalog.primary_key(db_name, table_name)
+    if primary_key:
+        context += f"主键: {', '.join(primary_key)}\n"
+    for index_name, index in catalog.table_indexes(db_name, table_name).items():
+        if index_name != 'PRIMARY':
+            context += f"{'唯一索引' if index['unique'] else '索引'} {index_name}: {', '.join(index['columns'])}\n"
+    for column, ref_schema, ref_table, ref_column in catalog.foreign_keys(db_name, table_name):
+        context += f"外键: {column} -> {ref_schema}.{ref_table}.{ref_column}\n"
+    return context
+
+
+def call_ai_api(config, user_input, table_structure):
+    """调用OpenAI API生成SQL，返回接口的 JSON 响应"""
+    if not config['ai_api_key']:
+        raise AIError("请先在设置中配置AI API Key")
+
+    headers = {
+        "Authorization": f"Bearer {config['ai_api_key']}",
+        "Content-Type": "application/json"
+    }
+
+    prompt = f"""
+    你是一个专业的SQL助手。请根据以下表结构和用户需求生成合适的MySQL查询语句。
+
+    表结构:
+    {table_structure}
+
+    用户需求: {user_input}
+
+    请只返回JSON格式的响应，包含以下字段:
+    - "sql": 生成的SQL语句
+    - "explanation": 对SQL的简要解释
+    """
+
+    data = {
+        "model": config['selected_model'],
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.3,
+        "response_format": {"type": "json_object"}
+    }
+
+    try:
+        response = requests.post(
+            config['ai_api_url'],
+            headers=headers,
+            data=json.dumps(data),
+            timeout=30
+        )
+    except Exception as e:
+        raise AIError(f"调用AI API时出错: {e}")
+
+    if response.status_code != 200:
+        raise AIError(f"AI API调用失败: {response.text}")
+    return response.json()
+
+
+def generate_sql(config, user_input, table_structure):
+    """生成SQL，返回模型输出的内容"""
+    response = call_ai_api(config, user_input, table_structure)
+    if response and 'choices' in response:
+        return response['choices'][0]['message']['content']
+    raise AIError("无法从AI获取有效的SQL语句")
+
+
+def extract_sql(content):
+    """提取纯SQL语句"""
+    return content.split('\n', 1)[0].strip()
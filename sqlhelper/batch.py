@@ -0,0 +1,210 @@
+"""批量执行SQL脚本：结果按批写出，记录每条语句的用时"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .query import FETCH_BATCH_SIZE, quote_ident, run_query, run_statements
+from .writers import open_writer
+
+FORMAT_EXTENSIONS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+
+
+class StatementResult:
+    """一条语句的执行情况"""
+
+    def __init__(self, index, sql):
+        self.index = index       # 在脚本中的序号（从1开始）
+        self.sql = sql
+        self.columns = None      # 没有结果集时为 None
+        self.rows = 0            # 写出的行数
+        self.rowcount = -1       # 受影响的行数（没有结果集时）
+        self.elapsed = 0.0       # 用时（秒）
+        self.error = None
+        self.skipped = False     # 前面的语句出错后未执行
+        self.path = None         # 写入的文件（--output-dir）
+
+
+class _LazyOutput:
+    """第一次遇到结果集时才创建写出器，没有结果集的语句不产生输出"""
+
+    def __init__(self, fmt, open_stream):
+        self.fmt = fmt
+        self.open_stream = open_stream
+        self.writer = None
+        self.stream = None
+
+    def get(self):
+        if self.writer is None:
+            self.stream = self.open_stream()
+            self.writer = open_writer(self.fmt, self.stream)
+        return self.writer
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.stream is not None:
+            self.stream.close()
+
+
+def run_statement(db_conn, statement, output, database=None, batch_size=FETCH_BATCH_SIZE):
+    """执行一条语句，结果集边读取边写出"""
+    def on_columns(columns, description):
+        statement.columns = columns
+        output.get().begin(columns, description)
+
+    def on_batch(rows, received, elapsed):
+        output.get().write_rows(rows)
+        statement.rows = received
+
+    start = time.perf_counter()
+    try:
+        result = run_query(db_conn, statement.sql, database, batch_size,
+                           on_columns=on_columns, on_batch=on_batch)
+        if result.columns is not None:
+            output.get().end()
+        statement.rowcount = result.rowcount
+    except Exception as e:
+        statement.error = e
+    statement.elapsed = time.perf_counter() - start
+    return statement
+
+
+def run_script(pool, statements, fmt="csv", stream=None, output_dir=None, database=None,
+               parallel=1, keep_going=False, batch_size=FETCH_BATCH_SIZE, on_done=None):
+    """执行多条语句，返回 StatementResult 列表
+
+    parallel 为 1 时在同一条连接上依次执行（会话变量、临时表、USE 都保持），
+    多条语句合并为一次往返发送；
+    大于 1 时语句被视为相互独立，分散到连接池的多条连接上并发执行。
+    结果写入 stream（按语句顺序）或 output_dir 下每条语句一个文件。
+    on_done(statement) 按语句顺序在每条语句完成后调用。
+    """
+    results = [StatementResult(i, sql) for i, sql in enumerate(statements, 1)]
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    def file_output(statement):
+        path = os.path.join(output_dir, f"{statement.index:03d}{FORMAT_EXTENSIONS[fmt]}")
+
+        def open_file():
+            statement.path = path
+            return open(path, "wb")
+        return _LazyOutput(fmt, open_file)
+
+    if parallel <= 1:
+        _run_sequential(pool, results, fmt, stream, file_output if output_dir else None, database,
+                        keep_going, batch_size, on_done)
+    else:
+        _run_parallel(pool, results, fmt, stream, file_output if output_dir else None, database,
+                      parallel, keep_going, batch_size, on_done)
+    return results
+
+
+def _run_sequential(pool, results, fmt, stream, file_output, database, keep_going, batch_size, on_done):
+    """在同一条连接上按流水线执行：多条语句合并为一次往返，结果按语句顺序读取"""
+    shared = None if file_output else _LazyOutput(fmt, lambda: stream)
+    outputs = {}
+
+    def output(index):
+        if shared is not None:
+            return shared
+        if index not in outputs:
+            outputs[index] = file_output(results[index])
+        return outputs[index]
+
+    offset = 0
+    try:
+        with pool.connection() as db_conn:
+            if database:
+                db_conn.cursor().execute(f"USE {quote_ident(database)}")
+            while offset < len(results):
+                base = offset
+
+                def on_columns(i, columns, description):
+                    results[base + i].columns = columns
+                    output(base + i).get().begin(columns, description)
+
+                def on_batch(i, rows, received, elapsed):
+                    output(base + i).get().write_rows(rows)
+                    results[base + i].rows = received
+
+                def done(i, result):
+                    statement = results[base + i]
+                    if result.columns is not None and result.error is None:
+                        output(base + i).get().end()
+                    if base + i in outputs:
+                        outputs.pop(base + i).close()
+                    statement.rowcount = result.rowcount
+                    statement.elapsed = result.elapsed
+                    statement.error = result.error
+                    if on_done:
+                        on_done(statement)
+
+                outcome = run_statements(db_conn, [statement.sql for statement in results[base:]],
+                                         batch_size=batch_size, on_columns=on_columns,
+                                         on_batch=on_batch, on_done=done)
+                failed = next((i for i, result in enumerate(outcome)
+                               if result is not None and result.error is not None), None)
+                if failed is None:
+                    break
+                offset = base + failed + 1
+                if not keep_going:
+                    for statement in results[offset:]:
+                        statement.skipped = True
+                        if on_done:
+                            on_done(statement)
+                    break
+    finally:
+        for pending in outputs.values():
+            pending.close()
+        # 只关闭写出器，不关闭调用方的流
+        if shared is not None and shared.writer is not None:
+            shared.writer.close()
+
+
+def _run_parallel(pool, results, fmt, stream, file_output, database, parallel, keep_going,
+                  batch_size, on_done):
+    stop = threading.Event()
+
+    def work(statement):
+        if stop.is_set():
+            statement.skipped = True
+            return None
+        # 写入标准输出时先写到临时文件，完成后按语句顺序复制，避免结果交错
+        output = file_output(statement) if file_output else _LazyOutput(fmt, _spool_file)
+        try:
+            with pool.connection() as db_conn:
+                run_statement(db_conn, statement, output, database, batch_size)
+        except Exception as e:
+            statement.error = e  # 取不到连接
+        if statement.error is not None and not keep_going:
+            stop.set()
+        if file_output:
+            output.close()
+            return None
+        if output.writer is not None:
+            output.writer.close()
+        return output.stream
+
+    written = False
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="sqlhelper-run") as pool_executor:
+        futures = [pool_executor.submit(work, statement) for statement in results]
+        for statement, future in zip(results, futures):
+            spool = future.result()
+            if spool is not None:
+                with spool:
+                    spool.seek(0)
+                    if fmt == "csv" and written:
+                        stream.write(b"\r\n")  # 与顺序执行时一样，结果集之间空一行
+                    shutil.copyfileobj(spool, stream)
+                    written = True
+                stream.flush()
+            if on_done:
+                on_done(statement)
+
+
+def _spool_file():
+    return tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
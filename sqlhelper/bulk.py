@@ -0,0 +1,481 @@
+"""批量写入、分块删除和文件导入"""
+import codecs
+import csv
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error, InterfaceError, OperationalError
+
+from .query import quote_ident
+
+BULK_INSERT_CHUNK = 1000  # 每条多行 INSERT 的行数
+MAX_PLACEHOLDERS = 65535  # 预处理语句最多的参数个数
+BULK_DELETE_CHUNK = 1000  # 分块删除时每个事务删除的行数
+PARALLEL_COMMIT_TIMEOUT = 300  # 并发插入时等待其他连接插入完成的最长秒数，超时后全部回滚
+
+
+def build_insert(table_name, columns, row_count):
+    """构建 row_count 行的多行 INSERT 语句（参数占位）"""
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO {quote_ident(table_name)} ({column_list}) VALUES " + ", ".join([row] * row_count)
+
+
+def build_delete(table_name, key_columns, row_count):
+    """按主键删除 row_count 行的语句（参数占位）"""
+    if len(key_columns) == 1:
+        return (f"DELETE FROM {quote_ident(table_name)} WHERE {quote_ident(key_columns[0])} IN ("
+                + ", ".join(["%s"] * row_count) + ")")
+    key = "(" + ", ".join(["%s"] * len(key_columns)) + ")"
+    return (f"DELETE FROM {quote_ident(table_name)} WHERE ({', '.join(quote_ident(c) for c in key_columns)}) IN ("
+            + ", ".join([key] * row_count) + ")")
+
+
+def insert_rows(db_conn, database, table_name, columns, rows, chunk_size=BULK_INSERT_CHUNK,
+                on_progress=None, should_stop=None, commit=True):
+    """在一个事务中批量插入，返回插入的行数
+
+    rows 可以是任意可迭代对象（例如边读文件边产生的行），按 chunk_size 行一组，
+    使用服务器端预处理的多行 INSERT 发送：同样行数的语句只预处理一次，
+    之后每组只传参数。全部成功后提交一次（commit 为 False 时由调用方提交），
+    出错或 should_stop() 返回 True 时回滚。on_progress(inserted, elapsed) 每组插入后调用。
+    """
+    columns = list(columns)
+    chunk_size = max(1, min(chunk_size, MAX_PLACEHOLDERS // max(len(columns), 1)))
+    if database:
+        db_conn.cursor().execute(f"USE {quote_ident(database)}")
+    cursor = db_conn.cursor(prepared=True)
+    statements = {}  # 行数 -> SQL；SQL 不变时游标复用预处理语句，只有最后不足一组时重新预处理
+    inserted = 0
+    start = time.perf_counter()
+    rows = iter(rows)
+    try:
+        # 连接未开启自动提交，第一条 INSERT 即开始事务
+        while True:
+            if should_stop and should_stop():
+                raise Error("插入已取消，已回滚")
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            for i, row in enumerate(chunk, inserted + 1):
+                if len(row) != len(columns):
+                    raise ValueError(f"第 {i} 行有 {len(row)} 个值，应为 {len(columns)} 个")
+            sql = statements.get(len(chunk))
+            if sql is None:
+                sql = statements[len(chunk)] = build_insert(table_name, columns, len(chunk))
+            cursor.execute(sql, [value for row in chunk for value in row])
+            inserted += len(chunk)
+            if on_progress:
+                on_progress(inserted, time.perf_counter() - start)
+        if commit:
+            db_conn.commit()
+    except BaseException:
+        try:
+            db_conn.rollback()
+        except Error:
+            pass  # 连接已断开时服务器会自动回滚
+        raise
+    finally:
+        try:
+            cursor.close()  # 释放服务器端的预处理语句
+        except Error:
+            pass
+    return inserted
+
+
+def _delete_chunks(db_conn, database, run_chunk, pause, on_progress, should_stop, prepared=True):
+    """反复执行 run_chunk(cursor)（返回删除的行数，没有更多时返回 None），每块单独提交"""
+    if database:
+        db_conn.cursor().execute(f"USE {quote_ident(database)}")
+    cursor = db_conn.cursor(prepared=prepared)
+    deleted = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            if should_stop and should_stop():
+                raise Error(f"删除已取消，此前已删除并提交 {deleted} 行")
+            count = run_chunk(cursor)
+            if count is None:
+                break
+            db_conn.commit()
+            deleted += count
+            if on_progress:
+                on_progress(deleted, time.perf_counter() - start)
+            if pause > 0:
+                time.sleep(pause)  # 让复制和其他会话跟上，避免长时间占用行锁
+    except BaseException:
+        try:
+            db_conn.rollback()
+        except Error:
+            pass
+        raise
+    finally:
+        try:
+            cursor.close()
+        except Error:
+            pass
+    return deleted
+
+
+def delete_keys(db_conn, database, table_name, key_columns, keys, chunk_size=BULK_DELETE_CHUNK, pause=0.0,
+                on_progress=None, should_stop=None):
+    """按主键分块删除，每块一条 DELETE ... WHERE 主键 IN (...) 并单独提交，返回删除的行数
+
+    每个事务只锁定和记录一块的行，删除上百万行时锁和 undo 日志的大小都有上限。
+    块之间暂停 pause 秒。出错或取消时只回滚当前块，之前的块已经提交。
+    on_progress(deleted, elapsed) 每块提交后调用。
+    """
+    keys = list(keys)
+    chunk_size = max(1, min(chunk_size, MAX_PLACEHOLDERS // max(len(key_columns), 1)))
+    position = 0
+
+    def run_chunk(cursor):
+        nonlocal position
+        chunk = keys[position:position + chunk_size]
+        if not chunk:
+            return None
+        position += len(chunk)
+        cursor.execute(build_delete(table_name, key_columns, len(chunk)), [value for key in chunk for value in key])
+        return cursor.rowcount
+
+    return _delete_chunks(db_conn, database, run_chunk, pause, on_progress, should_stop)
+
+
+def delete_where(db_conn, database, table_name, where, params=None, key_columns=None,
+                 chunk_size=BULK_DELETE_CHUNK, pause=0.0, on_progress=None, should_stop=None):
+    """按条件分块删除：重复执行 DELETE ... WHERE 条件 LIMIT n 直到删除的行数不足 n，返回删除的行数
+
+    有主键时按主键顺序删除（ORDER BY 主键），按行复制时结果确定，并沿主键顺序加锁。
+    提交、暂停和取消的方式同 delete_keys。
+    """
+    params = tuple(params) if params else None
+    if not where or not where.strip():
+        raise ValueError("删除条件不能为空（删除全部行请写 1 = 1）")
+    order = f" ORDER BY {', '.join(quote_ident(c) for c in key_columns)}" if key_columns else ""
+    sql = f"DELETE FROM {quote_ident(table_name)} WHERE ({where}){order} LIMIT {int(chunk_size)}"
+    finished = False
+
+    def run_chunk(cursor):
+        nonlocal finished
+        if finished:
+            return None
+        cursor.execute(sql, params)
+        finished = cursor.rowcount < chunk_size
+        return cursor.rowcount
+
+    # 条件是用户输入的SQL，没有参数时不经过占位符处理（例如 LIKE '%s%'）
+    return _delete_chunks(db_conn, database, run_chunk, pause, on_progress, should_stop, prepared=bool(params))
+
+
+def read_delimited(stream, header=False, empty_as_null=True):
+    """逐行读取 CSV 或制表符分隔的文本（从表格软件粘贴的内容），返回 (列名, 行迭代器)
+
+    stream 可以是文本、文件对象或逐行产生字符串的迭代器。
+    分隔符根据第一行判断：含制表符时按制表符分隔，否则按逗号分隔。
+    header 为 False 时列名为 None。empty_as_null 为 True 时空字符串作为 NULL。
+    """
+    if isinstance(stream, str):
+        stream = io.StringIO(stream)
+    lines = iter(stream)
+    first = next(lines, "")
+    delimiter = "\t" if "\t" in first else ","
+    reader = csv.reader(itertools.chain([first], lines), delimiter=delimiter)
+    names = next(reader, None) if header else None
+
+    def rows():
+        for row in reader:
+            if not row:
+                continue  # 空行
+            if empty_as_null:
+                row = [None if value == "" else value for value in row]
+            yield row
+    return names, rows()
+
+
+class ImportResult:
+    """文件导入结果"""
+
+    def __init__(self, method):
+        self.method = method     # 'load_data' 或 'insert'
+        self.rows = 0
+        self.warnings = 0        # LOAD DATA 产生的警告数（截断、类型转换等）
+        self.elapsed = 0.0
+
+
+def inspect_file(path):
+    """读取文件第一行，返回 (分隔符, 换行符, 是否有 UTF-8 BOM, 第一行的字段)"""
+    with open(path, "rb") as f:
+        first = f.readline()
+    bom = first.startswith(codecs.BOM_UTF8)
+    text = first[len(codecs.BOM_UTF8):].decode("utf-8", errors="replace") if bom else \
+        first.decode("utf-8", errors="replace")
+    line_end = "\r\n" if text.endswith("\r\n") else "\n"
+    delimiter = "\t" if "\t" in text else ","
+    fields = next(csv.reader([text.rstrip("\r\n")], delimiter=delimiter), [])
+    return delimiter, line_end, bom, fields
+
+
+def map_columns(file_columns, table_columns):
+    """按列名（不区分大小写）把文件列对应到表列
+
+    返回与文件列等长的列表，没有对应表列的为 None。file_columns 为 None（没有列名行）时按位置对应。
+    """
+    if file_columns is None:
+        return list(table_columns)
+    by_name = {column.lower(): column for column in table_columns}
+    return [by_name.get(name.strip().lower()) for name in file_columns]
+
+
+def iter_file_lines(path, progress=None):
+    """逐行读取 UTF-8 文件（去掉 BOM），progress['bytes'] 记录已读取的字节数"""
+    with open(path, "rb") as f:
+        first = True
+        for line in f:
+            if progress is not None:
+                progress['bytes'] += len(line)
+            if first:
+                first = False
+                if line.startswith(codecs.BOM_UTF8):
+                    line = line[len(codecs.BOM_UTF8):]
+            yield line.decode("utf-8")
+
+
+def local_infile_enabled(db_conn):
+    """服务器是否允许 LOAD DATA LOCAL INFILE"""
+    cursor = db_conn.cursor()
+    cursor.execute("SELECT @@GLOBAL.local_infile")
+    row = cursor.fetchone()
+    return bool(row and int(row[0]))
+
+
+def load_data_local(params, database, table_name, path, mapping, header=True, empty_as_null=True,
+                    on_connect=None):
+    """用 LOAD DATA LOCAL INFILE 导入文件，由服务器解析，客户端只负责发送文件内容
+
+    使用单独的连接，只允许读取该文件所在的目录。mapping 与文件列一一对应，值为表列名或 None（跳过）。
+    on_connect(connection_id) 在连接建立后调用，便于取消时对该连接发送 KILL QUERY。
+    """
+    delimiter, line_end, _bom, _fields = inspect_file(path)
+    path = os.path.abspath(path)
+    result = ImportResult('load_data')
+    targets = []
+    assignments = []
+    for i, column in enumerate(mapping):
+        if column is None:
+            targets.append("@skip")
+        elif empty_as_null:
+            targets.append(f"@v{i}")
+            assignments.append(f"{quote_ident(column)} = NULLIF(@v{i}, '')")
+        else:
+            targets.append(quote_ident(column))
+    sql = (f"LOAD DATA LOCAL INFILE %s INTO TABLE {quote_ident(table_name)} CHARACTER SET utf8mb4 "
+           f"FIELDS TERMINATED BY %s OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+           f"LINES TERMINATED BY %s {'IGNORE 1 LINES ' if header else ''}"
+           f"({', '.join(targets)})")
+    if assignments:
+        sql += " SET " + ", ".join(assignments)
+
+    start = time.perf_counter()
+    db_conn = mysql.connector.connect(**params, allow_local_infile_in_path=os.path.dirname(path))
+    try:
+        if on_connect:
+            on_connect(db_conn.connection_id)
+        cursor = db_conn.cursor()
+        if database:
+            cursor.execute(f"USE {quote_ident(database)}")
+        cursor.execute(sql, (path, delimiter, line_end))
+        result.rows = cursor.rowcount
+        result.warnings = cursor.warning_count or 0
+        db_conn.commit()
+    finally:
+        try:
+            db_conn.close()
+        except Error:
+            pass
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def parallel_insert(pool, database, table_name, columns, rows, workers=None, own_conn=None,
+                    chunk_size=BULK_INSERT_CHUNK, on_progress=None, should_stop=None):
+    """读取线程把行分组，连接池中的多条连接并发执行多行 INSERT，返回插入的行数
+
+    每条连接在自己的事务中插入，所有连接都插入完成后才一起提交；任何一条连接出错或被取消时
+    全部回滚。各连接的提交不是一个原子操作：只有提交阶段本身出错（例如连接断开）时，
+    其他连接已提交的行会保留，此时抛出的 Error 的 committed 属性为已提交的行数，消息中也会说明。
+    own_conn 为调用方已经持有的连接，作为其中一个工作连接，避免连接池只有一条连接时互相等待。
+    开始插入前取出全部工作连接，连接池中没有空闲连接时不等待，只用已经取到的连接，
+    多个导入同时进行时不会各自占着一部分连接互相等待；等待其他连接插入完成超过
+    PARALLEL_COMMIT_TIMEOUT 秒时全部回滚。
+    on_progress(inserted, elapsed) 在每组插入后调用（可能来自不同线程）。
+    """
+    connections = [own_conn] if own_conn is not None else []
+    borrowed = set()  # 从连接池取出的连接（id），结束时归还
+    for _ in range(max(1, workers or pool.size) - len(connections)):
+        try:
+            # 没有 own_conn 时第一条连接可以等待，其余的只取立即可用的
+            db_conn = pool.get_connection(timeout=0 if connections else None)
+        except Error:
+            if not connections:
+                raise
+            break
+        connections.append(db_conn)
+        borrowed.add(id(db_conn))
+    workers = len(connections)
+    broken = set()  # 断开的连接（id），丢弃而不归还
+    chunks = queue.Queue(maxsize=workers * 2)  # 限制已读入内存、尚未插入的组数
+    failed = threading.Event()
+    errors = []
+    lock = threading.Lock()
+    counts = [0] * workers
+    committed = [0] * workers
+    start = time.perf_counter()
+    decision = {'made': False, 'commit': False}
+
+    def stopped():
+        return failed.is_set() or bool(should_stop and should_stop())
+
+    def decide():
+        decision['commit'] = not stopped()
+        decision['made'] = True
+
+    # 所有连接插入完成后由其中一个线程决定提交还是回滚，各连接按同一个决定执行
+    inserted_all = threading.Barrier(workers, action=decide, timeout=PARALLEL_COMMIT_TIMEOUT)
+
+    def put(item):
+        while not stopped():
+            try:
+                chunks.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def chunk_rows():
+        while True:
+            try:
+                chunk = chunks.get(timeout=0.2)
+            except queue.Empty:
+                if stopped():
+                    return
+                continue
+            if chunk is None:
+                return
+            yield from chunk
+
+    def progress(worker, inserted):
+        with lock:
+            counts[worker] = inserted
+            total = sum(counts)
+        if on_progress:
+            on_progress(total, time.perf_counter() - start)
+
+    def work(worker):
+        db_conn = connections[worker]
+        try:
+            inserted = insert_rows(db_conn, database, table_name, columns, chunk_rows(), chunk_size,
+                                   lambda n, _t: progress(worker, n), stopped, commit=False)
+            try:
+                inserted_all.wait()
+            except threading.BrokenBarrierError:
+                if not decision['made'] and not failed.is_set():
+                    raise Error("等待其他连接插入完成超时，已回滚") from None
+                # 其他连接出错；决定已作出时仍按决定执行
+            if decision['made'] and decision['commit']:
+                db_conn.commit()
+                committed[worker] = inserted
+            else:
+                db_conn.rollback()
+        except BaseException as e:
+            if isinstance(e, (OperationalError, InterfaceError)):
+                broken.add(id(db_conn))
+            errors.append(e)
+            failed.set()
+            inserted_all.abort()
+
+    threads = [threading.Thread(target=work, args=(i,), name=f"import-{i}", daemon=True)
+               for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        rows = iter(rows)
+        while not stopped():
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk or not put(chunk):
+                break
+    except BaseException as e:
+        errors.append(e)  # 读取文件出错
+        failed.set()
+    finally:
+        for _ in threads:
+            if not put(None):
+                break
+        for thread in threads:
+            thread.join()
+        for db_conn in connections:
+            if id(db_conn) in borrowed:
+                if id(db_conn) in broken:
+                    pool.discard(db_conn)
+                else:
+                    pool.release(db_conn)
+    if errors:
+        if not sum(committed):
+            raise errors[0]
+        error = Error(f"{errors[0]}；其他连接已提交 {sum(committed)} 行，导入不完整")
+        error.committed = sum(committed)
+        raise error from errors[0]
+    if not (decision['made'] and decision['commit']):
+        raise Error("导入已取消，已回滚")
+    return sum(counts)
+
+
+def import_file(pool, database, table_name, path, mapping, header=True, empty_as_null=True,
+                own_conn=None, prefer_local_infile=True, on_start=None, on_progress=None,
+                on_connect=None, should_stop=None):
+    """导入 CSV/TSV 文件：服务器允许时用 LOAD DATA LOCAL INFILE，否则退回并发多行 INSERT
+
+    on_start(method, total_bytes) 在选定方式后调用；on_progress(rows, bytes_read, elapsed)
+    只在 INSERT 方式下调用（LOAD DATA 是一条语句，期间没有进度）。
+    """
+    total_bytes = os.path.getsize(path)
+    _delimiter, _line_end, bom, _fields = inspect_file(path)
+    check_conn = own_conn
+    use_load_data = prefer_local_infile and not (bom and not header)  # 没有列名行时 BOM 会混入第一个值
+    if use_load_data:
+        if check_conn is None:
+            with pool.connection() as check_conn:
+                use_load_data = local_infile_enabled(check_conn)
+        else:
+            use_load_data = local_infile_enabled(check_conn)
+    if use_load_data:
+        if on_start:
+            on_start('load_data', total_bytes)
+        try:
+            return load_data_local(pool.params, database, table_name, path, mapping, header,
+                                   empty_as_null, on_connect)
+        except Error as e:
+            if e.errno not in (1148, 2068, 3948):  # 服务器或客户端禁止了 LOCAL INFILE
+                raise
+
+    if on_start:
+        on_start('insert', total_bytes)
+    result = ImportResult('insert')
+    progress = {'bytes': 0}
+    indexes = [i for i, column in enumerate(mapping) if column is not None]
+    columns = [mapping[i] for i in indexes]
+    _names, rows = read_delimited(iter_file_lines(path, progress), header, empty_as_null)
+    # 只保留对应到表列的字段，字段不足时补 NULL
+    projected = ([row[i] if i < len(row) else None for i in indexes] for row in rows)
+    start = time.perf_counter()
+    result.rows = parallel_insert(
+        pool, database, table_name, columns, projected, own_conn=own_conn,
+        on_progress=on_progress and (lambda n, t: on_progress(n, progress['bytes'], t)),
+        should_stop=should_stop
+    )
+    result.elapsed = time.perf_counter() - start
+    return result
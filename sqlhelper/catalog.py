@@ -0,0 +1,307 @@
+"""元数据目录及其本地缓存"""
+import json
+import os
+import sqlite3
+import threading
+
+INTEGER_DATA_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint')
+NUMERIC_DATA_TYPES = INTEGER_DATA_TYPES + ('decimal', 'numeric', 'float', 'double', 'real', 'year')
+TEMPORAL_DATA_TYPES = ('date', 'datetime', 'timestamp')
+
+
+def _text(value):
+    """information_schema 的部分列在某些版本中以 bytes 返回，统一转成字符串"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    return value
+
+
+class Catalog:
+    """内存中的元数据目录
+
+    用四次 information_schema 批量查询（TABLES、COLUMNS、STATISTICS、KEY_COLUMN_USAGE）
+    取得所有表、列、索引和键，树形结构、表结构显示、插入/更新对话框和AI提示都从这里读取，
+    不再逐表执行 USE/SHOW TABLES/DESCRIBE。
+    """
+
+    def __init__(self):
+        self.tables = {}   # {库名: {表名: 表信息}}
+        self.columns = {}  # {(库名, 表名): [(Field, Type, Null, Key, Default, Extra, DATA_TYPE), ...]}
+        self.indexes = {}  # {(库名, 表名): {索引名: {'unique': bool, 'columns': [...]}}}
+        self.keys = {}     # {(库名, 表名): {约束名: [(列, 引用库, 引用表, 引用列), ...]}}
+        self.fingerprints = {}  # {库名: 元数据指纹}，用于判断本地缓存是否过期
+        self.cache_loaded = threading.Event()  # 本地缓存是否已导入
+        self._lock = threading.Lock()
+
+    def load(self, cursor, schemas=None):
+        """批量加载元数据，schemas 为空时加载全部数据库"""
+        if schemas is not None and not schemas:
+            return
+        where, params = "", ()
+        if schemas:
+            where = "WHERE TABLE_SCHEMA IN (" + ", ".join(["%s"] * len(schemas)) + ")"
+            params = tuple(schemas)
+
+        tables = {schema: {} for schema in schemas or ()}
+        cursor.execute(
+            "SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, ENGINE, TABLE_ROWS, "
+            f"CREATE_TIME, UPDATE_TIME, TABLE_COMMENT FROM information_schema.TABLES {where} "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME", params)
+        for schema, table, table_type, engine, rows, create_time, update_time, comment in cursor.fetchall():
+            tables.setdefault(_text(schema), {})[_text(table)] = {
+                'type': _text(table_type),
+                'engine': _text(engine),
+                'rows': rows,
+                'create_time': create_time,
+                'update_time': update_time,
+                'comment': _text(comment)
+            }
+
+        columns = {}
+        cursor.execute(
+            "SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, "
+            f"COLUMN_DEFAULT, EXTRA, DATA_TYPE FROM information_schema.COLUMNS {where} "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION", params)
+        for row in cursor.fetchall():
+            row = tuple(_text(v) for v in row)
+            columns.setdefault((row[0], row[1]), []).append(row[2:])
+
+        indexes = {}
+        cursor.execute(
+            "SELECT TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME "
+            f"FROM information_schema.STATISTICS {where} "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX", params)
+        for schema, table, index_name, non_unique, column in cursor.fetchall():
+            table_indexes = indexes.setdefault((_text(schema), _text(table)), {})
+            index = table_indexes.setdefault(_text(index_name), {'unique': not int(non_unique), 'columns': []})
+            index['columns'].append(_text(column))
+
+        keys = {}
+        cursor.execute(
+            "SELECT TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_SCHEMA, "
+            f"REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE {where} "
+            "ORDER BY TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION", params)
+        for row in cursor.fetchall():
+            row = tuple(_text(v) for v in row)
+            keys.setdefault((row[0], row[1]), {}).setdefault(row[2], []).append(row[3:])
+
+        with self._lock:
+            if schemas is None:
+                self.tables, self.columns, self.indexes, self.keys = tables, columns, indexes, keys
+                return
+            # 只替换本次加载的数据库
+            for mapping in (self.columns, self.indexes, self.keys):
+                for key in [k for k in mapping if k[0] in tables]:
+                    del mapping[key]
+            self.tables.update(tables)
+            self.columns.update(columns)
+            self.indexes.update(indexes)
+            self.keys.update(keys)
+
+    def has_schema(self, schema):
+        with self._lock:
+            return schema in self.tables
+
+    def has_table(self, schema, table):
+        with self._lock:
+            return table in self.tables.get(schema, {})
+
+    def table_names(self, schema):
+        """数据库中的表名（已排序）"""
+        with self._lock:
+            return sorted(self.tables.get(schema, {}))
+
+    def describe(self, schema, table):
+        """与 DESCRIBE 相同格式的表结构：(Field, Type, Null, Key, Default, Extra)"""
+        with self._lock:
+            return [column[:6] for column in self.columns.get((schema, table), [])]
+
+    def column_names(self, schema, table):
+        with self._lock:
+            return [column[0] for column in self.columns.get((schema, table), [])]
+
+    def data_types(self, schema, table):
+        """{列名: DATA_TYPE}，例如 int、varchar、datetime"""
+        with self._lock:
+            return {column[0]: column[6] for column in self.columns.get((schema, table), [])}
+
+    def primary_key(self, schema, table):
+        """表的主键列；没有主键时使用第一个列全部非NULL的唯一索引"""
+        with self._lock:
+            key = self.keys.get((schema, table), {}).get('PRIMARY')
+            if key:
+                return [column[0] for column in key]
+            nullable = {column[0] for column in self.columns.get((schema, table), []) if column[2] == 'YES'}
+            for index in self.indexes.get((schema, table), {}).values():
+                if index['unique'] and not nullable.intersection(index['columns']):
+                    return list(index['columns'])
+            return []
+
+    def integer_key(self, schema, table):
+        """主键第一列为整数时返回该列名（可按范围分段读取），否则返回 None"""
+        key = self.primary_key(schema, table)
+        if key and self.data_types(schema, table).get(key[0], "").lower() in INTEGER_DATA_TYPES:
+            return key[0]
+        return None
+
+    def table_indexes(self, schema, table):
+        """{索引名: {'unique': bool, 'columns': [...]}}"""
+        with self._lock:
+            return dict(self.indexes.get((schema, table), {}))
+
+    def foreign_keys(self, schema, table):
+        """[(列, 引用库, 引用表, 引用列), ...]"""
+        with self._lock:
+            return [column for name, key in self.keys.get((schema, table), {}).items()
+                    if name != 'PRIMARY' for column in key if column[2]]
+
+    def schemas(self):
+        with self._lock:
+            return list(self.tables)
+
+    def export_schema(self, schema):
+        """导出一个库的元数据，用于写入本地缓存"""
+        with self._lock:
+            return {
+                'tables': self.tables.get(schema, {}),
+                'columns': {t: c for (s, t), c in self.columns.items() if s == schema},
+                'indexes': {t: i for (s, t), i in self.indexes.items() if s == schema},
+                'keys': {t: k for (s, t), k in self.keys.items() if s == schema}
+            }
+
+    def import_schema(self, schema, payload, fingerprint=None):
+        """从本地缓存导入一个库的元数据"""
+        with self._lock:
+            self.tables[schema] = payload['tables']
+            for table, columns in payload['columns'].items():
+                self.columns[(schema, table)] = [tuple(column) for column in columns]
+            for table, indexes in payload['indexes'].items():
+                self.indexes[(schema, table)] = indexes
+            for table, keys in payload['keys'].items():
+                self.keys[(schema, table)] = {name: [tuple(column) for column in key] for name, key in keys.items()}
+            if fingerprint is not None:
+                self.fingerprints[schema] = fingerprint
+
+    def drop_schema(self, schema):
+        with self._lock:
+            self.tables.pop(schema, None)
+            self.fingerprints.pop(schema, None)
+            for mapping in (self.columns, self.indexes, self.keys):
+                for key in [k for k in mapping if k[0] == schema]:
+                    del mapping[key]
+
+    def clear(self):
+        with self._lock:
+            self.tables, self.columns, self.indexes, self.keys = {}, {}, {}, {}
+            self.fingerprints = {}
+
+    def ensure(self, db_conn, schema, table=None):
+        """确保目录中有该数据库（和表），没有时只加载这一个库"""
+        if not self.has_schema(schema) or (table and not self.has_table(schema, table)):
+            self.load(db_conn.cursor(), [schema])
+
+    def load_cache(self, cache, server):
+        """从本地缓存导入元数据，返回缓存中的数据库列表"""
+        try:
+            databases, schemas = cache.load(server)
+            for schema, (fingerprint, payload) in schemas.items():
+                # 已经从服务器加载过的库比缓存更新
+                if not self.has_schema(schema):
+                    self.import_schema(schema, payload, fingerprint)
+            return databases
+        finally:
+            self.cache_loaded.set()
+
+    def revalidate(self, cursor, cache=None, server=None, databases=None):
+        """比较指纹，只重新加载发生变化的库，并写回本地缓存；返回变化的库"""
+        self.cache_loaded.wait(timeout=10)  # 先等本地缓存导入，避免被旧数据覆盖
+        fingerprints = fetch_fingerprints(cursor)
+        changed = [schema for schema, fingerprint in fingerprints.items()
+                   if self.fingerprints.get(schema) != fingerprint]
+        removed = [schema for schema in self.schemas() if schema not in fingerprints]
+        if changed:
+            # 缓存为空时一次加载全部，否则只加载变化的库（仍然是四次批量查询）
+            self.load(cursor, None if len(changed) == len(fingerprints) else changed)
+        for schema in removed:
+            self.drop_schema(schema)
+        self.fingerprints.update({schema: fingerprints[schema] for schema in changed})
+        if cache is not None:
+            cache.save(server, databases, {schema: (fingerprints[schema], self.export_schema(schema))
+                                           for schema in changed}, removed)
+        return changed
+
+
+def fetch_fingerprints(cursor):
+    """每个数据库的元数据指纹：表的数量/创建时间，加上列定义的校验和
+
+    两次分组查询即可判断哪些库发生了变化，变化的库才需要重新加载。
+    不使用 UPDATE_TIME：它随每次写入数据变化，与表结构无关。
+    """
+    fingerprints = {}
+    cursor.execute(
+        "SELECT TABLE_SCHEMA, COUNT(*), MAX(CREATE_TIME), "
+        "SUM(CRC32(CONCAT_WS(':', TABLE_NAME, CREATE_TIME))) "
+        "FROM information_schema.TABLES GROUP BY TABLE_SCHEMA")
+    for schema, *values in cursor.fetchall():
+        fingerprints[_text(schema)] = "|".join(str(v) for v in values)
+    cursor.execute(
+        "SELECT TABLE_SCHEMA, COUNT(*), "
+        "SUM(CRC32(CONCAT_WS(':', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY))) "
+        "FROM information_schema.COLUMNS GROUP BY TABLE_SCHEMA")
+    for schema, *values in cursor.fetchall():
+        schema = _text(schema)
+        fingerprints[schema] = fingerprints.get(schema, "") + "|" + "|".join(str(v) for v in values)
+    return fingerprints
+
+
+class CatalogCache:
+    """元数据目录的本地 SQLite 缓存，按 host:port:user 区分服务器"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        cache_conn = sqlite3.connect(self.path)
+        cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS server_databases (server TEXT PRIMARY KEY, databases TEXT)")
+        cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_catalog ("
+            "server TEXT, schema_name TEXT, fingerprint TEXT, payload TEXT, "
+            "PRIMARY KEY (server, schema_name))")
+        return cache_conn
+
+    def load(self, server):
+        """读取缓存，返回 (数据库列表, {库名: (指纹, 元数据)})"""
+        cache_conn = self._connect()
+        try:
+            row = cache_conn.execute(
+                "SELECT databases FROM server_databases WHERE server = ?", (server,)).fetchone()
+            databases = json.loads(row[0]) if row else []
+            schemas = {
+                schema: (fingerprint, json.loads(payload))
+                for schema, fingerprint, payload in cache_conn.execute(
+                    "SELECT schema_name, fingerprint, payload FROM schema_catalog WHERE server = ?", (server,))
+            }
+            return databases, schemas
+        finally:
+            cache_conn.close()
+
+    def save(self, server, databases=None, schemas=None, removed=()):
+        """写入数据库列表和发生变化的库，删除已不存在的库"""
+        cache_conn = self._connect()
+        try:
+            with cache_conn:
+                if databases is not None:
+                    cache_conn.execute(
+                        "REPLACE INTO server_databases (server, databases) VALUES (?, ?)",
+                        (server, json.dumps(databases)))
+                cache_conn.executemany(
+                    "REPLACE INTO schema_catalog (server, schema_name, fingerprint, payload) VALUES (?, ?, ?, ?)",
+                    [(server, schema, fingerprint, json.dumps(payload, default=str))
+                     for schema, (fingerprint, payload) in (schemas or {}).items()])
+                cache_conn.executemany(
+                    "DELETE FROM schema_catalog WHERE server = ? AND schema_name = ?",
+                    [(server, schema) for schema in removed])
+        finally:
+            cache_conn.close()
@@ -0,0 +1,271 @@
+"""图表数据准备
+
+图表只用到 X/Y 两列：分组聚合和降采样都在服务器上完成，客户端只接收几千行，
+与表的大小无关。
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from mysql.connector import Error
+
+from .catalog import INTEGER_DATA_TYPES, NUMERIC_DATA_TYPES, TEMPORAL_DATA_TYPES
+from .query import quote_ident, run_query
+
+CHART_MAX_POINTS = 2000  # 折线图最多绘制的点数
+CHART_MAX_GROUPS = 200   # 柱状图、饼图最多显示的分组数，按聚合值取前若干组
+CHART_AGGREGATES = {'求和': 'SUM', '平均': 'AVG', '计数': 'COUNT', '最大': 'MAX', '最小': 'MIN'}
+DENSITY_BINS = (400, 250)     # 密度图的网格大小（X、Y 方向的格数），与图像的像素数相当
+DENSITY_BATCH_SIZE = 50000    # 密度图每批读取并分箱的行数
+TIME_BUCKETS = {  # 时间序列的聚合粒度（秒）
+    '1 秒': 1, '10 秒': 10, '30 秒': 30, '1 分钟': 60, '5 分钟': 300, '15 分钟': 900, '30 分钟': 1800,
+    '1 小时': 3600, '3 小时': 10800, '6 小时': 21600, '12 小时': 43200, '1 天': 86400, '1 周': 604800,
+    '1 月': 2592000
+}
+MONTH_BUCKET = TIME_BUCKETS['1 月']  # 按日历月分组，秒数只用于选择粒度
+
+
+def _fetch(db_conn, database, sql, params=None):
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def _frame(x, y):
+    """x、y 两列的 DataFrame，Y 转换为数值（Decimal 等转为浮点数），去掉无法转换的行"""
+    data = pd.DataFrame({'x': list(x), 'y': pd.to_numeric(pd.Series(list(y), dtype=object), errors='coerce')})
+    return data.dropna(subset=['y']).reset_index(drop=True)
+
+
+def fetch_grouped(db_conn, database, table_name, x_col, y_col, aggregate='SUM', max_groups=CHART_MAX_GROUPS,
+                  order_by_value=True, x_type=None):
+    """按 X 分组聚合 Y（GROUP BY 在服务器上执行），用于柱状图和饼图
+
+    x_type 为 X 的 DATA_TYPE。时间列按时间段、数值列按等宽区间分组（最多 max_groups 段），
+    临时表只有几百行，与 X 有多少个不同的值无关；取值不超过 max_groups 个的整数列和其他列按原值分组。
+    order_by_value 为 True 时取聚合值最大的 max_groups 组，否则按 X 升序取前 max_groups 组。
+    返回 dict：data（x、y 两列，分段时 x 为每段的起点）、groups（返回的组数）、truncated（是否还有更多组）、
+    bucket（分段的宽度，时间列为秒数；按原值分组时为 None）。
+    """
+    aggregate = aggregate.upper()
+    if aggregate not in CHART_AGGREGATES.values():
+        raise ValueError(f"不支持的聚合方式: {aggregate}")
+    x_type = (x_type or "").lower()
+    if x_type in TEMPORAL_DATA_TYPES:
+        result = fetch_time_series(db_conn, database, table_name, x_col, y_col, aggregate, max_points=max_groups)
+        data = result['data']
+        if order_by_value:
+            data = data.sort_values('y', ascending=False, kind='stable').reset_index(drop=True)
+        return {'data': data, 'groups': len(data), 'truncated': False, 'bucket': result['bucket']}
+    x, value = quote_ident(x_col), f"{aggregate}({quote_ident(y_col)})"
+    if x_type in NUMERIC_DATA_TYPES:
+        low, high = _fetch(db_conn, database, f"SELECT MIN({x}), MAX({x}) FROM {quote_ident(table_name)}")[0]
+        integral = x_type in INTEGER_DATA_TYPES or x_type == 'year'
+        if low is not None and not (integral and high - low < max_groups):
+            return _fetch_numeric_buckets(db_conn, database, table_name, x, value, float(low), float(high),
+                                          integral, max_groups, order_by_value)
+    order = f"{value} DESC" if order_by_value else x
+    rows = _fetch(db_conn, database,
+                  f"SELECT {x}, {value} FROM {quote_ident(table_name)} "
+                  f"GROUP BY {x} ORDER BY {order} LIMIT {int(max_groups) + 1}")
+    truncated = len(rows) > max_groups
+    rows = rows[:max_groups]
+    data = _frame((row[0] for row in rows), (row[1] for row in rows))
+    return {'data': data, 'groups': len(rows), 'truncated': truncated, 'bucket': None}
+
+
+def _fetch_numeric_buckets(db_conn, database, table_name, x, value, low, high, integral, max_groups,
+                           order_by_value):
+    """把数值 X 的范围均分为最多 max_groups 段分组聚合，每段以其中最小的 X 为标签"""
+    width = (high - low) / max(max_groups - 1, 1) or 1.0  # 最大值落在最后一段
+    if integral:
+        width = float(math.ceil(width))
+    bucket = f"FLOOR(({x} - %s) / %s)"
+    order = f"{value} DESC" if order_by_value else f"MIN({x})"
+    rows = _fetch(db_conn, database,
+                  f"SELECT MIN({x}), {value} FROM {quote_ident(table_name)} WHERE {x} IS NOT NULL "
+                  f"GROUP BY {bucket} ORDER BY {order}", (low, width))
+    data = _frame((row[0] for row in rows), (row[1] for row in rows))
+    return {'data': data, 'groups': len(rows), 'truncated': False, 'bucket': width}
+
+
+def fetch_line(db_conn, database, table_name, x_col, y_col, max_points=CHART_MAX_POINTS):
+    """折线图数据，X 必须是数值列
+
+    先用 LIMIT 取最多 max_points + 1 行，行数不超过 max_points 时就是全部数据；
+    否则在服务器上把 X 的范围均分为 max_points 个桶，每个桶只返回 X 的平均值和 Y 的最小、最大值
+    （保留尖峰），再用 LTTB 从这些点中选出 max_points 个。
+    返回 dict：data（按 X 排序的 x、y 两列）、rows（参与计算的行数）、downsampled。
+    """
+    x, y, table = quote_ident(x_col), quote_ident(y_col), quote_ident(table_name)
+    not_null = f"{x} IS NOT NULL AND {y} IS NOT NULL"
+    rows = _fetch(db_conn, database, f"SELECT {x}, {y} FROM {table} WHERE {not_null} LIMIT {int(max_points) + 1}")
+    if len(rows) <= max_points:
+        data = _frame((row[0] for row in rows), (row[1] for row in rows))
+        data['x'] = pd.to_numeric(data['x'], errors='coerce')
+        data = data.dropna().sort_values('x', kind='stable').reset_index(drop=True)
+        return {'data': data, 'rows': len(rows), 'downsampled': False}
+
+    # 没有 WHERE 时 MIN/MAX 可以直接读 X 上的索引
+    low, high = _fetch(db_conn, database, f"SELECT MIN({x}), MAX({x}) FROM {table}")[0]
+    low, high = float(low), float(high)
+    width = (high - low) / max_points or 1.0
+    buckets = _fetch(db_conn, database,
+                     f"SELECT AVG({x}), MIN({y}), MAX({y}), COUNT(*) FROM {table} WHERE {not_null} "
+                     f"GROUP BY FLOOR(({x} - %s) / %s) ORDER BY MIN({x})", (low, width))
+    points_x = [value for row in buckets for value in (row[0], row[0])]
+    points_y = [value for row in buckets for value in (row[1], row[2])]
+    data = _frame(points_x, points_y)
+    xs, ys = lttb(pd.to_numeric(data['x']).to_numpy(dtype=float), data['y'].to_numpy(dtype=float), max_points)
+    return {'data': pd.DataFrame({'x': xs, 'y': ys}), 'rows': sum(row[3] for row in buckets),
+            'downsampled': True}
+
+
+def _numeric_columns(rows):
+    """把一批 (x, y) 行转换为两个浮点数组，无法转换的值为 NaN"""
+    try:
+        values = np.array(rows, dtype=float)
+    except (TypeError, ValueError):
+        values = np.column_stack([pd.to_numeric(pd.Series(column, dtype=object), errors='coerce')
+                                  for column in zip(*rows)])
+    return values[:, 0], values[:, 1]
+
+
+def fetch_density(db_conn, database, table_name, x_col, y_col, bins=DENSITY_BINS,
+                  batch_size=DENSITY_BATCH_SIZE, on_progress=None, should_stop=None):
+    """把所有 (x, y) 点分箱到固定大小的网格，用于密度图，内存只与网格和一批行有关
+
+    先查询 X、Y 的范围，再用非缓冲游标分批读取两列，每批用 np.histogram2d 累加到网格。
+    返回 dict：counts（形状为 bins 的计数数组，counts[i, j] 为第 i 个 X 格、第 j 个 Y 格）、
+    extent（X、Y 的范围 (x0, x1, y0, y1)）、rows（分箱的点数）。
+    on_progress(rows, elapsed) 每批调用一次。
+    """
+    x, y, table = quote_ident(x_col), quote_ident(y_col), quote_ident(table_name)
+    counts = np.zeros(bins, dtype=np.int64)
+    x_low, x_high, y_low, y_high = _fetch(db_conn, database,
+                                          f"SELECT MIN({x}), MAX({x}), MIN({y}), MAX({y}) FROM {table}")[0]
+    if x_low is None or y_low is None:
+        return {'counts': counts, 'extent': (0, 1, 0, 1), 'rows': 0}
+    extent = [float(x_low), float(x_high), float(y_low), float(y_high)]
+    for i in (0, 2):
+        if extent[i] == extent[i + 1]:
+            extent[i + 1] = extent[i] + 1  # 只有一个值时给出单位宽度，避免范围为空
+    value_range = [extent[0:2], extent[2:4]]
+    binned = 0
+
+    def on_batch(rows, received, elapsed):
+        nonlocal binned
+        xs, ys = _numeric_columns(rows)
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        counts[:] += np.histogram2d(xs[valid], ys[valid], bins=bins, range=value_range)[0].astype(np.int64)
+        binned += int(valid.sum())
+        if on_progress:
+            on_progress(binned, elapsed)
+
+    result = run_query(db_conn, f"SELECT {x}, {y} FROM {table} WHERE {x} IS NOT NULL AND {y} IS NOT NULL",
+                       batch_size=batch_size, on_batch=on_batch, should_stop=should_stop)
+    if result.stopped:
+        raise Error("密度图计算已取消")
+    return {'counts': counts, 'extent': tuple(extent), 'rows': binned}
+
+
+def choose_time_bucket(start, end, max_points=CHART_MAX_POINTS):
+    """选择使桶数不超过 max_points 的最小粒度（秒）"""
+    span = max((end - start).total_seconds(), 1)
+    for seconds in TIME_BUCKETS.values():
+        if span / seconds <= max_points:
+            return seconds
+    return int(-(-span // max_points))
+
+
+def time_bucket_label(seconds):
+    """时间粒度的说明文字，例如 1 小时"""
+    return next((label for label, value in TIME_BUCKETS.items() if value == seconds), f"{seconds} 秒")
+
+
+def time_bucket_origin(bucket, offset):
+    """固定宽度分桶时加到 UNIX_TIMESTAMP 上的秒数，offset 为会话时区与 UTC 的差（秒）
+
+    UNIX 时间戳从 UTC 1970-01-01（星期四）零点开始计数，加上 offset 后桶从本地零点开始，
+    按周的桶再移动 4 天，从星期一开始。
+    """
+    if bucket % TIME_BUCKETS['1 周'] == 0:
+        return offset - 4 * 86400
+    return offset
+
+
+def time_bucket_sql(column, bucket, offset):
+    """返回 (分组表达式, 由分组值 bucket_ 换算桶起始时间的表达式)，column 为已加引号的列名"""
+    if bucket == MONTH_BUCKET:
+        return (f"YEAR({column}) * 12 + MONTH({column}) - 1",
+                "MAKEDATE(bucket_ DIV 12, 1) + INTERVAL (bucket_ MOD 12) MONTH")
+    origin = time_bucket_origin(bucket, offset)
+    return (f"FLOOR((UNIX_TIMESTAMP({column}) + {origin}) / {bucket})",
+            f"FROM_UNIXTIME(bucket_ * {bucket} - {origin})")
+
+
+def fetch_time_series(db_conn, database, table_name, time_col, y_col, aggregate='AVG', start=None, end=None,
+                      bucket=None, max_points=CHART_MAX_POINTS):
+    """按时间桶在服务器上聚合 Y，每个桶只返回一行
+
+    时间列按 FLOOR((UNIX_TIMESTAMP(列) + 偏移) / 粒度) 分桶，偏移取自会话时区，天、周的桶与本地日历对齐
+    （周从星期一开始），月按日历月分组；桶的起始时间由服务器换算，与列值使用相同的会话时区。
+    偏移是查询时的时区差，范围跨越夏令时切换时，切换之后的桶会错开一小时。
+    start/end 限定时间范围（时间列上有索引时只扫描这个范围），省略时使用列的最小、最大值；
+    bucket 为粒度（秒），省略时按 max_points 自动选择。
+    返回 dict：data（x 为桶的起始时间、y 为聚合值）、rows（参与聚合的行数）、bucket、start、end。
+    """
+    aggregate = aggregate.upper()
+    if aggregate not in CHART_AGGREGATES.values():
+        raise ValueError(f"不支持的聚合方式: {aggregate}")
+    t, y, table = quote_ident(time_col), quote_ident(y_col), quote_ident(table_name)
+    offset_sql = "TIMESTAMPDIFF(SECOND, UTC_TIMESTAMP(), NOW())"
+    if start is None or end is None:
+        low, high, offset = _fetch(db_conn, database, f"SELECT MIN({t}), MAX({t}), {offset_sql} FROM {table}")[0]
+        start = low if start is None else start
+        end = high if end is None else end
+    else:
+        offset = _fetch(db_conn, database, f"SELECT {offset_sql}")[0][0]
+    if start is None or end is None:
+        return {'data': _frame([], []), 'rows': 0, 'bucket': bucket, 'start': start, 'end': end}
+    start, end = pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime()
+    bucket = int(bucket or choose_time_bucket(start, end, max_points))
+    bucket_expr, start_expr = time_bucket_sql(t, bucket, int(offset))
+    # 内层按表达式分组，外层换算时间，避免桶的别名与表中的列重名
+    rows = _fetch(db_conn, database,
+                  f"SELECT {start_expr}, value_, rows_ FROM ("
+                  f"SELECT {bucket_expr} AS bucket_, {aggregate}({y}) AS value_, COUNT(*) AS rows_ FROM {table} "
+                  f"WHERE {t} >= %s AND {t} <= %s GROUP BY {bucket_expr}) AS buckets ORDER BY bucket_",
+                  (start, end))
+    data = _frame((row[0] for row in rows), (row[1] for row in rows))
+    data['x'] = pd.to_datetime(data['x'])
+    return {'data': data, 'rows': sum(row[2] for row in rows), 'bucket': bucket, 'start': start, 'end': end}
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets 降采样：保留形状上最重要的 threshold 个点（x 已排序）"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = max(min(int((i + 2) * every) + 1, n), end + 1)  # 最后一个桶之后是终点
+        # 与下一个桶的平均点构成的三角形面积最大的点
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def prepare_chart_data(data, sort_enabled=False, ascending=True):
+    """按需按 X 排序服务器返回的图表数据（x、y 两列，只有几千行）"""
+    if sort_enabled:
+        data = data.sort_values(by='x', ascending=ascending, kind='stable').reset_index(drop=True)
+    return data
@@ -0,0 +1,28 @@
+"""连接配置"""
+import os
+
+# 默认数据库连接配置
+DEFAULT_CONFIG = {
+    'host': 'localhost',
+    'port': 3307,
+    'user': 'root',
+    'password': 'root',
+    'ai_api_key': '',
+    'ai_api_url': 'https://api.openai.com/v1/chat/completions',  # OpenAI API端点
+    'selected_model': 'gpt-4o-mini',  # 默认模型
+    'pool_size': 4  # 连接池大小，也是后台并发执行的数据库任务数
+}
+
+# 元数据目录的本地缓存文件
+CATALOG_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".sql_helper", "catalog_cache.sqlite3")
+
+
+def connection_params(config):
+    """从配置中取出 mysql.connector.connect 需要的参数"""
+    return dict(host=config['host'], port=config['port'],
+                user=config['user'], password=config['password'])
+
+
+def server_key(config):
+    """服务器在缓存中的键"""
+    return f"{config['host']}:{config['port']}:{config['user']}"
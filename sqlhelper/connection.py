@@ -0,0 +1,144 @@
+"""连接池和查询取消"""
+import contextlib
+import threading
+
+import mysql.connector
+from mysql.connector import Error, InterfaceError, OperationalError, PoolError
+
+
+class ConnectionPool:
+    """数据库连接池：按需建立连接，取出时做健康检查，连接失效时自动重连
+
+    每个任务独占一条连接（会话），树形结构、表内容、图表和AI查询可以并发执行，
+    互不影响各自的 USE 状态。
+    """
+
+    def __init__(self, size, **params):
+        self.size = max(int(size), 1)
+        self.params = params
+        self._idle = []  # 空闲连接，后进先出
+        self._created = 0
+        # 保护 _idle 和 _created；归还或丢弃连接时通知等待的线程
+        self._available = threading.Condition()
+        self._closed = False
+
+    def _connect(self):
+        return mysql.connector.connect(**self.params)
+
+    def get_connection(self, timeout=None):
+        """取出一条可用连接，连接数已满时等待其他任务归还或丢弃连接"""
+        with self._available:
+            ready = self._available.wait_for(
+                lambda: self._closed or self._idle or self._created < self.size, timeout)
+            if self._closed:
+                raise InterfaceError(msg="连接池已关闭")
+            if not ready:
+                raise PoolError(msg="等待可用连接超时")
+            if self._idle:
+                connection = self._idle.pop()
+            else:
+                connection = None
+                self._created += 1
+        if connection is None:
+            try:
+                return self._connect()
+            except Exception:
+                self._free_slot()
+                raise
+        return self._check(connection)
+
+    def _free_slot(self):
+        """连接数减一，并唤醒一个等待连接的线程"""
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _check(self, connection):
+        """健康检查：ping 失败时丢弃旧连接并重新建立"""
+        try:
+            connection.ping(reconnect=True, attempts=2, delay=0)
+            return connection
+        except (OperationalError, InterfaceError):
+            self._close_quietly(connection)
+            try:
+                return self._connect()
+            except Exception:
+                self._free_slot()
+                raise
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """with 语句中使用一条连接，结束时归还；连接断开时丢弃"""
+        db_conn = self.get_connection(timeout)
+        try:
+            yield db_conn
+        except (OperationalError, InterfaceError):
+            self.discard(db_conn)
+            raise
+        except BaseException:
+            self.release(db_conn)
+            raise
+        self.release(db_conn)
+
+    def release(self, connection):
+        """归还连接，有未读结果或事务未结束时先清理"""
+        if self._closed or connection.unread_result:
+            self.discard(connection)
+            return
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self.discard(connection)
+            return
+        with self._available:
+            self._idle.append(connection)
+            self._available.notify()
+
+    def discard(self, connection):
+        """丢弃不能再使用的连接（断线、被中断的查询等）"""
+        if connection.unread_result:
+            # 不读取剩余结果，直接断开套接字，服务器端的查询随之中止
+            connection.shutdown()
+        else:
+            self._close_quietly(connection)
+        self._free_slot()
+
+    def close_all(self):
+        """关闭连接池，正在使用的连接会在归还时关闭"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+def kill_queries(params, connection_ids, lock=None, still_running=None):
+    """通过另一条连接对指定会话发送 KILL QUERY
+
+    建立连接需要时间，期间任务可能已经结束并把连接归还给其他任务。still_running(connection_id)
+    在持有 lock 时确认该连接仍在执行被取消的任务，否则不发送；调用方在改变连接归属时也持有 lock。
+    会话已不存在（1094 Unknown thread id）时忽略。
+    """
+    side_conn = mysql.connector.connect(**params)
+    try:
+        cursor = side_conn.cursor()
+        for connection_id in connection_ids:
+            with lock or contextlib.nullcontext():
+                if still_running is not None and not still_running(connection_id):
+                    continue
+                try:
+                    cursor.execute(f"KILL QUERY {int(connection_id)}")
+                except Error as e:
+                    if e.errno != 1094:
+                        raise
+    finally:
+        side_conn.close()
@@ -0,0 +1,171 @@
+"""后台任务执行器"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error, InterfaceError, OperationalError
+
+from .connection import kill_queries
+
+
+class DbTask:
+    """提交到后台线程执行的任务"""
+
+    def __init__(self, executor, work, on_success=None, on_error=None, pool=None, on_cancelled=None):
+        self.executor = executor
+        self.work = work
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled  # 被取消时代替 on_error 调用 (error)，没有时调用执行器的 on_cancelled
+        self.pool = pool  # 提交时的连接池，修改设置后旧任务仍归还到原来的池
+        self.connection_id = None  # 正在执行该任务的数据库连接ID，用于 KILL QUERY
+        self.cancelled = threading.Event()
+
+    def post(self, callback, *args):
+        """从工作线程把回调投递给调用 poll() 的线程执行"""
+        self.executor.results.put((callback, args))
+
+
+class DbExecutor:
+    """后台任务执行器，与界面无关
+
+    数据库任务在线程池中执行，每个任务从连接池取出独立的连接（会话），线程数与连接池大小一致；
+    结果和回调放入队列，由调用方在自己的线程中调用 poll() 处理（Tk 界面在 after 循环中调用）。
+    """
+
+    def __init__(self, pool=None, io_workers=2):
+        self.pool = None
+        self.results = queue.Queue()
+        self.running = set()
+        self.on_state_change = None     # 正在运行的任务数变化时调用
+        self.on_unhandled_error = None  # 任务没有 on_error 时调用 (task, error)
+        self.on_cancelled = None        # 被取消的任务结束时调用 (task)
+        self._db = None
+        self._db_size = 0
+        # 任务与连接的归属（task.connection_id）只在持有这把锁时改变，KILL 前在锁内确认归属
+        self._owner_lock = threading.Lock()
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        self.set_pool(pool)
+
+    def set_pool(self, pool):
+        """更换连接池，后台并发数随连接池大小调整"""
+        self.pool = pool
+        size = pool.size if pool else 1
+        if size != self._db_size:
+            if self._db:
+                self._db.shutdown(wait=False)
+            self._db = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db")
+            self._db_size = size
+
+    def submit(self, work, on_success=None, on_error=None, on_cancelled=None):
+        """提交数据库任务，work(conn, task) 在后台线程执行，回调在 poll() 所在线程执行"""
+        task = DbTask(self, work, on_success, on_error, self.pool, on_cancelled)
+        self._start(task)
+        self._db.submit(self._run, task)
+        return task
+
+    def run_in_background(self, work, on_success=None, on_error=None):
+        """在后台线程执行与数据库无关的耗时操作（例如调用AI接口），work() 不接收参数"""
+        task = DbTask(self, lambda _conn, _task: work(), on_success, on_error)
+        self._start(task)
+        self._io.submit(self._run, task, False)
+        return task
+
+    def _start(self, task):
+        self.running.add(task)
+        if self.on_state_change:
+            self.on_state_change()
+
+    def _run(self, task, use_db=True):
+        """在工作线程中执行任务：从连接池取出连接，执行后归还，并把结果交回"""
+        db_conn = None
+        try:
+            if task.cancelled.is_set():
+                raise Error("任务已取消")
+            if use_db:
+                if task.pool is None:
+                    raise Error("数据库未连接")
+                db_conn = task.pool.get_connection()
+                with self._owner_lock:
+                    task.connection_id = db_conn.connection_id
+            result = task.work(db_conn, task)
+        except Exception as e:
+            broken = isinstance(e, (OperationalError, InterfaceError))
+            task.post(self._finish, task, None, e)
+        else:
+            broken = False
+            task.post(self._finish, task, result, None)
+        finally:
+            with self._owner_lock:
+                task.connection_id = None
+                if db_conn is not None:
+                    if broken:
+                        # 连接已断开，丢弃后下次取连接时会重新建立
+                        task.pool.discard(db_conn)
+                    else:
+                        task.pool.release(db_conn)
+
+    def _finish(self, task, result, error):
+        """处理任务结果"""
+        self.running.discard(task)
+        if self.on_state_change:
+            self.on_state_change()
+        if error is None:
+            if task.on_success:
+                task.on_success(result)
+        elif task.cancelled.is_set():
+            if task.on_cancelled:
+                task.on_cancelled(error)
+            elif self.on_cancelled:
+                self.on_cancelled(task)
+        elif task.on_error:
+            task.on_error(error)
+        elif self.on_unhandled_error:
+            self.on_unhandled_error(task, error)
+
+    def poll(self):
+        """执行后台线程投递的全部回调"""
+        while True:
+            try:
+                callback, args = self.results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"后台任务回调失败: {e}")
+
+    def cancel(self, tasks=None):
+        """取消任务（默认全部）：标记取消，并通过另一条连接对正在执行的查询发送 KILL QUERY"""
+        tasks = list(self.running if tasks is None else tasks)
+        for task in tasks:
+            task.cancelled.set()
+        targets = {}
+        for task in tasks:
+            connection_id = task.connection_id
+            if connection_id and task.pool is not None:
+                targets.setdefault(id(task.pool), (task.pool, {}))[1][connection_id] = task
+        if not targets:
+            return False
+
+        def kill():
+            for target_pool, owners in targets.values():
+                try:
+                    # 只在连接仍在执行被取消的任务时 KILL，避免误杀复用这条连接的新任务
+                    kill_queries(target_pool.params, list(owners), self._owner_lock,
+                                 lambda connection_id: owners[connection_id].connection_id == connection_id)
+                except Error as e:
+                    self.results.put((self._report, (None, Error(f"取消查询失败: {e}"))))
+
+        # 工作线程正忙于被取消的查询，这里单独起一个线程
+        threading.Thread(target=kill, daemon=True).start()
+        return True
+
+    def _report(self, task, error):
+        if self.on_unhandled_error:
+            self.on_unhandled_error(task, error)
+
+    def shutdown(self):
+        """停止接收新任务"""
+        self._db.shutdown(wait=False, cancel_futures=True)
+        self._io.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,276 @@
+"""流式导出：边读取边写文件，内存占用与结果集大小无关"""
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+
+from mysql.connector import Error
+
+from .query import quote_ident, run_query
+from .script import statement_keyword
+from .writers import CsvWriter, JsonlWriter, ParquetWriter
+
+EXPORT_FORMATS = ('csv', 'parquet', 'jsonl')
+COMPRESSIONS = ('gzip', 'zstd')  # 文本格式压缩整个文件，Parquet 在文件内部按列压缩
+EXPORT_BATCH_SIZE = 10000  # 导出时每批读取的行数，比界面显示时大，减少回调次数
+QUERY_KEYWORDS = ('SELECT', 'WITH', 'TABLE', 'VALUES', 'SHOW', 'DESCRIBE', 'DESC', 'EXPLAIN')
+
+
+def export_extension(fmt, compression=None):
+    """导出文件的扩展名，例如 .csv.gz"""
+    extension = "." + fmt
+    if compression and fmt != 'parquet':
+        extension += ".gz" if compression == 'gzip' else ".zst"
+    return extension
+
+
+def _open_zstd(path):
+    try:
+        from compression import zstd  # Python 3.14 起自带
+        return zstd.open(path, "wb")
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd 压缩需要安装 zstandard") from None
+    return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+
+
+def open_output(path, compression=None):
+    """打开输出文件（二进制），按需压缩"""
+    if compression == 'gzip':
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == 'zstd':
+        return _open_zstd(path)
+    if compression:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    return open(path, "wb")
+
+
+def open_export(path, fmt, compression=None, header=True):
+    """打开导出文件并创建写出器，返回 (文件, 写出器)"""
+    if fmt == 'parquet':
+        stream = open(path, "wb")
+        return stream, ParquetWriter(stream, compression)
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    stream = open_output(path, compression)
+    return stream, CsvWriter(stream, header) if fmt == 'csv' else JsonlWriter(stream)
+
+
+def export_query(db_conn, sql, path, fmt="csv", compression=None, database=None,
+                 batch_size=EXPORT_BATCH_SIZE, on_progress=None, should_stop=None, params=None, header=True,
+                 commit=True):
+    """执行查询，用非缓冲游标分批读取并直接写入文件，返回导出的行数
+
+    on_progress(rows, elapsed) 每批调用一次。出错或被取消时删除不完整的文件。
+    只接受查询语句，避免导出时误执行修改数据的语句。commit 的含义同 run_query。
+    """
+    if statement_keyword(sql) not in QUERY_KEYWORDS:
+        raise ValueError("只能导出查询语句（SELECT、SHOW 等）的结果")
+    stream, writer = open_export(path, fmt, compression, header)
+    completed = False
+
+    def on_batch(rows, received, elapsed):
+        writer.write_rows(rows)
+        if on_progress:
+            on_progress(received, elapsed)
+
+    try:
+        result = run_query(db_conn, sql, database, batch_size, on_columns=writer.begin,
+                           on_batch=on_batch, should_stop=should_stop, params=params, commit=commit)
+        if result.columns is None:
+            raise Error("语句没有返回结果集，无法导出")
+        if result.stopped:
+            raise Error("导出已取消")
+        writer.end()
+        completed = True
+    finally:
+        try:
+            writer.close()
+            stream.close()
+        finally:
+            if not completed:
+                os.remove(path)
+    return result.received
+
+
+def export_table(db_conn, database, table_name, path, fmt="csv", compression=None, **kwargs):
+    """导出整张表"""
+    return export_query(db_conn, f"SELECT * FROM {quote_ident(table_name)}", path, fmt, compression,
+                        database, **kwargs)
+
+
+def split_key_range(low, high, parts):
+    """把整数键区间 [low, high] 均分为最多 parts 段，返回 (起点, 终点) 列表，最后一段包含终点"""
+    parts = max(1, min(parts, high - low + 1))
+    step = (high - low + 1) / parts
+    bounds = [low + int(step * i) for i in range(parts)] + [high]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+def part_path(path, index, fmt, compression=None):
+    """分段文件名：data.csv.gz -> data.part0001.csv.gz"""
+    extension = export_extension(fmt, compression)
+    base = path[:-len(extension)] if path.endswith(extension) else path
+    return f"{base}.part{index + 1:04d}{extension}"
+
+
+def _merge_parquet(parts, path, compression=None):
+    """把多个 Parquet 分段按顺序合并为一个文件，逐个行组复制"""
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for part in parts:
+            source = pq.ParquetFile(part)
+            if writer is None:
+                options = {'compression': compression} if compression else {}
+                writer = pq.ParquetWriter(path, source.schema_arrow, **options)
+            for group in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(group))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_table_parallel(pool, database, table_name, key_column, path, fmt="csv", compression=None,
+                          workers=4, ordered=True, lock_tables=False, own_conn=None,
+                          batch_size=EXPORT_BATCH_SIZE, on_progress=None, should_stop=None):
+    """按整数主键范围分段，用连接池中的多条连接并发导出一张表，返回 (行数, 文件列表)
+
+    每条工作连接用 START TRANSACTION WITH CONSISTENT SNAPSHOT 读取；lock_tables 为 True 时，
+    own_conn 在所有工作连接建立快照期间持有 LOCK TABLES ... READ，各连接的快照因此完全一致。
+    ordered 为 True 时各段按主键顺序拼接成 path 一个文件（gzip、zstd 允许直接拼接多个压缩帧，
+    Parquet 逐个行组合并），否则保留为 path.part0001 等分段文件。
+    own_conn 为调用方持有的连接，用于查询主键范围和加锁，不参与读取；连接池中没有其他连接时
+    退回为在 own_conn 上用一条查询导出（单条语句本身就是一致性读）。
+    主键范围在快照之前读取，第一段不设下限、最后一段不设上限，之后插入到范围之外的行也会导出。
+    """
+    table = quote_ident(table_name)
+    key = quote_ident(key_column)
+    if own_conn is not None and pool.size < 2:
+        rows = export_table(own_conn, database, table_name, path, fmt, compression, batch_size=batch_size,
+                            on_progress=on_progress, should_stop=should_stop)
+        return rows, [path]
+    lock_tables = lock_tables and own_conn is not None
+    workers = max(1, min(workers, pool.size - 1 if own_conn is not None else pool.size))
+    start = time.perf_counter()
+
+    def run_on(db_conn, sql):
+        cursor = db_conn.cursor()
+        if database:
+            cursor.execute(f"USE {quote_ident(database)}")
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+    if own_conn is not None:
+        low, high = run_on(own_conn, f"SELECT MIN({key}), MAX({key}) FROM {table}")[0]
+    else:
+        with pool.connection() as db_conn:
+            low, high = run_on(db_conn, f"SELECT MIN({key}), MAX({key}) FROM {table}")[0]
+    ranges = split_key_range(int(low), int(high), workers * 4) if low is not None else [(0, 0)]
+    parts = [part_path(path, i, fmt, compression) for i in range(len(ranges))]
+
+    tasks = queue.Queue()
+    for index in range(len(ranges)):
+        tasks.put(index)
+    failed = threading.Event()
+    errors = []
+    lock = threading.Lock()
+    counts = [0] * len(ranges)
+    snapshot = threading.Barrier(workers + 1 if lock_tables else 1, timeout=30)
+
+    def stopped():
+        return failed.is_set() or bool(should_stop and should_stop())
+
+    def export_range(db_conn, index):
+        first, last = ranges[index]
+        conditions, params = [], []
+        if index > 0:
+            conditions.append(f"{key} >= %s")
+            params.append(first)
+        if index < len(ranges) - 1:
+            conditions.append(f"{key} < %s")
+            params.append(last)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def progress(rows, _elapsed):
+            with lock:
+                counts[index] = rows
+                total = sum(counts)
+            if on_progress:
+                on_progress(total, time.perf_counter() - start)
+
+        export_query(db_conn, f"SELECT * FROM {table}{where} ORDER BY {key}",
+                     parts[index], fmt, compression, batch_size=batch_size, on_progress=progress,
+                     should_stop=stopped, params=tuple(params) or None, header=index == 0 or not ordered,
+                     commit=False)  # 同一条连接上的各段都在 work() 开启的快照中读取
+
+    def work():
+        try:
+            with pool.connection() as db_conn:
+                cursor = db_conn.cursor()
+                if database:
+                    cursor.execute(f"USE {quote_ident(database)}")
+                cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+                if lock_tables:
+                    snapshot.wait()
+                while not stopped():
+                    try:
+                        index = tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    export_range(db_conn, index)
+                db_conn.commit()  # 所有分段读完后才结束快照
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+            snapshot.abort()
+
+    threads = [threading.Thread(target=work, name=f"export-{i}", daemon=True) for i in range(workers)]
+    locked = False
+    try:
+        if lock_tables:
+            # 加锁期间写入被阻塞，所有工作连接在同一时刻建立快照后立即解锁
+            own_conn.cursor().execute(f"LOCK TABLES {table} READ")
+            locked = True
+        for thread in threads:
+            thread.start()
+        if lock_tables:
+            try:
+                snapshot.wait()
+            except threading.BrokenBarrierError:
+                failed.set()
+            own_conn.cursor().execute("UNLOCK TABLES")
+            locked = False
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        if should_stop and should_stop():
+            raise Error("导出已取消")
+        if not ordered:
+            return sum(counts), parts
+        if fmt == 'parquet':
+            _merge_parquet(parts, path, compression)
+        else:
+            with open(path, "wb") as output:
+                for part in parts:
+                    with open(part, "rb") as source:
+                        shutil.copyfileobj(source, output, 1024 * 1024)
+        return sum(counts), [path]
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        if locked:
+            own_conn.cursor().execute("UNLOCK TABLES")
+        if ordered or errors or (should_stop and should_stop()):
+            for part in parts:
+                if os.path.exists(part):
+                    os.remove(part)
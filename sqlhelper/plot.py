@@ -0,0 +1,171 @@
+"""图表绘制
+
+ChartEngine 持有一个一直使用的 Figure/Axes（不经过 pyplot，没有全局状态）：
+只有图表类型、数据或排序变化时才重新绘制数据，网格、图例、主题、线型和数据标签
+都直接修改已有的图元，切换选项只需要几毫秒。
+render() 用 Agg 光栅化为 PPM 图像，可以在后台线程中调用，界面线程只负责显示图像。
+"""
+import math
+import threading
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .chart import prepare_chart_data
+
+CHART_THEMES = {
+    "默认": {'bg': 'white', 'text': 'black'},
+    "深色": {'bg': 'black', 'text': 'white'},
+    "彩色": {'bg': '#f0f0f0', 'text': 'black'}
+}
+LINE_STYLES = {"实线": "-", "虚线": "--", "点线": ":"}
+SERIES_CACHE_SIZE = 16  # 缓存多少组准备好的序列
+CHART_MAX_LABELS = 100  # 最多显示多少个数据标签，点更多时均匀抽取
+
+
+class ChartEngine:
+    """图表引擎，style 为 dict：theme、line_style、grid、legend、labels"""
+
+    def __init__(self, figsize=(8, 5)):
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self._lock = threading.Lock()  # 同一时间只有一个线程修改和光栅化图表
+        self.cache = {}         # (数据键, 是否排序, 升序) -> (x, y)
+        self.plotted = None     # 当前绘制的 (图表类型, 数据键, 是否排序, 升序)
+        self.chart_type = None
+        self.y_col = None
+        self.points = None      # 数据标签的位置 (x, y)
+        self.bars = None
+        self.line = None
+        self.pie_texts = []
+        self.labels = None      # 数据标签，第一次显示时才创建
+
+    def series(self, data_key, data, sort_enabled=False, ascending=True):
+        """准备好的 (x, y) 数组，按 (数据键, 排序) 缓存"""
+        key = (data_key, sort_enabled, ascending)
+        cached = self.cache.pop(key, None)
+        if cached is None:
+            prepared = prepare_chart_data(data, sort_enabled, ascending)
+            cached = (prepared['x'].to_numpy(), prepared['y'].to_numpy(dtype=float))
+            if len(self.cache) >= SERIES_CACHE_SIZE:
+                del self.cache[next(iter(self.cache))]  # 去掉最久没用的一组
+        self.cache[key] = cached
+        return cached
+
+    def draw(self, chart_type, data_key, data, x_col, y_col, numeric_x, sort_enabled, ascending, style):
+        """更新图表，返回是否重新绘制了数据（否则只修改了样式）"""
+        ascending = ascending or not sort_enabled  # 不排序时忽略排序方向
+        plotted = (chart_type, data_key, sort_enabled, ascending)
+        redrawn = plotted != self.plotted
+        if redrawn:
+            if chart_type == "密度图":
+                self._plot_density(data, x_col, y_col)
+            else:
+                x, y = self.series(data_key, data, sort_enabled, ascending)
+                self._plot(chart_type, x, y, x_col, y_col, numeric_x)
+            self.plotted = plotted
+        self.apply_style(style)
+        if redrawn:
+            self.figure.tight_layout()
+        return redrawn
+
+    def render(self, *args):
+        """更新图表（参数同 draw）并光栅化，返回 PPM 图像数据，可以在后台线程中调用"""
+        with self._lock:
+            try:
+                self.draw(*args)
+            except Exception:
+                self.clear()
+                raise
+            self.canvas.draw()
+            pixels = np.asarray(self.canvas.buffer_rgba())
+        height, width = pixels.shape[:2]
+        return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(pixels[:, :, :3]).tobytes()
+
+    def label_count(self):
+        """当前数据标签的个数（点太多时只是其中一部分）"""
+        return len(self.labels) if self.labels is not None else 0
+
+    def labels_sampled(self):
+        """数据标签是否只是抽取的一部分点"""
+        return self.points is not None and self.label_count() < len(self.points[1])
+
+    def clear(self):
+        self.ax.clear()
+        self.plotted = None
+        self.points = self.bars = self.line = self.labels = None
+        self.pie_texts = []
+
+    def _plot(self, chart_type, x, y, x_col, y_col, numeric_x):
+        ax = self.ax
+        self.clear()
+        self.chart_type, self.y_col = chart_type, y_col
+        categories = [str(value) for value in x]
+        if chart_type == "柱状图":
+            self.bars = ax.bar(categories, y, color='#1f77b4')
+            self.points = ([bar.get_x() + bar.get_width() / 2. for bar in self.bars], y)
+        elif chart_type == "折线图":
+            x_values = x if numeric_x else categories
+            self.line, = ax.plot(x_values, y, marker='o' if len(y) <= 200 else None, color='#2ca02c')
+            if numeric_x and len(x) <= 30:
+                ax.set_xticks(sorted(set(x)))  # 点少时显示每个x值
+            ax.tick_params(axis='x', labelrotation=45)
+            self.points = (x_values, y)
+        elif chart_type == "饼图":
+            _wedges, self.pie_texts, _autotexts = ax.pie(y, labels=categories, autopct='%1.1f%%',
+                                                         colors=colormaps['tab20'].colors)
+        if chart_type != "饼图":
+            ax.set_xlabel(x_col)
+            ax.set_ylabel(y_col)
+        ax.set_title(f"{chart_type} - {y_col} vs {x_col}")
+
+    def _plot_density(self, density, x_col, y_col):
+        """把 fetch_density 的计数网格显示为图像，按对数着色以同时看清稀疏和密集的区域"""
+        ax = self.ax
+        self.clear()
+        self.chart_type, self.y_col = "密度图", y_col
+        ax.imshow(np.log1p(density['counts']).T, origin='lower', extent=density['extent'], aspect='auto',
+                  cmap='viridis', interpolation='nearest')
+        ax.set_xlabel(x_col)
+        ax.set_ylabel(y_col)
+        ax.set_title(f"密度图 - {y_col} vs {x_col}（{density['rows']} 个点）")
+
+    def apply_style(self, style):
+        """只修改已有图元的样式"""
+        ax = self.ax
+        theme = CHART_THEMES[style['theme']]
+        self.figure.patch.set_facecolor(theme['bg'])
+        ax.set_facecolor(theme['bg'])
+        ax.xaxis.label.set_color(theme['text'])
+        ax.yaxis.label.set_color(theme['text'])
+        ax.title.set_color(theme['text'])
+        ax.tick_params(axis='x', colors=theme['text'])
+        ax.tick_params(axis='y', colors=theme['text'])
+        for text in self.pie_texts:
+            text.set_color(theme['text'])
+
+        if self.line is not None:
+            self.line.set_linestyle(LINE_STYLES[style['line_style']])
+
+        if style['grid']:
+            ax.grid(True, color=theme['text'], alpha=0.3)
+        else:
+            ax.grid(False)
+
+        legend = ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if style['legend'] and self.chart_type in ("柱状图", "折线图"):
+            ax.legend([self.y_col], facecolor=theme['bg'], edgecolor=theme['text'])
+
+        if style['labels'] and self.labels is None and self.points is not None:
+            x_values, y_values = self.points
+            step = math.ceil(len(y_values) / CHART_MAX_LABELS) or 1  # 每个点一个 Text，太多时绘制很慢
+            self.labels = [ax.text(x_values[i], y_values[i], f'{y_values[i]:.1f}', ha='center', va='bottom')
+                           for i in range(0, len(y_values), step)]
+        for label in self.labels or ():
+            label.set_visible(style['labels'])
+            label.set_color(theme['text'])
@@ -0,0 +1,231 @@
+"""查询执行：分页读取和流式读取"""
+import time
+
+from mysql.connector import Error
+
+from .results import ResultBuffer
+from .script import statement_keyword
+
+FETCH_BATCH_SIZE = 1000  # 流式读取时每批的行数
+PAGE_SIZE = 200  # 分页浏览时每页的行数
+PIPELINE_SIZE = 50  # 多条语句执行时一次往返发送的最多语句数
+PIPELINE_MAX_BYTES = 512 * 1024  # 一次发送的最大字节数，远低于服务器默认的 max_allowed_packet
+
+
+def quote_ident(name):
+    """为标识符加反引号，避免表名/列名与关键字冲突"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def build_page_query(table_name, pk_columns, mode, key=None, offset=0, page_size=PAGE_SIZE):
+    """构建分页查询语句
+
+    有主键时使用键集分页（WHERE pk > 上一页最后的键），否则退回 LIMIT/OFFSET。
+    多取一行用于判断该方向上是否还有数据。返回 (sql, params, 是否需要反转结果)。
+    """
+    table = quote_ident(table_name)
+    limit = page_size + 1
+
+    if not pk_columns:
+        return f"SELECT * FROM {table} LIMIT %s OFFSET %s", (limit, max(offset, 0)), False
+
+    pk_list = ", ".join(quote_ident(c) for c in pk_columns)
+    pk_expr = f"({pk_list})" if len(pk_columns) > 1 else pk_list
+    placeholders = ", ".join(["%s"] * len(pk_columns))
+    key_expr = f"({placeholders})" if len(pk_columns) > 1 else placeholders
+    order_asc = ", ".join(f"{quote_ident(c)} ASC" for c in pk_columns)
+    order_desc = ", ".join(f"{quote_ident(c)} DESC" for c in pk_columns)
+
+    if mode == "first" or key is None:
+        return f"SELECT * FROM {table} ORDER BY {order_asc} LIMIT %s", (limit,), False
+    if mode == "next":
+        return (f"SELECT * FROM {table} WHERE {pk_expr} > {key_expr} ORDER BY {order_asc} LIMIT %s",
+                tuple(key) + (limit,), False)
+    if mode == "prev":
+        return (f"SELECT * FROM {table} WHERE {pk_expr} < {key_expr} ORDER BY {order_desc} LIMIT %s",
+                tuple(key) + (limit,), True)
+    # jump：从指定键开始（包含该键）
+    return (f"SELECT * FROM {table} WHERE {pk_expr} >= {key_expr} ORDER BY {order_asc} LIMIT %s",
+            tuple(key) + (limit,), False)
+
+
+def fetch_page(db_conn, catalog, db_name, table_name, mode="first", pk_columns=None,
+               key=None, offset=0, page_size=PAGE_SIZE):
+    """读取表的一页数据，只取当前可见窗口，与表的总行数无关
+
+    mode 为 first 时从元数据目录解析主键，其余模式沿用调用方传入的主键列。
+    返回 dict：pk、columns、description、rows（按主键升序）、has_more（该方向上是否还有数据）。
+    """
+    if mode == "first":
+        catalog.ensure(db_conn, db_name, table_name)
+        pk_columns = catalog.primary_key(db_name, table_name)
+    cursor = db_conn.cursor()
+    cursor.execute(f"USE {quote_ident(db_name)}")
+    sql, params, reverse = build_page_query(table_name, pk_columns or [], mode, key, offset, page_size)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+
+    # 多取的一行说明该方向上还有数据
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+    return {
+        'pk': pk_columns or [],
+        'columns': list(cursor.column_names),
+        'description': cursor.description,
+        'rows': rows,
+        'has_more': has_more
+    }
+
+
+class QueryResult:
+    """一条SQL的执行结果摘要"""
+
+    def __init__(self, sql=None):
+        self.sql = sql
+        self.columns = None      # 没有结果集时为 None
+        self.rowcount = -1       # 受影响的行数（没有结果集时）
+        self.received = 0        # 已读取的行数
+        self.stopped = False     # 是否提前停止读取
+        self.elapsed = 0.0       # 用时（秒）
+        self.error = None        # 多条语句执行时出错语句的异常
+
+
+def _read_result(cursor, result, start, batch_size, max_rows, on_columns, on_batch, should_stop):
+    """读取游标当前的结果集（没有结果集时只记录影响行数）"""
+    if not cursor.description:
+        result.rowcount = cursor.rowcount
+        return
+    result.columns = list(cursor.column_names)
+    if on_columns:
+        on_columns(result.columns, cursor.description)
+    while True:
+        if (should_stop and should_stop()) or (max_rows and result.received >= max_rows):
+            result.stopped = True
+            break
+        size = min(batch_size, max_rows - result.received) if max_rows else batch_size
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        result.received += len(rows)
+        if on_batch:
+            on_batch(rows, result.received, time.perf_counter() - start)
+
+
+def run_query(db_conn, sql, database=None, batch_size=FETCH_BATCH_SIZE, max_rows=0,
+              on_columns=None, on_batch=None, should_stop=None, params=None, commit=True):
+    """执行一条SQL（params 为参数），用非缓冲游标分批读取结果
+
+    on_columns(columns, description) 在结果集开始时调用，on_batch(rows, received, elapsed) 每读一批调用一次。
+    should_stop() 返回 True 或达到 max_rows 时停止读取，剩余结果不再读取，
+    调用方应丢弃这条连接（ConnectionPool.release 会自动处理）。
+    commit 为 False 时不提交，调用方在同一个事务（快照）中继续执行其他查询。
+    """
+    result = QueryResult(sql)
+    cursor = db_conn.cursor()  # 非缓冲游标：边读取边处理，不必等全部结果传输完
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    start = time.perf_counter()
+    cursor.execute(sql, params)
+    _read_result(cursor, result, start, batch_size, max_rows, on_columns, on_batch, should_stop)
+    if commit and not result.stopped:
+        db_conn.commit()  # 确保变更生效
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def pipeline_batches(statements, size=PIPELINE_SIZE, max_bytes=PIPELINE_MAX_BYTES):
+    """把语句分组，每组合并为一次发送，返回语句下标的列表
+
+    CALL 可能返回多个结果集，无法与语句一一对应，单独成组。
+    """
+    batch = []
+    batch_bytes = 0
+    for index, sql in enumerate(statements):
+        alone = statement_keyword(sql) == "CALL"
+        sql_bytes = len(sql.encode("utf-8"))
+        if batch and (alone or len(batch) >= size or batch_bytes + sql_bytes > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(index)
+        batch_bytes += sql_bytes
+        if alone:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def run_statements(db_conn, statements, database=None, batch_size=FETCH_BATCH_SIZE, max_rows=0,
+                   pipeline=PIPELINE_SIZE, on_columns=None, on_batch=None, on_done=None,
+                   should_stop=None):
+    """依次执行多条语句，每组语句合并为一次往返发送，再按顺序逐个读取各自的结果
+
+    回调比 run_query 多一个语句下标参数：on_columns(index, columns, description)、
+    on_batch(index, rows, received, elapsed)、on_done(index, result)。
+    某条语句出错时服务器不再执行同组后面的语句，这里也随之停止；出错的语句记录在 result.error 中。
+    最后一条查询达到 max_rows 时不读取剩余行，也不提交（与 run_query 相同，由连接池丢弃这条连接）；
+    同组前面有修改数据的语句时仍读完剩余行再提交，避免丢弃连接时回滚这些修改。
+    返回与 statements 对应的 QueryResult 列表，未执行的语句为 None。
+    """
+    results = [None] * len(statements)
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    last = len(statements) - 1
+    for batch in pipeline_batches(statements, pipeline):
+        unread = False  # 最后一条查询的剩余行留在连接上
+        for position, index in enumerate(batch):
+            if should_stop and should_stop():
+                return results
+            result = results[index] = QueryResult(statements[index])
+            start = time.perf_counter()
+            try:
+                if position == 0:
+                    # 换行后再加分号，语句末尾的 -- 注释不会吞掉分隔符
+                    cursor.execute("\n;\n".join(statements[i] for i in batch))
+                else:
+                    cursor.nextset()
+                _read_result(cursor, result, start, batch_size, max_rows,
+                             on_columns and (lambda c, d: on_columns(index, c, d)),
+                             on_batch and (lambda r, n, t: on_batch(index, r, n, t)),
+                             should_stop)
+                if result.stopped and (should_stop and should_stop()):
+                    return results
+                is_call = statement_keyword(result.sql) == "CALL"
+                # 同组前面没有结果集的语句（INSERT、UPDATE 等）需要提交
+                writes = any(results[i].columns is None for i in batch[:position])
+                if result.stopped and (index < last or is_call or writes):
+                    db_conn.consume_results()  # 达到行数上限，丢弃剩余行后才能读取后面的结果或提交
+                else:
+                    unread = result.stopped
+                if is_call:
+                    while cursor.nextset():  # CALL 之后的结果集和状态
+                        db_conn.consume_results()
+            except Error as e:
+                result.error = e
+            result.elapsed = time.perf_counter() - start
+            if on_done:
+                on_done(index, result)
+            if result.error is not None:
+                db_conn.commit()  # 保留出错之前的语句所做的修改，与逐条执行一致
+                return results
+        if not unread:
+            db_conn.commit()
+    return results
+
+
+def fetch_buffer(db_conn, sql, params=None, database=None, batch_size=FETCH_BATCH_SIZE):
+    """执行查询并把全部结果分批读入列式缓冲区"""
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    cursor.execute(sql, params)
+    buffer = ResultBuffer(cursor.column_names, cursor.description)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        buffer.append_rows(rows)
+    return buffer
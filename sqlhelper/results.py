@@ -0,0 +1,140 @@
+"""列式结果缓冲区"""
+import numpy as np
+import pandas as pd
+from mysql.connector import FieldType, FieldFlag
+
+INTEGER_TYPES = (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                 FieldType.INT24, FieldType.YEAR)
+
+
+class TypedColumn:
+    """定长类型的列：NumPy 数组存值，按倍数扩容，避免每个值一个 Python 对象
+
+    整数列另外用布尔掩码记录 NULL；浮点列用 NaN、日期时间列用 NaT 表示 NULL，
+    转换为 pandas 时不需要复制。
+    """
+
+    def __init__(self, dtype, capacity=1024):
+        self.values = np.empty(capacity, dtype=dtype)
+        self.mask = np.zeros(capacity, dtype=bool) if self.values.dtype.kind in "iu" else None
+        self.size = 0
+
+    def _reserve(self, count):
+        needed = self.size + count
+        if needed > len(self.values):
+            capacity = max(needed, len(self.values) * 2)
+            self.values = np.resize(self.values, capacity)
+            if self.mask is not None:
+                self.mask = np.resize(self.mask, capacity)
+
+    def extend(self, values):
+        count = len(values)
+        self._reserve(count)
+        end = self.size + count
+        kind = self.values.dtype.kind
+        if self.mask is not None:
+            nulls = [value is None for value in values]
+            self.mask[self.size:end] = nulls
+            if any(nulls):
+                values = [0 if value is None else value for value in values]
+        elif kind == "f":
+            values = [np.nan if value is None else value for value in values]
+        elif kind == "M":
+            values = [np.datetime64("NaT") if value is None else value for value in values]
+        self.values[self.size:end] = values
+        self.size = end
+
+    def __getitem__(self, index):
+        if self.mask is not None and self.mask[index]:
+            return None
+        value = self.values[index]
+        if self.values.dtype.kind == "f" and np.isnan(value):
+            return None
+        return value.item()  # datetime64 的 NaT 会变成 None
+
+    def __len__(self):
+        return self.size
+
+    def to_list(self):
+        return [self[i] for i in range(self.size)]
+
+    def to_pandas(self):
+        """不复制数据的 pandas 视图（整数列有 NULL 时使用可空整数类型）"""
+        values = self.values[:self.size]
+        if self.mask is not None and self.mask[:self.size].any():
+            return pd.arrays.IntegerArray(values, self.mask[:self.size])
+        return values
+
+
+def make_column(description):
+    """根据游标 description 的类型代码选择列的存储方式"""
+    type_code = description[1]
+    flags = description[7] if len(description) > 7 else 0
+    if type_code in INTEGER_TYPES:
+        unsigned_bigint = type_code == FieldType.LONGLONG and flags & FieldFlag.UNSIGNED
+        return TypedColumn(np.uint64 if unsigned_bigint else np.int64)
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return TypedColumn(np.float64)
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return TypedColumn("datetime64[us]")
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return TypedColumn("datetime64[D]")
+    # DECIMAL 保留为 Decimal 对象以免丢失精度，字符串等其他类型同样使用列表
+    return []
+
+
+class ResultBuffer:
+    """列式结果缓冲区
+
+    数值和日期时间列直接累积到 NumPy 类型数组（根据游标 description 选择），
+    其他列使用列表；不再先构建按行的元组列表再转换为 DataFrame。
+    """
+
+    def __init__(self, columns, description=None):
+        self.columns = list(columns)
+        if description:
+            self.data = [make_column(column) for column in description]
+        else:
+            self.data = [[] for _ in self.columns]
+
+    @classmethod
+    def from_rows(cls, columns, rows, description=None):
+        buffer = cls(columns, description)
+        buffer.append_rows(rows)
+        return buffer
+
+    def append_rows(self, rows):
+        """追加一批行（按行的元组）"""
+        if not rows:
+            return
+        for i, values in enumerate(zip(*rows)):
+            column = self.data[i]
+            try:
+                column.extend(values)
+            except (TypeError, ValueError, OverflowError):
+                # 实际值与类型代码不符时退回为列表存储
+                self.data[i] = column.to_list() + list(values)
+
+    def row(self, index):
+        return tuple(column[index] for column in self.data)
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def to_dataframe(self):
+        """转换为 DataFrame，类型列不复制数据（列名可能重复，先用序号建表再设置列名）"""
+        df = pd.DataFrame(
+            {i: column.to_pandas() if isinstance(column, TypedColumn) else column
+             for i, column in enumerate(self.data)},
+            copy=False
+        )
+        df.columns = self.columns
+        return df
+
+
+def format_cell(value, max_length=200):
+    """单元格显示文本"""
+    if value is None:
+        return "NULL"
+    text = str(value)
+    return text if len(text) <= max_length else text[:max_length] + "..."
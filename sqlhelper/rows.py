@@ -0,0 +1,236 @@
+"""按主键定位的行操作
+
+行由主键（没有主键时用非空唯一索引，见 Catalog.primary_key）定位，
+每个操作都是一次索引查找，与表的大小无关；值全部作为参数传递。
+"""
+from mysql.connector import Error
+
+from .bulk import BULK_INSERT_CHUNK, MAX_PLACEHOLDERS, build_insert, build_delete
+from .query import quote_ident
+
+
+def key_condition(key_columns):
+    """主键条件，例如 `a` = %s AND `b` = %s"""
+    return " AND ".join(f"{quote_ident(c)} = %s" for c in key_columns)
+
+
+def key_values(columns, row, key_columns):
+    """从一行数据中取出主键值，结果中缺少主键列时返回 None"""
+    try:
+        return tuple(row[list(columns).index(c)] for c in key_columns)
+    except ValueError:
+        return None
+
+
+def fetch_row(db_conn, database, table_name, key_columns, key):
+    """按主键读取一行，返回 (列名, 行)，行不存在时行为 None"""
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    cursor.execute(f"SELECT * FROM {quote_ident(table_name)} WHERE {key_condition(key_columns)}",
+                   tuple(key))
+    row = cursor.fetchone()
+    columns = list(cursor.column_names)
+    cursor.fetchall()  # 唯一键最多一行，读完结果以便继续使用连接
+    return columns, row
+
+
+def update_row(db_conn, database, table_name, key_columns, key, changes, commit=True):
+    """按主键更新一行，changes 为 {列名: 新值}，返回影响的行数"""
+    if not changes:
+        return 0
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    assignments = ", ".join(f"{quote_ident(c)} = %s" for c in changes)
+    cursor.execute(f"UPDATE {quote_ident(table_name)} SET {assignments} WHERE {key_condition(key_columns)}",
+                   tuple(changes.values()) + tuple(key))
+    if commit:
+        db_conn.commit()
+    return cursor.rowcount
+
+
+def delete_row(db_conn, database, table_name, key_columns, key, commit=True):
+    """按主键删除一行，返回影响的行数"""
+    cursor = db_conn.cursor()
+    if database:
+        cursor.execute(f"USE {quote_ident(database)}")
+    cursor.execute(f"DELETE FROM {quote_ident(table_name)} WHERE {key_condition(key_columns)}", tuple(key))
+    if commit:
+        db_conn.commit()
+    return cursor.rowcount
+
+
+class ChangeSet:
+    """表格中尚未提交的修改：按主键记录的更新和删除，以及新增的行
+
+    修改按主键而不是行号记录，翻页或刷新后仍然对应同一行。新值是界面输入的文本，
+    None 表示 NULL，由服务器在赋值时转换为列的类型。
+    """
+
+    def __init__(self, database, table_name, columns, key_columns):
+        self.source = (database, table_name)
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.updates = {}    # 主键 -> {列名: 新值}
+        self.originals = {}  # 主键 -> 修改前的行，用于显示差异
+        self.deletes = {}    # 主键 -> 删除的行
+        self.inserts = []    # 新增的行 {列名: 值}，未填写的列使用默认值
+
+    def key(self, row):
+        return key_values(self.columns, row, self.key_columns)
+
+    def set_value(self, row, column, value):
+        """修改已有行的一个单元格，改回原值时撤销这处修改"""
+        key = self.key(row)
+        if key in self.deletes:
+            raise ValueError("该行已标记为删除")
+        original = row[self.columns.index(column)]
+        changes = self.updates.setdefault(key, {})
+        if value == original or (original is not None and value == str(original)):
+            changes.pop(column, None)
+        else:
+            changes[column] = value
+            self.originals[key] = row
+        if not changes:
+            del self.updates[key]
+            self.originals.pop(key, None)
+
+    def toggle_delete(self, row):
+        """标记或取消删除一行，返回该行现在是否标记为删除"""
+        key = self.key(row)
+        if key in self.deletes:
+            del self.deletes[key]
+            return False
+        self.deletes[key] = row
+        self.updates.pop(key, None)
+        self.originals.pop(key, None)
+        return True
+
+    def add_insert(self):
+        """新增一个空行，返回它在 inserts 中的下标"""
+        self.inserts.append({})
+        return len(self.inserts) - 1
+
+    def set_insert_value(self, index, column, value):
+        self.inserts[index][column] = value
+
+    def remove_insert(self, index):
+        del self.inserts[index]
+
+    def view(self, row):
+        """返回 (应用修改后的行, 状态)，状态为 None、'updated' 或 'deleted'"""
+        key = self.key(row)
+        if key in self.deletes:
+            return row, 'deleted'
+        changes = self.updates.get(key)
+        if not changes:
+            return row, None
+        return tuple(changes.get(c, v) for c, v in zip(self.columns, row)), 'updated'
+
+    def inserted_row(self, index):
+        values = self.inserts[index]
+        return tuple(values.get(c) for c in self.columns)
+
+    def clear(self):
+        self.updates.clear()
+        self.originals.clear()
+        self.deletes.clear()
+        self.inserts.clear()
+
+    def __len__(self):
+        return len(self.updates) + len(self.deletes) + len(self.inserts)
+
+    def diff(self):
+        """修改内容的文本说明，每处修改一行"""
+        def describe(key):
+            return ", ".join(f"{c}={v}" for c, v in zip(self.key_columns, key))
+
+        lines = [f"删除 {describe(key)}" for key in self.deletes]
+        for key, changes in self.updates.items():
+            original = dict(zip(self.columns, self.originals[key]))
+            for column, value in changes.items():
+                lines.append(f"更新 {describe(key)}: {column}: {original[column]!r} -> {value!r}")
+        for values in self.inserts:
+            text = ", ".join(f"{c}={v!r}" for c, v in values.items())
+            lines.append(f"插入 ({text or '全部使用默认值'})")
+        return lines
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _chunk_size(params_per_row):
+    return max(1, min(BULK_INSERT_CHUNK, MAX_PLACEHOLDERS // max(params_per_row, 1)))
+
+
+def build_update(table_name, key_columns, columns, row_count):
+    """用一条语句按主键更新 row_count 行的同一组列
+
+    新值和主键组成派生表（SELECT ... UNION ALL SELECT ...），与目标表按主键连接后赋值，
+    派生表的列使用 k0、v0 这样的别名，因此修改主键列本身也没有问题。
+    """
+    aliases = [f"k{i}" for i in range(len(key_columns))] + [f"v{i}" for i in range(len(columns))]
+    placeholders = ", ".join(["%s"] * len(aliases))
+    first = "SELECT " + ", ".join(f"%s AS {alias}" for alias in aliases)
+    values = " UNION ALL ".join([first] + [f"SELECT {placeholders}"] * (row_count - 1))
+    condition = " AND ".join(f"t.{quote_ident(c)} = v.k{i}" for i, c in enumerate(key_columns))
+    assignments = ", ".join(f"t.{quote_ident(c)} = v.v{i}" for i, c in enumerate(columns))
+    return f"UPDATE {quote_ident(table_name)} AS t JOIN ({values}) AS v ON {condition} SET {assignments}"
+
+
+def apply_changes(db_conn, changes):
+    """在一个事务中提交 ChangeSet，返回 (删除行数, 更新行数, 插入行数)
+
+    先删除、再更新、最后插入（删除后可以插入相同主键的新行）。同类修改合并为多行语句：
+    删除用 IN 列表，修改了相同列的行用一条 UPDATE ... JOIN，填写了相同列的新行用多行 INSERT，
+    都通过服务器端预处理发送，提交一次。删除的行数少于预期（行已被其他会话删除或修改了主键）时
+    回滚并报错。更新行数只统计值确实发生变化的行。
+    """
+    database, table_name = changes.source
+    key_columns = changes.key_columns
+    if database:
+        db_conn.cursor().execute(f"USE {quote_ident(database)}")
+    cursor = db_conn.cursor(prepared=True)
+    deleted = updated = inserted = 0
+    try:
+        keys = list(changes.deletes)
+        for chunk in _chunks(keys, _chunk_size(len(key_columns))):
+            cursor.execute(build_delete(table_name, key_columns, len(chunk)),
+                           [value for key in chunk for value in key])
+            deleted += cursor.rowcount
+        if deleted != len(keys):
+            raise Error(f"只删除了 {deleted} 行，应为 {len(keys)} 行，部分行可能已被修改，已回滚")
+
+        groups = {}  # 修改的列 -> [(主键, 新值)]
+        for key, values in changes.updates.items():
+            groups.setdefault(tuple(values), []).append((key, tuple(values.values())))
+        for columns, rows in groups.items():
+            for chunk in _chunks(rows, _chunk_size(len(key_columns) + len(columns))):
+                cursor.execute(build_update(table_name, key_columns, columns, len(chunk)),
+                               [value for key, values in chunk for value in key + values])
+                updated += cursor.rowcount
+
+        groups = {}  # 填写的列 -> [值]
+        for values in changes.inserts:
+            groups.setdefault(tuple(values), []).append(tuple(values.values()))
+        for columns, rows in groups.items():
+            for chunk in _chunks(rows, _chunk_size(len(columns))):
+                cursor.execute(build_insert(table_name, columns, len(chunk)),
+                               [value for row in chunk for value in row])
+                inserted += len(chunk)
+        db_conn.commit()
+    except BaseException:
+        try:
+            db_conn.rollback()
+        except Error:
+            pass  # 连接已断开时服务器会自动回滚
+        raise
+    finally:
+        try:
+            cursor.close()
+        except Error:
+            pass
+    return deleted, updated, inserted
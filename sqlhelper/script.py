@@ -0,0 +1,99 @@
+"""SQL脚本拆分"""
+import re
+
+# mysql 客户端的 DELIMITER 命令，只能出现在语句开头，作用到下一个 DELIMITER 为止
+_DELIMITER_RE = re.compile(r"delimiter[ \t]+(\S+)[^\n]*", re.IGNORECASE)
+# 可能修改库、表或列定义的语句（存储过程中也可能执行 DDL）
+DDL_KEYWORDS = ('CREATE', 'ALTER', 'DROP', 'RENAME', 'TRUNCATE', 'IMPORT', 'CALL')
+
+
+def split_statements(text):
+    """按分隔符把SQL脚本拆成单条语句，返回的语句不含分隔符
+
+    识别单引号、双引号、反引号中的内容和 --、#、/* */ 注释，其中的分隔符不起作用。
+    支持 DELIMITER 命令（例如存储过程定义中的 DELIMITER //），命令本身不会发送到服务器。
+    只有注释的片段会被丢弃。
+    """
+    statements = []
+    delimiter = ";"
+    start = 0
+    has_code = False  # 当前片段中是否有注释以外的内容
+    i = 0
+    length = len(text)
+    while i < length:
+        ch = text[i]
+        if not has_code and ch in "dD":
+            match = _DELIMITER_RE.match(text, i)
+            if match:
+                delimiter = match.group(1)
+                i = start = match.end()
+                continue
+        if ch in "'\"`":
+            i = _skip_quoted(text, i)
+            has_code = True
+            continue
+        if ch == "#" or (text.startswith("--", i) and (i + 2 >= length or text[i + 2].isspace())):
+            end = text.find("\n", i)
+            i = length if end < 0 else end + 1
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if text.startswith("/*!", i):
+                has_code = True  # /*! ... */ 是会被服务器执行的版本注释
+            i = length if end < 0 else end + 2
+            continue
+        if text.startswith(delimiter, i):
+            if has_code:
+                statements.append(text[start:i].strip())
+            i = start = i + len(delimiter)
+            has_code = False
+            continue
+        if not ch.isspace():
+            has_code = True
+        i += 1
+    if has_code:
+        statements.append(text[start:].strip())
+    return statements
+
+
+def _skip_quoted(text, i):
+    """跳过从 i 开始的引号内容，返回结束引号之后的位置"""
+    quote = text[i]
+    i += 1
+    length = len(text)
+    while i < length:
+        ch = text[i]
+        if ch == "\\" and quote != "`":
+            i += 2
+            continue
+        if ch == quote:
+            if i + 1 < length and text[i + 1] == quote:
+                i += 2  # 两个连续引号表示引号本身
+                continue
+            return i + 1
+        i += 1
+    return length
+
+
+def statement_keyword(sql):
+    """语句的第一个关键字（大写），跳过开头的注释"""
+    i = 0
+    length = len(sql)
+    while i < length:
+        if sql[i].isspace():
+            i += 1
+        elif sql[i] == "#" or (sql.startswith("--", i) and (i + 2 >= length or sql[i + 2].isspace())):
+            end = sql.find("\n", i)
+            i = length if end < 0 else end + 1
+        elif sql.startswith("/*", i) and not sql.startswith("/*!", i):
+            end = sql.find("*/", i + 2)
+            i = length if end < 0 else end + 2
+        else:
+            break
+    match = re.match(r"\w+", sql[i:])
+    return match.group(0).upper() if match else ""
+
+
+def changes_schema(sql):
+    """语句是否可能修改元数据，执行后才需要重新校验元数据目录"""
+    return statement_keyword(sql) in DDL_KEYWORDS
@@ -0,0 +1,207 @@
+"""结果写出：CSV、JSONL、Parquet
+
+写出器按批接收行，不需要把整个结果集放在内存中。所有写出器都写入二进制流，
+CSV 和 JSONL 使用 UTF-8 编码。Parquet 需要安装 pyarrow。
+"""
+import base64
+import csv
+import datetime
+import decimal
+import io
+import json
+
+from mysql.connector import FieldType, FieldFlag
+
+from .results import INTEGER_TYPES
+
+BINARY_CHARSET = 63  # MySQL 的 binary 字符集编号
+PARQUET_ROW_GROUP_SIZE = 65536  # 每个行组的行数，避免每批一个很小的行组
+
+
+def _text_value(value):
+    """把数据库值转换为文本输出使用的值"""
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(value).decode("ascii")
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return ",".join(sorted(value))  # SET 列，与 MySQL 的文本形式 a,b 一致
+    return value
+
+
+class _TextWriter:
+    """文本格式写出器的公共部分"""
+
+    def __init__(self, stream):
+        self.stream = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+        self.columns = None
+        self.rows = 0
+
+    def begin(self, columns, description=None):
+        self.columns = list(columns)
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def end(self):
+        """一个结果集写完"""
+        self.stream.flush()
+
+    def close(self):
+        # 只分离包装层，底层流由调用方关闭（例如标准输出）
+        self.stream.flush()
+        self.stream.detach()
+
+
+class CsvWriter(_TextWriter):
+    """CSV：每个结果集先写一行列名，多个结果集之间空一行
+
+    header 为 False 时不写列名行（分段导出时后面的分段拼接到第一段之后）。
+    """
+
+    def __init__(self, stream, header=True):
+        super().__init__(stream)
+        self._writer = csv.writer(self.stream)
+        self._result_sets = 0
+        self.header = header
+
+    def begin(self, columns, description=None):
+        super().begin(columns, description)
+        if self._result_sets:
+            self.stream.write("\r\n")
+        self._result_sets += 1
+        if self.header:
+            self._writer.writerow(self.columns)
+
+    def write_rows(self, rows):
+        self._writer.writerows(
+            ["" if value is None else _text_value(value) for value in row] for row in rows
+        )
+        self.rows += len(rows)
+
+
+class JsonlWriter(_TextWriter):
+    """JSON Lines：每行一个对象，键为列名"""
+
+    def write_rows(self, rows):
+        columns = self.columns
+        self.stream.write("".join(
+            json.dumps({column: _text_value(value) for column, value in zip(columns, row)},
+                       ensure_ascii=False) + "\n"
+            for row in rows
+        ))
+        self.rows += len(rows)
+
+
+def _arrow_type(pa, description):
+    """根据游标 description 的类型代码选择 Arrow 类型"""
+    type_code = description[1]
+    flags = description[7] if len(description) > 7 else 0
+    charset = description[8] if len(description) > 8 else None
+    if type_code in INTEGER_TYPES:
+        if type_code == FieldType.LONGLONG and flags & FieldFlag.UNSIGNED:
+            return pa.uint64()
+        return pa.int64()
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code == FieldType.TIME:
+        return pa.duration("us")
+    if charset == BINARY_CHARSET and type_code in (
+            FieldType.BLOB, FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB,
+            FieldType.STRING, FieldType.VAR_STRING):
+        return pa.binary()
+    # DECIMAL 写为字符串以免丢失精度，其他类型同样写为字符串
+    return pa.string()
+
+
+class ParquetWriter:
+    """Parquet：一个流只能写一个结果集，按行组缓冲后写出
+
+    compression 为 Parquet 内部的列压缩（例如 zstd、gzip），默认使用 pyarrow 的 snappy。
+    """
+
+    def __init__(self, stream, compression=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("写出 Parquet 需要安装 pyarrow") from None
+        self._pa = pa
+        self._pq = pq
+        self.stream = stream
+        self.compression = compression
+        self._writer = None
+        self._pending = []
+        self.columns = None
+        self.rows = 0
+
+    def begin(self, columns, description=None):
+        if self._writer is not None:
+            raise RuntimeError("一个 Parquet 文件只能保存一个结果集")
+        pa = self._pa
+        self.columns = list(columns)
+        if description:
+            types = [_arrow_type(pa, column) for column in description]
+        else:
+            types = [pa.string()] * len(self.columns)
+        self.schema = pa.schema([pa.field(name, t) for name, t in zip(self.columns, types)])
+        options = {'compression': self.compression} if self.compression else {}
+        self._writer = self._pq.ParquetWriter(self.stream, self.schema, **options)
+
+    def _convert(self, values, arrow_type):
+        pa = self._pa
+        if pa.types.is_string(arrow_type):
+            return [None if value is None else str(_text_value(value)) for value in values]
+        if pa.types.is_binary(arrow_type):
+            return [value.encode("utf-8") if isinstance(value, str) else value for value in values]
+        return list(values)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pa = self._pa
+        columns = list(zip(*self._pending))
+        arrays = [pa.array(self._convert(values, field.type), type=field.type)
+                  for values, field in zip(columns, self.schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self._pending = []
+
+    def write_rows(self, rows):
+        self._pending.extend(rows)
+        self.rows += len(rows)
+        if len(self._pending) >= PARQUET_ROW_GROUP_SIZE:
+            self._flush()
+
+    def end(self):
+        self._flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def open_writer(fmt, stream):
+    """按格式名创建写出器"""
+    try:
+        return WRITERS[fmt](stream)
+    except KeyError:
+        raise ValueError(f"不支持的输出格式: {fmt}") from None
@@ -0,0 +1,94 @@
+"""并发插入：连接的取得、一起提交和回滚"""
+import threading
+
+from mysql.connector import Error, PoolError
+
+from sqlhelper.bulk import parallel_insert
+
+
+class FakeCursor:
+    def __init__(self, db_conn):
+        self.db_conn = db_conn
+
+    def execute(self, sql, params=None):
+        if sql.startswith("INSERT"):
+            if self.db_conn.fail:
+                raise Error("插入失败")
+            self.db_conn.pending += len(params)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = 0
+        self.committed = 0
+        self.rolled_back = False
+
+    def cursor(self, prepared=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed += self.pending
+        self.pending = 0
+
+    def rollback(self):
+        self.pending = 0
+        self.rolled_back = True
+
+
+class FakePool:
+    """idle 中的连接立即可用，用完后 get_connection 按超时报错，不会一直等待"""
+
+    def __init__(self, idle, size=4):
+        self.size = size
+        self.idle = list(idle)
+        self.released = []
+        self.lock = threading.Lock()
+
+    def get_connection(self, timeout=None):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        if timeout is None:
+            raise AssertionError("不应无限等待连接")
+        raise PoolError(msg="等待可用连接超时")
+
+    def release(self, db_conn):
+        self.released.append(db_conn)
+
+    def discard(self, db_conn):
+        self.released.append(db_conn)
+
+
+ROWS = [(i,) for i in range(5000)]
+
+
+def test_uses_only_connections_available_now():
+    own_conn = FakeConnection()
+    pool = FakePool([])  # 连接池中的其他连接都被占用
+    assert parallel_insert(pool, None, "t", ["a"], iter(ROWS), own_conn=own_conn, chunk_size=100) == 5000
+    assert own_conn.committed == 5000
+
+
+def test_all_workers_commit_together():
+    own_conn, others = FakeConnection(), [FakeConnection(), FakeConnection()]
+    pool = FakePool(others)
+    assert parallel_insert(pool, None, "t", ["a"], iter(ROWS), own_conn=own_conn, chunk_size=100) == 5000
+    assert sum(c.committed for c in [own_conn] + others) == 5000
+    assert sorted(map(id, pool.released)) == sorted(map(id, others))
+
+
+def test_one_failing_worker_rolls_back_all():
+    own_conn, others = FakeConnection(), [FakeConnection(), FakeConnection(fail=True)]
+    pool = FakePool(others)
+    try:
+        parallel_insert(pool, None, "t", ["a"], iter(ROWS), own_conn=own_conn, chunk_size=100)
+    except Error as e:
+        assert not getattr(e, 'committed', 0)
+    else:
+        raise AssertionError("应当报错")
+    assert all(c.committed == 0 for c in [own_conn] + others)
+    assert len(pool.released) == 2
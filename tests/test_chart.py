@@ -0,0 +1,75 @@
+"""时间序列分桶与本地日历的对齐"""
+import calendar
+import datetime as dt
+
+from sqlhelper.chart import TIME_BUCKETS, fetch_time_series, time_bucket_origin, time_bucket_sql
+
+DAY, WEEK = TIME_BUCKETS['1 天'], TIME_BUCKETS['1 周']
+OFFSET = 8 * 3600  # 会话时区 UTC+8
+
+
+def unix_timestamp(local, offset=OFFSET):
+    """与 MySQL 的 UNIX_TIMESTAMP 相同：会话时区的本地时间 -> UTC 秒数"""
+    return calendar.timegm(local.timetuple()) - offset
+
+
+def bucket_start(local, bucket, offset=OFFSET):
+    """按 time_bucket_sql 的算法计算本地时间所在桶的起点（本地时间）"""
+    origin = time_bucket_origin(bucket, offset)
+    index = (unix_timestamp(local, offset) + origin) // bucket
+    return dt.datetime(1970, 1, 1) + dt.timedelta(seconds=index * bucket - origin + offset)
+
+
+def test_daily_buckets_start_at_local_midnight():
+    for local in (dt.datetime(2024, 3, 5, 0, 0), dt.datetime(2024, 3, 5, 7, 59), dt.datetime(2024, 3, 5, 23, 59)):
+        assert bucket_start(local, DAY) == dt.datetime(2024, 3, 5)
+
+
+def test_hourly_buckets_follow_half_hour_offsets():
+    offset = 5 * 3600 + 1800  # UTC+5:30
+    assert bucket_start(dt.datetime(2024, 3, 5, 10, 45), 3600, offset) == dt.datetime(2024, 3, 5, 10)
+
+
+def test_weekly_buckets_start_on_monday():
+    monday = dt.datetime(2024, 3, 4)
+    assert monday.weekday() == 0
+    for day in range(7):
+        assert bucket_start(monday + dt.timedelta(days=day, hours=23), WEEK) == monday
+    assert bucket_start(monday - dt.timedelta(minutes=1), WEEK) == monday - dt.timedelta(days=7)
+
+
+def test_month_buckets_use_calendar_months():
+    group, start = time_bucket_sql("`ts`", TIME_BUCKETS['1 月'], OFFSET)
+    assert group == "YEAR(`ts`) * 12 + MONTH(`ts`) - 1"
+    assert "MAKEDATE" in start
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=None):
+        self.log.append(sql)
+        self.sql = sql
+
+    def fetchall(self):
+        if self.sql.startswith("SELECT MIN"):
+            return [(dt.datetime(2024, 1, 1), dt.datetime(2024, 1, 10), OFFSET)]
+        return [(dt.datetime(2024, 1, 1), 1.5, 10)]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+
+def test_fetch_time_series_shifts_buckets_by_session_offset():
+    db_conn = FakeConnection()
+    result = fetch_time_series(db_conn, None, "t", "ts", "v", bucket=DAY)
+    assert "TIMESTAMPDIFF(SECOND, UTC_TIMESTAMP(), NOW())" in db_conn.log[0]
+    assert f"FLOOR((UNIX_TIMESTAMP(`ts`) + {OFFSET}) / {DAY})" in db_conn.log[-1]
+    assert f"FROM_UNIXTIME(bucket_ * {DAY} - {OFFSET})" in db_conn.log[-1]
+    assert result['rows'] == 10
@@ -0,0 +1,40 @@
+"""取消查询时的 KILL QUERY"""
+import threading
+
+from mysql.connector import Error
+
+from sqlhelper import connection
+from sqlhelper.connection import kill_queries
+
+
+class FakeSideConnection:
+    def __init__(self, missing=()):
+        self.killed = []
+        self.missing = missing
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        connection_id = int(sql.split()[-1])
+        if connection_id in self.missing:
+            raise Error(msg="Unknown thread id", errno=1094)
+        self.killed.append(connection_id)
+
+    def close(self):
+        pass
+
+
+def test_kill_skips_connections_no_longer_running_the_task(monkeypatch):
+    side_conn = FakeSideConnection()
+    monkeypatch.setattr(connection.mysql.connector, "connect", lambda **params: side_conn)
+    kill_queries({}, [1, 2], threading.Lock(), lambda connection_id: connection_id == 2)
+    assert side_conn.killed == [2]
+
+
+def test_kill_ignores_finished_sessions(monkeypatch):
+    side_conn = FakeSideConnection(missing=(1,))
+    monkeypatch.setattr(connection.mysql.connector, "connect", lambda **params: side_conn)
+    kill_queries({}, [1, 2])
+    assert side_conn.killed == [2]
+
@@ -0,0 +1,66 @@
+"""并发导出在一个快照中读取所有分段"""
+import contextlib
+
+from sqlhelper.export import export_table_parallel
+
+
+class FakeCursor:
+    def __init__(self, db_conn):
+        self.db_conn = db_conn
+        self.description = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.db_conn.log.append(sql)
+        if sql.startswith("SELECT MIN"):
+            self.rows = [(1, 100)]
+        elif sql.startswith("SELECT *"):
+            if self.db_conn.snapshot_ended:
+                raise AssertionError("快照结束后又读取了分段: " + sql)
+            self.description = [("id",)]
+            self.column_names = ["id"]
+            self.rows = [(params[0] if params else 0,)]
+        elif sql.startswith("START TRANSACTION"):
+            self.db_conn.snapshot_ended = False
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.commits = 0
+        self.snapshot_ended = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.snapshot_ended = True
+
+
+class FakePool:
+    size = 1
+
+    def __init__(self):
+        self.db_conn = FakeConnection()
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        yield self.db_conn
+
+
+def test_all_ranges_are_read_in_one_snapshot(tmp_path):
+    pool = FakePool()
+    rows, files = export_table_parallel(pool, None, "t", "id", str(tmp_path / "t.csv"), workers=1)
+    ranges = [sql for sql in pool.db_conn.log if sql.startswith("SELECT *")]
+    assert len(ranges) == 4 and rows == 4
+    assert pool.db_conn.commits == 1  # 只在最后一段之后提交一次
+    assert files == [str(tmp_path / "t.csv")]
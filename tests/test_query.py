@@ -0,0 +1,90 @@
+"""多条语句执行时的行数上限和提交"""
+from mysql.connector import InternalError
+
+from sqlhelper.query import run_statements
+
+
+class FakeCursor:
+    """按 \\n;\\n 拆开一次发送的多条语句，SELECT 返回 5 行，其他语句影响 1 行"""
+
+    def __init__(self, db_conn):
+        self.db_conn = db_conn
+        self.sets = []
+
+    def execute(self, sql, params=None):
+        if sql.startswith("USE"):
+            return
+        if self.db_conn.unread:
+            raise InternalError("Unread result found")
+        self.sets = sql.split("\n;\n")
+        self._select()
+
+    def _select(self):
+        sql = self.sets.pop(0)
+        self.db_conn.log.append(sql)
+        if sql.lower().startswith("select"):
+            self.description = [("a",)]
+            self.column_names = ["a"]
+            self.rows = [(i,) for i in range(5)]
+        else:
+            self.description = None
+            self.rowcount = 1
+            self.rows = []
+        self.db_conn.unread = bool(self.rows)
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        self.db_conn.unread = bool(self.rows)
+        return rows
+
+    def nextset(self):
+        if self.db_conn.unread:
+            raise InternalError("Unread result found")
+        if not self.sets:
+            return None
+        self._select()
+        return True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.unread = False
+        self.commits = 0
+        self.log = []
+        self._cursor = FakeCursor(self)
+
+    def cursor(self):
+        return self._cursor
+
+    def consume_results(self):
+        self._cursor.rows = []
+        self.unread = False
+
+    def commit(self):
+        if self.unread:
+            raise InternalError("Unread result found")
+        self.commits += 1
+
+
+def test_last_select_over_limit_is_not_committed():
+    db_conn = FakeConnection()
+    results = run_statements(db_conn, ["select 1", "select 2"], max_rows=1)
+    assert [r.received for r in results] == [1, 1]
+    assert results[1].stopped and results[1].error is None
+    assert db_conn.unread  # 剩余行留给连接池丢弃连接时处理
+    assert db_conn.commits == 0
+
+
+def test_writes_before_truncated_select_are_committed():
+    db_conn = FakeConnection()
+    results = run_statements(db_conn, ["insert into t values (1)", "select 1"], max_rows=1)
+    assert all(r.error is None for r in results)
+    assert db_conn.commits == 1
+    assert not db_conn.unread
+
+
+def test_truncated_select_in_the_middle_is_consumed():
+    db_conn = FakeConnection()
+    results = run_statements(db_conn, ["select 1", "update t set a = 1"], max_rows=1)
+    assert results[1].rowcount == 1
+    assert db_conn.commits == 1
@@ -0,0 +1,54 @@
+"""脚本拆分、语句关键字和分组发送"""
+from sqlhelper.query import pipeline_batches
+from sqlhelper.script import split_statements, statement_keyword
+
+
+def test_split_on_semicolons():
+    assert split_statements("select 1; select 2;\n select 3") == ["select 1", "select 2", "select 3"]
+
+
+def test_delimiter_command_for_procedures():
+    script = ("DELIMITER //\n"
+              "CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END //\n"
+              "DELIMITER ;\n"
+              "CALL p();")
+    assert split_statements(script) == ["CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END", "CALL p()"]
+
+
+def test_escaped_quote_does_not_end_string():
+    assert split_statements("select 'a\\';b'; select 2") == ["select 'a\\';b'", "select 2"]
+
+
+def test_doubled_quotes_and_backticks():
+    assert split_statements("select 'it''s;'; select `a;b` from t") == ["select 'it''s;'", "select `a;b` from t"]
+
+
+def test_comment_only_fragments_are_dropped():
+    script = "-- header;\n# note;\n/* block; */\nselect 1;\n-- trailing ;\n;"
+    assert split_statements(script) == ["-- header;\n# note;\n/* block; */\nselect 1"]
+
+
+def test_double_dash_without_space_is_not_a_comment():
+    assert split_statements("select 1--1; select 2") == ["select 1--1", "select 2"]
+
+
+def test_version_comment_is_code():
+    assert split_statements("/*!40101 SET NAMES utf8 */;") == ["/*!40101 SET NAMES utf8 */"]
+
+
+def test_statement_keyword_skips_comments():
+    assert statement_keyword("/* x */ -- y\n# z\n  call p()") == "CALL"
+    assert statement_keyword("select 1--1") == "SELECT"
+    assert statement_keyword("-- only a comment") == ""
+
+
+def test_pipeline_isolates_call():
+    statements = ["select 1", "select 2", "call p()", "select 3", "select 4"]
+    assert list(pipeline_batches(statements)) == [[0, 1], [2], [3, 4]]
+
+
+def test_pipeline_respects_size_and_byte_cap():
+    statements = ["select 1"] * 5  # 每条 8 字节
+    assert list(pipeline_batches(statements, size=2)) == [[0, 1], [2, 3], [4]]
+    assert list(pipeline_batches(statements, max_bytes=20)) == [[0, 1], [2, 3], [4]]
+    assert list(pipeline_batches(["x" * 30, "select 1"], max_bytes=20)) == [[0], [1]]
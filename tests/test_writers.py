@@ -0,0 +1,24 @@
+"""文本写出器的值转换"""
+import io
+import json
+
+from sqlhelper.writers import CsvWriter, JsonlWriter
+
+
+def write(writer_class, rows, *args):
+    stream = io.BytesIO()
+    writer = writer_class(stream, *args)
+    writer.begin(["id", "tags"])
+    writer.write_rows(rows)
+    writer.end()
+    writer.close()
+    return stream.getvalue().decode("utf-8")
+
+
+def test_set_column_in_jsonl():
+    text = write(JsonlWriter, [(1, {"b", "a"}), (2, set())])
+    assert [json.loads(line) for line in text.splitlines()] == [{"id": 1, "tags": "a,b"}, {"id": 2, "tags": ""}]
+
+
+def test_set_column_in_csv():
+    assert write(CsvWriter, [(1, frozenset({"b", "a"}))], True).splitlines() == ["id,tags", "1,\"a,b\""]